@@ -3,8 +3,9 @@ AI интерпретация на основе профиля пользова
 """
 import json
 import logging
+import os
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 
 import numpy as np
 from fastapi import APIRouter, Depends, HTTPException
@@ -12,9 +13,14 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from .db import get_db
+from .executor import io_pool
 from .openai_client import get_embedding, generate_ai_interpretation
+from .schemas import BirthDateField
+from .vector_index import IVFIndex, fingerprint, normalize_embeddings, top_k_rows
 from calc.pythagoras_square.calculator import _calculate_internal as calc_pythagoras
 from calculations import compute_matrix
+from calc.birth_date import BirthDate
+from calc.digits import digit_sum, reduce_to_9_master
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -24,21 +30,36 @@ router = APIRouter(prefix="/ai", tags=["ai"])
 
 # Глобальные переменные для чанков и embeddings
 CHUNKS: List[Dict] = []
+# Матрица (число чанков с embedding, размерность): float32, C-порядок, строки нормированы по L2 —
+# косинусное сходство с нормированным запросом = одно умножение матрицы на вектор
 EMBEDDINGS: Optional[np.ndarray] = None
+# Чанк для каждой строки EMBEDDINGS (чанки без embedding в поиск не попадают)
+EMBEDDED_CHUNKS: List[Dict] = []
+# Приближённый индекс IVF (app/vector_index.py); строки EMBEDDINGS переставлены в его порядке
+ANN_INDEX: Optional[IVFIndex] = None
+
+KNOWLEDGE_DIR = Path(__file__).parent / "data" / "ai_knowledge"
+ANN_INDEX_FILE = KNOWLEDGE_DIR / "ivf_index.npz"
+
+# Сколько ближайших списков IVF просматривать: больше — точнее и медленнее
+ANN_NPROBE = int(os.getenv("AI_ANN_NPROBE", "16"))
+# Меньший корпус быстрее просмотреть целиком, чем через индекс
+ANN_MIN_CHUNKS = int(os.getenv("AI_ANN_MIN_CHUNKS", "20000"))
 
 
 def load_chunks():
     """Загрузить чанки и embeddings при старте модуля."""
-    global CHUNKS, EMBEDDINGS
+    global CHUNKS, EMBEDDINGS, EMBEDDED_CHUNKS, ANN_INDEX
     
-    base_dir = Path(__file__).parent
-    chunks_file = base_dir / "data" / "ai_knowledge" / "chunks.json"
+    chunks_file = KNOWLEDGE_DIR / "chunks.json"
+    ANN_INDEX = None
     
     if not chunks_file.exists():
         logger.warning(f"Файл {chunks_file} не найден. AI база знаний не инициализирована.")
         logger.warning("Запустите скрипт индексации: python -m scripts.index_books")
         CHUNKS = []
         EMBEDDINGS = None
+        EMBEDDED_CHUNKS = []
         return
     
     try:
@@ -48,27 +69,59 @@ def load_chunks():
         if not CHUNKS:
             logger.warning("Файл chunks.json пуст.")
             EMBEDDINGS = None
+            EMBEDDED_CHUNKS = []
             return
         
         # Собираем матрицу embeddings
-        embeddings_list = []
+        embedded_chunks = []
         for chunk in CHUNKS:
             if "embedding" in chunk:
-                embeddings_list.append(chunk["embedding"])
+                embedded_chunks.append(chunk)
             else:
                 logger.warning(f"Чанк {chunk.get('id')} не содержит embedding")
         
-        if embeddings_list:
-            EMBEDDINGS = np.array(embeddings_list)
+        if embedded_chunks:
+            # нормируется один раз здесь, а не на каждом запросе
+            EMBEDDINGS = normalize_embeddings([chunk["embedding"] for chunk in embedded_chunks])
+            EMBEDDED_CHUNKS = embedded_chunks
             logger.info(f"Загружено {len(CHUNKS)} чанков, размерность embeddings: {EMBEDDINGS.shape}")
+            _load_ann_index()
         else:
             EMBEDDINGS = None
+            EMBEDDED_CHUNKS = []
             logger.warning("Не найдено embeddings в чанках")
             
     except Exception as e:
         logger.error(f"Ошибка при загрузке chunks.json: {e}")
         CHUNKS = []
         EMBEDDINGS = None
+        EMBEDDED_CHUNKS = []
+
+
+def _load_ann_index():
+    """
+    Подключить индекс IVF, если он построен по этой же версии chunks.json:
+    строки EMBEDDINGS и EMBEDDED_CHUNKS переставляются в порядке его списков.
+    """
+    global EMBEDDINGS, EMBEDDED_CHUNKS, ANN_INDEX
+
+    if not ANN_INDEX_FILE.exists():
+        if len(EMBEDDED_CHUNKS) >= ANN_MIN_CHUNKS:
+            logger.warning(f"Индекс {ANN_INDEX_FILE} не найден, поиск — полным перебором")
+        return
+    try:
+        index = IVFIndex.load(ANN_INDEX_FILE)
+    except Exception as e:
+        logger.error(f"Ошибка при загрузке {ANN_INDEX_FILE}: {e}")
+        return
+    if index.source != fingerprint(EMBEDDINGS):
+        logger.warning(f"Индекс {ANN_INDEX_FILE} построен по другой версии chunks.json и не используется")
+        return
+
+    EMBEDDINGS = np.ascontiguousarray(EMBEDDINGS[index.order])
+    EMBEDDED_CHUNKS = [EMBEDDED_CHUNKS[i] for i in index.order]
+    ANN_INDEX = index
+    logger.info(f"Индекс IVF: {index.n_lists} списков, nprobe={ANN_NPROBE}")
 
 
 def check_knowledge_base():
@@ -80,52 +133,23 @@ def check_knowledge_base():
         )
 
 
-def normalize_birth_date(date_str: str) -> str:
-    """
-    Нормализовать дату рождения к формату DD.MM.YYYY.
-    
-    Поддерживает форматы:
-    - DD.MM.YYYY
-    - YYYY-MM-DD
-    - DD-MM-YYYY
-    """
-    # Убираем пробелы
-    date_str = date_str.strip()
-    
-    # Если формат YYYY-MM-DD, конвертируем в DD.MM.YYYY
-    if "-" in date_str and len(date_str.split("-")[0]) == 4:
-        parts = date_str.split("-")
-        if len(parts) == 3:
-            return f"{parts[2]}.{parts[1]}.{parts[0]}"
-    
-    # Если формат DD-MM-YYYY, конвертируем в DD.MM.YYYY
-    if "-" in date_str and len(date_str.split("-")[0]) <= 2:
-        return date_str.replace("-", ".")
-    
-    # Если уже в формате DD.MM.YYYY, возвращаем как есть
-    if "." in date_str:
-        return date_str
-    
-    return date_str
-
-
-def build_user_profile(birth_date: str, db: Optional[Session] = None) -> Dict:
+def build_user_profile(birth_date: Union[str, BirthDate], db: Optional[Session] = None) -> Dict:
     """
     Построить профиль пользователя на основе даты рождения.
     
     Использует существующие калькуляторы для получения всех показателей.
+    Строка даты разбирается один раз, дальше во все расчёты передаётся BirthDate.
     """
-    # Нормализуем дату
-    normalized_date = normalize_birth_date(birth_date)
+    bd = BirthDate.coerce(birth_date)
     
     profile = {
-        "birth_date": normalized_date,
+        "birth_date": bd.text,
     }
     
     try:
         # Матрица Пифагора
         try:
-            pifagor_result = calc_pythagoras(normalized_date)
+            pifagor_result = calc_pythagoras(bd)
             profile["pifagor"] = {
                 "counts": pifagor_result.counts,
                 "third_zone": pifagor_result.third_zone,
@@ -144,7 +168,7 @@ def build_user_profile(birth_date: str, db: Optional[Session] = None) -> Dict:
         
         # Матрица судьбы
         try:
-            matrix = compute_matrix(normalized_date)
+            matrix = compute_matrix(bd)
             profile["matrix"] = {
                 "primary": {
                     "A": matrix.primary.A,
@@ -170,24 +194,17 @@ def build_user_profile(birth_date: str, db: Optional[Session] = None) -> Dict:
         
         # Простые расчёты жизненного пути
         try:
-            from datetime import datetime
-            d = datetime.strptime(normalized_date, "%d.%m.%Y")
-            day, month, year = d.day, d.month, d.year
+            day, month, year = bd.day, bd.month, bd.year
             
-            # Жизненный путь: сумма всех цифр даты до одной цифры
-            def reduce_to_single_digit(n):
-                while n > 9 and n not in [11, 22, 33]:
-                    n = sum(int(d) for d in str(n))
-                return n
-            
-            life_path = reduce_to_single_digit(day + month + sum(int(d) for d in str(year)))
+            # Жизненный путь: сумма всех цифр даты до одной цифры (мастер-числа 11/22/33 сохраняем)
+            life_path = reduce_to_9_master(day + month + digit_sum(year))
             profile["life_path"] = life_path
             
             # Число души (сумма гласных в имени - упрощённо, используем день)
-            profile["soul_number"] = reduce_to_single_digit(day)
+            profile["soul_number"] = reduce_to_9_master(day)
             
             # Число личности (сумма согласных - упрощённо, используем месяц)
-            profile["personality_number"] = reduce_to_single_digit(month)
+            profile["personality_number"] = reduce_to_9_master(month)
             
         except Exception as e:
             logger.warning(f"Ошибка при расчёте базовых чисел: {e}")
@@ -241,6 +258,34 @@ def build_query_text_from_profile(profile: Dict) -> str:
     return text
 
 
+def _search_rows(queries: np.ndarray, k: int, nprobe: Optional[int]) -> List[np.ndarray]:
+    """
+    Строки EMBEDDINGS top-k для каждого нормированного запроса: через индекс IVF,
+    если он загружен и корпус не меньше ANN_MIN_CHUNKS, иначе точный перебор.
+    """
+    if ANN_INDEX is not None and len(EMBEDDED_CHUNKS) >= ANN_MIN_CHUNKS:
+        return ANN_INDEX.search(EMBEDDINGS, queries, k, nprobe or ANN_NPROBE)
+    return list(top_k_rows(queries @ EMBEDDINGS.T, k))
+
+
+def search_chunks(query_embedding, k: int = 10, nprobe: Optional[int] = None) -> List[Dict]:
+    """
+    Top-k чанков по косинусному сходству с embedding запроса
+    (nprobe — списков IVF для просмотра, по умолчанию ANN_NPROBE).
+    """
+    rows = _search_rows(normalize_embeddings(query_embedding), k, nprobe)[0]
+    return [EMBEDDED_CHUNKS[i] for i in rows]
+
+
+def search_chunks_batch(query_embeddings, k: int = 10, nprobe: Optional[int] = None) -> List[List[Dict]]:
+    """
+    Пакетный поиск: top-k чанков для каждого из нескольких embedding запросов
+    (сходства со всеми запросами — одно умножение матриц).
+    """
+    rows = _search_rows(normalize_embeddings(query_embeddings), k, nprobe)
+    return [[EMBEDDED_CHUNKS[i] for i in row] for row in rows]
+
+
 def get_top_chunks(query_text: str, k: int = 10) -> List[Dict]:
     """
     Найти top-k наиболее релевантных чанков по косинусному сходству.
@@ -256,27 +301,16 @@ def get_top_chunks(query_text: str, k: int = 10) -> List[Dict]:
     
     # Получаем embedding запроса
     try:
-        query_embedding = np.array(get_embedding(query_text))
+        query_embedding = get_embedding(query_text)
     except Exception as e:
         logger.error(f"Ошибка при получении embedding запроса: {e}")
         raise HTTPException(status_code=500, detail="Ошибка при обработке запроса")
     
-    # Нормализуем векторы для косинусного сходства
-    query_norm = query_embedding / (np.linalg.norm(query_embedding) + 1e-10)
-    embeddings_norm = EMBEDDINGS / (np.linalg.norm(EMBEDDINGS, axis=1, keepdims=True) + 1e-10)
-    
-    # Вычисляем косинусное сходство
-    similarities = np.dot(embeddings_norm, query_norm)
-    
-    # Получаем индексы top-k
-    top_indices = np.argsort(similarities)[::-1][:k]
-    
-    # Возвращаем соответствующие чанки
-    return [CHUNKS[i] for i in top_indices]
+    return search_chunks(query_embedding, k)
 
 
 class AIInterpretationRequest(BaseModel):
-    birth_date: str
+    birth_date: BirthDateField
     user_id: Optional[int] = None
 
 
@@ -289,25 +323,27 @@ async def ai_interpretation(payload: AIInterpretationRequest, db: Session = Depe
         # 1. Проверяем базу знаний
         check_knowledge_base()
         
-        # 2. Нормализуем дату
-        normalized_date = normalize_birth_date(payload.birth_date)
-        logger.info(f"Обработка запроса для даты: {normalized_date}")
+        # 2. Дата уже разобрана и проверена схемой запроса
+        birth_date = payload.birth_date
+        logger.info(f"Обработка запроса для даты: {birth_date}")
         
-        # 3. Строим профиль
-        profile = build_user_profile(normalized_date, db)
+        # 3. Строим профиль (расчёты и запросы к БД — вне event loop)
+        profile = await io_pool.run(build_user_profile, birth_date, db)
         logger.info(f"Построен профиль: {list(profile.keys())}")
         
         # 4. Формируем запрос для поиска
         query_text = build_query_text_from_profile(profile)
         
         # 5. Находим релевантные чанки
-        top_chunks = get_top_chunks(query_text, k=10)
+        top_chunks = await io_pool.run(get_top_chunks, query_text, k=10)
         logger.info(f"Найдено {len(top_chunks)} релевантных чанков")
         
         # 6. Генерируем интерпретацию
         try:
-            report = generate_ai_interpretation(profile, top_chunks)
+            report = await io_pool.run(generate_ai_interpretation, profile, top_chunks)
             logger.info("Интерпретация успешно сгенерирована")
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Ошибка при генерации интерпретации: {e}")
             raise HTTPException(
@@ -12,6 +12,7 @@ from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 
 from .db import get_db
+from .executor import cpu_pool
 from . import models
 
 # Загружаем переменные окружения из .env
@@ -211,6 +212,8 @@ async def register(payload: RegisterRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Email уже зарегистрирован")
 
     code = generate_code()
+    # хеширование пароля намеренно медленное — считаем вне event loop
+    password_hash = await cpu_pool.run(hash_password, payload.password)
 
     user = models.User(
         name=payload.name,
@@ -222,7 +225,7 @@ async def register(payload: RegisterRequest, db: Session = Depends(get_db)):
         telegram_username=payload.telegram_username,
         telegram_first_name=payload.telegram_first_name,
         telegram_last_name=payload.telegram_last_name,
-        password_hash=hash_password(payload.password),
+        password_hash=password_hash,
         email_code=code,
         is_email_verified=False,
     )
@@ -1,19 +1,31 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import asyncio
+import datetime as dt
+import json
+import time
+from typing import Annotated, Any, Dict, Iterator, List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 from calc.money_code.calculator import calculate as money_calc
 from calc.life_code.calculator import calculate as life_calc
 from calc.destiny_path.calculator import calculate as destiny_calc
 from calc.birth_decoding.calculator import calculate as birth_decoding_calc
 from calc.pythagoras_square.calculator import calculate as pythagoras_calc
-from calc.prognosis.calculator import calculate as prognosis_calc
+from calc.prognosis.calculator import calculate as prognosis_calc, rhythm_range
+from calc.fragments import get_pack
+from calculations import compute_matrix
+
+from .executor import cpu_pool
+from .schemas import BirthDateField
 
 
 router = APIRouter(prefix="/calculators", tags=["calculators"])
 
 
 class CalcRequest(BaseModel):
-    birth_date: str  # format 'dd.mm.yyyy'
+    birth_date: BirthDateField  # format 'dd.mm.yyyy'
 
 
 CALC_MAP = {
@@ -26,12 +38,204 @@ CALC_MAP = {
 }
 
 
+# ---------- ПРОГНОСТИКА ЗА ПЕРИОД ----------
+
+# Период по умолчанию (если не задан параметр to), дней
+DEFAULT_RANGE_DAYS = 365
+
+# Сколько дней отдаём одним куском потока
+STREAM_CHUNK_DAYS = 256
+
+
+def _or_none(value: int) -> Optional[int]:
+    # NO_FRAGMENT (-1) — интерпретация не найдена
+    return value if value >= 0 else None
+
+
+def _iter_jsonl(rows: Dict[str, list]) -> Iterator[str]:
+    pack = get_pack()
+    chunk: list[str] = []
+    for i, date in enumerate(rows["date"]):
+        record = {"date": date.isoformat()}
+        for name in ("year", "month", "day"):
+            record[name] = {
+                "raw": rows[f"{name}_raw"][i],
+                "value": _or_none(rows[f"{name}_value"][i]),
+                # ключ фрагмента (хеш текста), а не индекс в пакете: не сдвигается при правке других текстов
+                "id": pack.key(rows[f"{name}_id"][i]),
+            }
+        chunk.append(json.dumps(record, ensure_ascii=False) + "\n")
+        if len(chunk) >= STREAM_CHUNK_DAYS:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+# Длина строки ICS в октетах без CRLF (RFC 5545, 3.1)
+ICS_LINE_OCTETS = 75
+
+
+def _fold_ics_line(line: str) -> str:
+    """
+    Строка ICS с переносами по RFC 5545: не длиннее 75 октетов UTF-8,
+    продолжение — CRLF и пробел; символ UTF-8 не разрывается.
+    """
+    data = line.encode("utf-8")
+    if len(data) <= ICS_LINE_OCTETS:
+        return line + "\r\n"
+    parts = []
+    start, limit = 0, ICS_LINE_OCTETS
+    while len(data) - start > limit:
+        end = start + limit
+        # не резать посреди символа: байты продолжения UTF-8 — 10xxxxxx
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        # пробел в начале строки-продолжения тоже входит в 75 октетов
+        start, limit = end, ICS_LINE_OCTETS - 1
+    parts.append(data[start:].decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics(*lines: str) -> str:
+    return "".join(_fold_ics_line(line) for line in lines)
+
+
+def _iter_ics(rows: Dict[str, list], birth_date) -> Iterator[str]:
+    stamp = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    uid_prefix = birth_date.text.replace(".", "")
+    yield _ics(
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Numerology Mini App//Prognosis//RU",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:Прогностика {birth_date.text}",
+    )
+    chunk: list[str] = []
+    for i, date in enumerate(rows["date"]):
+        ymd = date.strftime("%Y%m%d")
+        values = [rows[f"{name}_value"][i] for name in ("year", "month", "day")]
+        year_v, month_v, day_v = (v if v >= 0 else "—" for v in values)
+        chunk.append(_ics(
+            "BEGIN:VEVENT",
+            f"UID:prognosis-{uid_prefix}-{ymd}@numerology",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;VALUE=DATE:{ymd}",
+            f"SUMMARY:Ритм дня: {day_v}",
+            f"DESCRIPTION:Ритм года: {year_v}\\, ритм месяца: {month_v}\\, ритм дня: {day_v}",
+            "END:VEVENT",
+        ))
+        if len(chunk) >= STREAM_CHUNK_DAYS:
+            yield "".join(chunk)
+            chunk = []
+    chunk.append(_ics("END:VCALENDAR"))
+    yield "".join(chunk)
+
+
+class PrognosisRangeQuery(BaseModel):
+    birth_date: BirthDateField  # format 'dd.mm.yyyy'
+    date_from: Optional[dt.date] = Field(None, alias="from")  # ГГГГ-ММ-ДД, по умолчанию сегодня
+    date_to: Optional[dt.date] = Field(None, alias="to")  # ГГГГ-ММ-ДД, по умолчанию from + год
+    format: Literal["jsonl", "ics"] = "jsonl"
+
+
+@router.get("/prognosis/range")
+def prognosis_range(query: Annotated[PrognosisRangeQuery, Query()]):
+    """
+    Ритмы года / месяца / дня и ключи интерпретаций для каждого дня периода
+    [from, to]. Ответ — поток JSON Lines или календарь ICS.
+    """
+    birth_date = query.birth_date
+    start = query.date_from or dt.date.today()
+    if query.date_to is not None:
+        end = query.date_to
+    else:
+        # у конца календаря (date.max) период по умолчанию обрезается
+        end = dt.date.fromordinal(min(start.toordinal() + DEFAULT_RANGE_DAYS - 1, dt.date.max.toordinal()))
+    try:
+        columns = rhythm_range(birth_date.day, birth_date.month, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = {
+        key: (values.astype(dt.date).tolist() if key == "date" else values.tolist())
+        for key, values in columns.items()
+    }
+
+    if query.format == "ics":
+        filename = f"prognosis_{birth_date.text.replace('.', '_')}.ics"
+        return StreamingResponse(
+            _iter_ics(rows, birth_date),
+            media_type="text/calendar; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+    return StreamingResponse(_iter_jsonl(rows), media_type="application/x-ndjson")
+
+
+# ---------- ВСЕ КАЛЬКУЛЯТОРЫ ОДНИМ ЗАПРОСОМ ----------
+
+# Матрица судьбы (как /matrix/data) тоже доступна в /calculators/all
+MATRIX_KEY = "matrix"
+
+
+class CalcAllRequest(BaseModel):
+    birth_date: BirthDateField  # format 'dd.mm.yyyy'
+    calculators: Optional[List[str]] = None  # подмножество CALC_MAP и "matrix"; None — все
+
+
+def _run_timed(name: str, birth_date) -> Dict[str, Any]:
+    """
+    Один калькулятор с замером времени. Ошибка не прерывает остальные расчёты.
+    """
+    t0 = time.perf_counter()
+    try:
+        if name == MATRIX_KEY:
+            result = {"data": compute_matrix(birth_date).to_dict()}
+        else:
+            result = {"result_html": CALC_MAP[name](birth_date)}
+    except Exception as e:
+        result = {"error": str(e)}
+    result["time_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    return result
+
+
+@router.post("/all")
+async def run_all_calculators(payload: CalcAllRequest):
+    """
+    Несколько калькуляторов для одной даты: дата проверяется один раз,
+    калькуляторы считаются параллельно в пуле cpu_pool.
+    """
+    available = [*CALC_MAP, MATRIX_KEY]
+    names = available if payload.calculators is None else list(dict.fromkeys(payload.calculators))
+    unknown = [n for n in names if n not in available]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Calculator not found: {', '.join(unknown)}")
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(
+        *(cpu_pool.run(_run_timed, n, payload.birth_date) for n in names),
+        return_exceptions=True,
+    )
+    return {
+        "birth_date": payload.birth_date.text,
+        "results": {
+            # пул переполнен / таймаут — ошибка только этого калькулятора
+            n: r if not isinstance(r, BaseException) else {"error": getattr(r, "detail", str(r)), "time_ms": None}
+            for n, r in zip(names, results)
+        },
+        "total_ms": round((time.perf_counter() - t0) * 1000, 3),
+    }
+
+
 @router.post("/{name}")
 async def run_calculator(name: str, payload: CalcRequest):
     if name not in CALC_MAP:
         raise HTTPException(status_code=404, detail="Calculator not found")
     try:
-        result_html = CALC_MAP[name](payload.birth_date)
+        result_html = await cpu_pool.run(CALC_MAP[name], payload.birth_date)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     return {"result_html": result_html}
\ No newline at end of file
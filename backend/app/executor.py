@@ -0,0 +1,373 @@
+"""
+Слой исполнения: вынос CPU-ёмких и блокирующих вызовов из event loop.
+
+Асинхронные обработчики не должны вызывать синхронный код напрямую —
+пока считается калькулятор, хешируется пароль или ждётся ответ OpenAI,
+все остальные запросы этого воркера стоят. Такие вызовы идут через пул:
+
+    result = await cpu_pool.run(func, *args)
+
+У каждого пула ограничена очередь (при переполнении — 503 с Retry-After)
+и время вызова (при превышении — 504), собираются метрики ожидания в очереди
+и времени выполнения (GET /executor/stats). Если процесс пула умер (OOM,
+segfault), вызов получает 503, а следующий поднимает свежие процессы.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/executor", tags=["executor"])
+
+# Сколько последних вызовов учитывается в перцентилях
+METRICS_WINDOW = 1000
+
+
+class ExecutorBusy(HTTPException):
+    """Очередь пула заполнена."""
+
+    def __init__(self, pool: str, retry_after: int = 1):
+        super().__init__(
+            status_code=503,
+            detail=f"Сервер перегружен ({pool}), повторите запрос позже",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class ExecutorTimeout(HTTPException):
+    """Вызов не уложился в отведённое время."""
+
+    def __init__(self, pool: str, timeout: float):
+        super().__init__(
+            status_code=504,
+            detail=f"Превышено время выполнения ({pool}, {timeout:g} с)",
+        )
+
+
+class ExecutorBroken(HTTPException):
+    """Воркер пула упал во время вызова; пул пересоздаётся."""
+
+    def __init__(self, pool: str, retry_after: int = 1):
+        super().__init__(
+            status_code=503,
+            detail=f"Воркер пула {pool} аварийно завершился, повторите запрос",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+def _timed_call(func: Callable, args: tuple, kwargs: dict) -> Tuple[Any, float, float]:
+    """
+    Выполняется в воркере: результат + моменты начала и конца (time.monotonic,
+    общий для всех процессов машины, поэтому годится и для пула процессов).
+    """
+    started = time.monotonic()
+    result = func(*args, **kwargs)
+    return result, started, time.monotonic()
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class BoundedExecutor:
+    """
+    Пул потоков или процессов с ограниченной очередью, таймаутом вызова
+    и метриками.
+
+    workers   — число воркеров;
+    max_queue — сколько вызовов может ждать свободного воркера;
+    timeout   — таймаут вызова по умолчанию, секунд (вместе с ожиданием в очереди);
+    kind      — "thread" или "process" (для процесса функция и аргументы
+                должны сериализоваться pickle);
+    initializer, initargs — вызываются один раз в каждом воркере при старте;
+    start_method — способ запуска процессов ("spawn", "fork", "forkserver").
+    """
+
+    def __init__(
+        self,
+        name: str,
+        workers: int,
+        max_queue: int,
+        timeout: float,
+        kind: str = "thread",
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        start_method: Optional[str] = None,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Неизвестный тип пула: {kind}")
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.kind = kind
+        self.initializer = initializer
+        self.initargs = initargs
+        self.start_method = start_method
+
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._restarts = 0
+        self._wait: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self._run: Deque[float] = deque(maxlen=METRICS_WINDOW)
+
+    def _get_executor(self) -> Executor:
+        # пул создаётся при первом вызове: импорт модуля не порождает потоков/процессов
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context(self.start_method),
+                            initializer=self.initializer,
+                            initargs=self.initargs,
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers,
+                            thread_name_prefix=self.name,
+                            initializer=self.initializer,
+                            initargs=self.initargs,
+                        )
+        return self._executor
+
+    def _discard_broken(self, executor: Executor) -> None:
+        """
+        Упавший пул не принимает вызовов, пока его не заменить: сбросить его,
+        следующий _get_executor создаст новый (с initializer в новых воркерах).
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return  # уже сброшен другим вызовом
+            self._executor = None
+            self._restarts += 1
+        logger.error("Пул %s: воркер аварийно завершился, пул будет создан заново", self.name)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Выполнить func(*args, **kwargs) в пуле и дождаться результата.
+        """
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorBusy(self.name)
+            self._in_flight += 1
+            self._submitted += 1
+
+        submitted = time.monotonic()
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_timed_call, func, args, kwargs)
+        except BrokenExecutor:
+            self._release(None)
+            with self._lock:
+                self._failed += 1
+            self._discard_broken(executor)
+            raise ExecutorBroken(self.name) from None
+        except Exception:
+            self._release(None)
+            raise
+        # слот освобождается, только когда воркер действительно закончил
+        future.add_done_callback(self._release)
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            result, started, finished = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            # ещё не начатый вызов отменяется; уже идущий доработает в фоне
+            with self._lock:
+                self._timeouts += 1
+            logger.warning("Пул %s: вызов %s не уложился в %g с", self.name, getattr(func, "__name__", func), timeout)
+            raise ExecutorTimeout(self.name, timeout) from None
+        except BrokenExecutor:
+            with self._lock:
+                self._failed += 1
+            self._discard_broken(executor)
+            raise ExecutorBroken(self.name) from None
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+
+        with self._lock:
+            self._completed += 1
+            self._wait.append(started - submitted)
+            self._run.append(finished - started)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            wait = list(self._wait)
+            run = list(self._run)
+            stats = {
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "timeout_s": self.timeout,
+                "in_flight": self._in_flight,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "restarts": self._restarts,
+            }
+        for key, values in (("queue_wait_ms", wait), ("run_ms", run)):
+            stats[key] = {
+                "avg": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+                "p50": round(_percentile(values, 0.50) * 1000, 3),
+                "p95": round(_percentile(values, 0.95) * 1000, 3),
+                "max": round(max(values, default=0.0) * 1000, 3),
+            }
+        return stats
+
+    def start(self) -> None:
+        """
+        Запустить воркеры заранее (для процессов — вместе с initializer),
+        чтобы первый запрос не ждал их старта.
+        """
+        executor = self._get_executor()
+        if self.kind == "process":
+            for _ in range(self.workers):
+                executor.submit(time.monotonic)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SingleFlight:
+    """
+    Склейка одинаковых одновременных вызовов: пока работа по ключу идёт,
+    остальные вызывающие ждут её результат, а не запускают свою копию.
+
+    Работа выполняется отдельной задачей, поэтому отмена одного из
+    вызывающих (клиент закрыл соединение) не прерывает её для остальных.
+    Реестр — на процесс (на один воркер uvicorn).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        self._tasks.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # ошибка уже отдана вызывающим — не логировать как забытую
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            self.started += 1
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._tasks),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+
+# =========================
+#  Пулы приложения
+# =========================
+
+def pool_from_env(
+    name: str,
+    workers: int,
+    max_queue: int,
+    timeout: float,
+    kind: str = "thread",
+    **options,
+) -> BoundedExecutor:
+    """
+    Параметры пула переопределяются переменными окружения
+    EXECUTOR_<NAME>_WORKERS / _QUEUE / _TIMEOUT / _KIND.
+    """
+    prefix = f"EXECUTOR_{name.upper()}_"
+    return BoundedExecutor(
+        name=name,
+        workers=int(os.getenv(prefix + "WORKERS", workers)),
+        max_queue=int(os.getenv(prefix + "QUEUE", max_queue)),
+        timeout=float(os.getenv(prefix + "TIMEOUT", timeout)),
+        kind=os.getenv(prefix + "KIND", kind),
+        **options,
+    )
+
+
+# CPU-ёмкие вызовы: калькуляторы, хеширование паролей
+cpu_pool = pool_from_env("cpu", workers=os.cpu_count() or 4, max_queue=64, timeout=10)
+
+# Блокирующий ввод-вывод: запросы к OpenAI, построение профиля с обращением к БД
+io_pool = pool_from_env("io", workers=16, max_queue=64, timeout=120)
+
+# Пулы и склейки запросов, попадающие в метрики и закрываемые при остановке.
+# Пулы предметных модулей (например, render в app/matrix_api.py) добавляются
+# через register_pool — этот модуль не импортирует их зависимости
+POOLS: List[BoundedExecutor] = [cpu_pool, io_pool]
+FLIGHTS: List[SingleFlight] = []
+
+
+def register_pool(pool: BoundedExecutor) -> BoundedExecutor:
+    POOLS.append(pool)
+    return pool
+
+
+def register_single_flight(flight: SingleFlight) -> SingleFlight:
+    """
+    Метрики склейки выводятся в /executor/stats рядом с пулом того же имени.
+    """
+    FLIGHTS.append(flight)
+    return flight
+
+
+def shutdown_pools() -> None:
+    for pool in POOLS:
+        pool.shutdown()
+
+
+@router.get("/stats")
+def executor_stats():
+    """
+    Метрики пулов: очередь, ошибки, таймауты, перезапуски упавших пулов,
+    время ожидания и выполнения.
+    """
+    stats = {pool.name: pool.stats() for pool in POOLS}
+    for flight in FLIGHTS:
+        stats.setdefault(flight.name, {})["single_flight"] = flight.stats()
+    return stats
@@ -0,0 +1,196 @@
+"""
+Дисковый кэш картинок матрицы с ограничением по размеру.
+
+- файлы раскладываются по подпапкам-шардам (первые 2 символа sha1 имени),
+  чтобы в одной папке не было десятков тысяч файлов;
+- суммарный размер ограничен бюджетом в байтах, при превышении удаляются
+  давно не запрошенные файлы (LRU);
+- порядок доступа хранится в памяти, а на диске — во времени изменения
+  файла (обновляется при каждом попадании), поэтому индекс восстанавливается
+  при старте простым сканированием папки.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Суффикс временных файлов drawing.write_atomic
+TMP_SUFFIX = ".tmp"
+
+# Недописанные временные файлы старше этого возраста удаляются при сканировании, секунд
+STALE_TMP_AGE = 3600
+
+
+class ImageCache:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # имя файла → размер в байтах; порядок — от давно запрошенных к недавним
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    # ---------- пути ----------
+
+    @staticmethod
+    def shard(name: str) -> str:
+        return hashlib.sha1(name.encode("utf-8")).hexdigest()[:2]
+
+    def relpath(self, name: str) -> str:
+        """
+        Путь файла относительно корня кэша (для URL): 'ab/matrix_....webp'.
+        """
+        return f"{self.shard(name)}/{name}"
+
+    def path_for(self, name: str) -> str:
+        """
+        Полный путь файла; папка шарда создаётся при необходимости.
+        """
+        directory = os.path.join(self.root, self.shard(name))
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name)
+
+    # ---------- индекс ----------
+
+    def rebuild(self) -> None:
+        """
+        Пересобрать индекс по содержимому папки (при старте приложения).
+        """
+        os.makedirs(self.root, exist_ok=True)
+        entries = []
+        now = time.time()
+        with os.scandir(self.root) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as files:
+                    for f in files:
+                        if not f.is_file():
+                            continue
+                        st = f.stat()
+                        if f.name.endswith(TMP_SUFFIX):
+                            if now - st.st_mtime > STALE_TMP_AGE:
+                                _unlink(f.path)
+                            continue
+                        entries.append((st.st_mtime, f.name, st.st_size))
+
+        entries.sort()
+        with self._lock:
+            self._index = OrderedDict((name, size) for _, name, size in entries)
+            self._bytes = sum(size for _, _, size in entries)
+        logger.info("Кэш картинок: %d файлов, %.1f МБ", len(entries), self._bytes / 2**20)
+        self._evict()
+
+    def lookup(self, name: str) -> Optional[int]:
+        """
+        Размер файла, если он есть в кэше (попадание отмечается как доступ), иначе None.
+        """
+        path = os.path.join(self.root, self.shard(name), name)
+        try:
+            os.utime(path)  # время доступа для LRU после перезапуска
+            size = os.path.getsize(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+                self._forget(name)
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if name not in self._index:
+                # файл нарисован другим воркером
+                self._bytes += size
+            else:
+                self._bytes += size - self._index[name]
+            self._index[name] = size
+            self._index.move_to_end(name)
+        return size
+
+    def peek(self, name: str) -> Optional[int]:
+        """
+        Размер файла без учёта в статистике и порядке LRU.
+        """
+        with self._lock:
+            return self._index.get(name)
+
+    def add(self, name: str) -> int:
+        """
+        Учесть только что записанный файл и при необходимости освободить место.
+        """
+        size = os.path.getsize(os.path.join(self.root, self.shard(name), name))
+        with self._lock:
+            self._forget(name)
+            self._index[name] = size
+            self._bytes += size
+        self._evict(keep=name)
+        return size
+
+    def items(self) -> List[Tuple[str, int]]:
+        """
+        Снимок индекса: (имя файла, размер) от давно запрошенных к недавним.
+        """
+        with self._lock:
+            return list(self._index.items())
+
+    def discard(self, name: str) -> None:
+        """
+        Удалить файл из кэша и с диска.
+        """
+        with self._lock:
+            self._forget(name)
+        _unlink(os.path.join(self.root, self.shard(name), name))
+
+    def _forget(self, name: str) -> None:
+        size = self._index.pop(name, None)
+        if size is not None:
+            self._bytes -= size
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        while True:
+            with self._lock:
+                if self._bytes <= self.max_bytes or not self._index:
+                    return
+                name, size = next(iter(self._index.items()))
+                if name == keep:
+                    # единственный оставшийся файл больше бюджета — оставляем
+                    if len(self._index) == 1:
+                        return
+                    self._index.move_to_end(name)
+                    continue
+                del self._index[name]
+                self._bytes -= size
+                self.evictions += 1
+                self.evicted_bytes += size
+            _unlink(os.path.join(self.root, self.shard(name), name))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "files": len(self._index),
+                "bytes_used": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+            }
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
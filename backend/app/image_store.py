@@ -0,0 +1,337 @@
+"""
+Хранилище готовых картинок матрицы.
+
+Обработчик /matrix/image работает с хранилищем через общий интерфейс ImageStore,
+конкретная реализация выбирается переменной IMAGE_STORE:
+
+- local (по умолчанию) — папка app/static/matrix с LRU-бюджетом (ImageCache),
+  файлы раздаются через /static;
+- s3 — бакет S3-совместимого хранилища (AWS S3, MinIO, Yandex Object Storage...):
+  переживает перезапуски эфемерного хостинга. Для проверки локально достаточно
+  поднять MinIO или moto_server и указать его адрес в S3_ENDPOINT_URL.
+"""
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from drawing import write_atomic
+
+from .image_cache import ImageCache
+
+logger = logging.getLogger(__name__)
+
+
+class ImageStore(ABC):
+    """
+    Интерфейс хранилища. Ключ — имя файла варианта ('matrix_..._screen.webp').
+    """
+
+    kind = ""
+
+    @abstractmethod
+    def lookup(self, key: str) -> Optional[int]:
+        """
+        Размер объекта, если он есть (учитывается в статистике попаданий), иначе None.
+        """
+
+    @abstractmethod
+    def peek(self, key: str) -> Optional[int]:
+        """
+        Размер объекта, если он известен без обращения к хранилищу, иначе None.
+        """
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """
+        Есть ли объект (без учёта в статистике).
+        """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Содержимое объекта или None, если его нет.
+        """
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str) -> int:
+        """
+        Сохранить объект; возвращает его размер в байтах.
+        """
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """
+        Адрес, по которому клиент скачивает объект.
+        """
+
+    def rebuild(self) -> None:
+        """
+        Подготовка при старте приложения.
+        """
+
+    @abstractmethod
+    def remove_stale(self, is_stale: Callable[[str], bool], dry_run: bool = False) -> Tuple[int, int]:
+        """
+        Удалить объекты, для которых is_stale(ключ) истинно (прежние версии отрисовки).
+        Возвращает число объектов и байт.
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """
+        Показатели хранилища для /matrix/image/cache.
+        """
+
+
+# =========================
+#  Локальная папка
+# =========================
+
+class LocalImageStore(ImageStore):
+    """
+    Файлы в папке с ограничением по объёму (app/image_cache.py),
+    URL — base_url + путь файла относительно папки.
+    """
+
+    kind = "local"
+
+    def __init__(self, cache: ImageCache, base_url: str):
+        self.cache = cache
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache.root, self.cache.shard(key), key)
+
+    def lookup(self, key: str) -> Optional[int]:
+        return self.cache.lookup(key)
+
+    def peek(self, key: str) -> Optional[int]:
+        return self.cache.peek(key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes, content_type: str) -> int:
+        # через временный файл + rename: из /static не отдаётся недописанный файл
+        write_atomic(self.cache.path_for(key), data)
+        return self.cache.add(key)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{self.cache.relpath(key)}"
+
+    def rebuild(self) -> None:
+        self.cache.rebuild()
+
+    def remove_stale(self, is_stale: Callable[[str], bool], dry_run: bool = False) -> Tuple[int, int]:
+        count = size = 0
+        for key, key_size in self.cache.items():
+            if is_stale(key):
+                if not dry_run:
+                    self.cache.discard(key)
+                count += 1
+                size += key_size
+        return count, size
+
+    def stats(self) -> Dict[str, Any]:
+        return {"store": self.kind, **self.cache.stats()}
+
+
+# =========================
+#  S3-совместимое хранилище
+# =========================
+
+# Сколько ключей, про которые известно, что они уже в бакете, помнить в памяти
+S3_KNOWN_KEYS = 100_000
+
+# Больше ключей за один DeleteObjects S3 не принимает
+S3_DELETE_BATCH = 1000
+
+
+class S3ImageStore(ImageStore):
+    """
+    Объекты в бакете S3 под префиксом prefix. Объём не ограничивается —
+    срок хранения задаётся правилами жизненного цикла бакета.
+
+    Ключи, которые уже видели (записали или нашли), запоминаются в памяти,
+    чтобы повторные запросы не делали HEAD к хранилищу.
+    """
+
+    kind = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "matrix/",
+        endpoint_url: Optional[str] = None,
+        public_url: Optional[str] = None,
+        region: Optional[str] = None,
+        cache_control: Optional[str] = None,
+        acl: Optional[str] = None,
+    ):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("Для IMAGE_STORE=s3 нужен boto3: pip install boto3") from None
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url
+        self.cache_control = cache_control
+        # "public-read", если бакет не открыт на чтение политикой или через CDN
+        self.acl = acl
+        # ключи доступа — стандартные переменные AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY
+        self._client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self._client_error = ClientError
+
+        if public_url:
+            self.base_url = public_url.rstrip("/")
+        elif endpoint_url:
+            # path-style: MinIO и локальные заглушки S3
+            self.base_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.base_url = f"https://{bucket}.s3.amazonaws.com"
+
+        self._lock = threading.Lock()
+        self._known: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.put_bytes = 0
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _remember(self, key: str, size: int) -> None:
+        with self._lock:
+            self._known[key] = size
+            self._known.move_to_end(key)
+            if len(self._known) > S3_KNOWN_KEYS:
+                self._known.popitem(last=False)
+
+    def _not_found(self, e: Exception) -> bool:
+        code = e.response.get("Error", {}).get("Code", "")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def _head(self, key: str) -> Optional[int]:
+        try:
+            head = self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self._client_error as e:
+            if self._not_found(e):
+                return None
+            raise
+        size = int(head["ContentLength"])
+        self._remember(key, size)
+        return size
+
+    def lookup(self, key: str) -> Optional[int]:
+        with self._lock:
+            size = self._known.get(key)
+            if size is not None:
+                self._known.move_to_end(key)
+                self.hits += 1
+                return size
+        size = self._head(key)
+        with self._lock:
+            if size is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return size
+
+    def peek(self, key: str) -> Optional[int]:
+        with self._lock:
+            return self._known.get(key)
+
+    def exists(self, key: str) -> bool:
+        return self.peek(key) is not None or self._head(key) is not None
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            obj = self._client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self._client_error as e:
+            if self._not_found(e):
+                return None
+            raise
+        data = obj["Body"].read()
+        self._remember(key, len(data))
+        return data
+
+    def put(self, key: str, data: bytes, content_type: str) -> int:
+        extra = {}
+        if self.cache_control:
+            extra["CacheControl"] = self.cache_control
+        if self.acl:
+            extra["ACL"] = self.acl
+        self._client.put_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Body=data,
+            ContentType=content_type,
+            **extra,
+        )
+        self._remember(key, len(data))
+        with self._lock:
+            self.puts += 1
+            self.put_bytes += len(data)
+        return len(data)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{self._object_key(key)}"
+
+    def rebuild(self) -> None:
+        logger.info("Хранилище картинок: s3://%s/%s (%s)", self.bucket, self.prefix, self.endpoint_url or "AWS")
+
+    def remove_stale(self, is_stale: Callable[[str], bool], dry_run: bool = False) -> Tuple[int, int]:
+        count = size = 0
+        batch = []
+        paginator = self._client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                key = obj["Key"][len(self.prefix):]
+                if "/" in key or not is_stale(key):
+                    continue
+                count += 1
+                size += obj["Size"]
+                batch.append(obj["Key"])
+                if len(batch) == S3_DELETE_BATCH:
+                    self._delete(batch, dry_run)
+                    batch = []
+        self._delete(batch, dry_run)
+        return count, size
+
+    def _delete(self, object_keys, dry_run: bool) -> None:
+        if not object_keys or dry_run:
+            return
+        self._client.delete_objects(
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": k} for k in object_keys], "Quiet": True},
+        )
+        with self._lock:
+            for k in object_keys:
+                self._known.pop(k[len(self.prefix):], None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "store": self.kind,
+                "bucket": self.bucket,
+                "prefix": self.prefix,
+                "known_keys": len(self._known),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "puts": self.puts,
+                "put_bytes": self.put_bytes,
+            }
@@ -1,11 +1,86 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-import os
 
-from . import calculators, matrix_api, auth, users, ai_interpretation
+from . import calculators, matrix_api, auth, users, ai_interpretation, executor
+from calc.fragments import get_pack
+from calc.birth_decoding import calculator as birth_decoding_calc
+from calc.destiny_path import calculator as destiny_path_calc
+from calc.prognosis import calculator as prognosis_calc
+from drawing_svg import prepare_static as prepare_svg_static
+from matrix_table import init_matrix_table
+
+logger = logging.getLogger(__name__)
+
+
+def _seconds_until_midnight() -> float:
+    now = datetime.now()
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+
+async def _collect_stale_images() -> None:
+    """
+    Удаление картинок прежних версий отрисовки — в фоне, чтобы не задерживать старт
+    (для S3 это листинг всего префикса бакета).
+    """
+    try:
+        await asyncio.to_thread(matrix_api.collect_stale_images)
+    except Exception:
+        logger.exception("Ошибка удаления старых версий картинок")
+
+
+async def _prognosis_midnight_refresh() -> None:
+    """
+    Каждую полночь пересчитываем кеш прогностики на новую дату.
+    Расчёт идёт в отдельном потоке, готовый кеш подменяется атомарно.
+    """
+    while True:
+        # небольшой запас, чтобы date.today() уже вернул новую дату
+        await asyncio.sleep(_seconds_until_midnight() + 1)
+        try:
+            count = await asyncio.to_thread(prognosis_calc.precompute)
+            logger.info("Кеш прогностики пересчитан на %s (%d ключей)", prognosis_calc.cached_date(), count)
+        except Exception:
+            logger.exception("Ошибка пересчёта кеша прогностики")
+
 
-app = FastAPI(title="Numerology Mini App API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prognosis_calc.precompute()
+    # индекс дискового кэша картинок — по содержимому папки
+    matrix_api.image_store.rebuild()
+    gc_task = asyncio.create_task(_collect_stale_images())
+    # процессы отрисовки стартуют заранее и сразу готовят растры фона
+    matrix_api.render_pool.start()
+    # SVG рисуется прямо в event loop: подложку для него готовим здесь, а не в первом запросе
+    prepare_svg_static(matrix_api.DEFAULT_BACKGROUND_PATH)
+    refresh_task = asyncio.create_task(_prognosis_midnight_refresh())
+    try:
+        yield
+    finally:
+        refresh_task.cancel()
+        gc_task.cancel()
+        executor.shutdown_pools()
+
+
+app = FastAPI(title="Numerology Mini App API", lifespan=lifespan)
+
+# Предрасчитанные матрицы судьбы 1900–2100 (MATRIX_TABLE=0 — отключить)
+init_matrix_table()
+
+# Пакет фрагментов интерпретаций (interpretations/*.json) — собираем один раз при старте
+get_pack()
+
+# Готовые тексты калькуляторов, зависящих только от даты рождения
+destiny_path_calc.precompute()
+birth_decoding_calc.precompute()
 
 # CORS — аккуратная настройка для Vercel фронта и Telegram Web
 FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "http://127.0.0.1:5173")
@@ -29,9 +104,32 @@ app.include_router(matrix_api.router)
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(ai_interpretation.router)
+app.include_router(executor.router)
 
 # Статика для картинок матрицы
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
 os.makedirs(STATIC_DIR, exist_ok=True)
 
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    Статика, содержимое которой по URL не меняется: ответ с долгим Cache-Control.
+    """
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = matrix_api.IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+# Картинки матрицы: в имени ключ версии отрисовки (см. matrix_api.variant_filename).
+# Монтируется раньше /static, иначе запрос заберёт общий обработчик
+IMAGE_CACHE_DIR = os.path.join(STATIC_DIR, matrix_api.IMAGE_CACHE_SUBDIR)
+os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+app.mount(
+    f"/static/{matrix_api.IMAGE_CACHE_SUBDIR}",
+    ImmutableStaticFiles(directory=IMAGE_CACHE_DIR),
+    name="matrix_images",
+)
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
\ No newline at end of file
@@ -1,22 +1,88 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from typing import List, Literal, Tuple
+
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import BaseModel, Field
+import logging
+import numpy as np
 import os
+import re
 from dotenv import load_dotenv
 
-from calculations import compute_matrix
-from drawing import draw_matrix
+from calculations import compute_matrix, compute_matrix_batch
+from calc.birth_date import BirthDate
+from drawing import (
+    DEFAULT_BACKGROUND_PATH,
+    IMAGE_FORMATS,
+    SIZE_TIERS,
+    image_side,
+    init_render_worker,
+    render_variant,
+    variant_key,
+)
+from drawing_svg import render_svg
+
+from .executor import SingleFlight, io_pool, pool_from_env, register_pool, register_single_flight
+from .image_cache import ImageCache
+from .image_store import ImageStore, LocalImageStore, S3ImageStore
+from .schemas import BirthDateField
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 BASE_URL = os.getenv("BASE_URL", "")
 
 router = APIRouter(prefix="/matrix", tags=["matrix"])
 
+# Отрисовка картинок матрицы: отдельные процессы (matplotlib держит GIL),
+# в каждом заранее загружены matplotlib и растры фона для всех размеров.
+# spawn — дочерние процессы не наследуют потоки и состояние сервера.
+render_pool = register_pool(pool_from_env(
+    "render",
+    workers=2,
+    max_queue=16,
+    timeout=30,
+    kind="process",
+    initializer=init_render_worker,
+    start_method="spawn",
+))
+
+# Одинаковые одновременные запросы картинки рисуются один раз
+render_flights = register_single_flight(SingleFlight("render"))
+
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
 os.makedirs(STATIC_DIR, exist_ok=True)
 
+# Локальный кэш картинок: /static/matrix/<шард>/<файл>, бюджет в МБ (IMAGE_CACHE_MAX_MB)
+IMAGE_CACHE_SUBDIR = "matrix"
+
+# Имя картинки содержит ключ входных данных отрисовки (drawing.variant_key),
+# содержимое по URL никогда не меняется — браузеры, CDN и Telegram могут хранить его сколько угодно
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+# Максимальное количество дат в одном пакетном запросе
+MAX_BATCH_SIZE = 10000
+
 
 class MatrixRequest(BaseModel):
-    birth_date: str  # 'dd.mm.yyyy'
+    birth_date: BirthDateField  # 'dd.mm.yyyy'
+
+
+class MatrixImageRequest(MatrixRequest):
+    format: Literal["webp", "jpeg", "png", "svg"] = "png"  # ключи drawing.IMAGE_FORMATS
+    size: Literal["thumb", "screen", "print"] = "print"  # ключи drawing.SIZE_TIERS
+    stream: bool = False  # True — вернуть саму картинку вместо JSON со ссылкой
+
+
+class MatrixBatchRequest(BaseModel):
+    birth_dates: List[BirthDateField] = Field(..., max_length=MAX_BATCH_SIZE)  # ['dd.mm.yyyy', ...]
+
+
+def _to_lists(data):
+    """Массивы numpy → списки (рекурсивно по вложенным словарям)."""
+    if isinstance(data, dict):
+        return {k: _to_lists(v) for k, v in data.items()}
+    return data.tolist()
 
 
 @router.post("/data")
@@ -38,59 +104,221 @@ def get_matrix_data(payload: MatrixRequest):
     return result
 
 
+@router.post("/data/batch")
+def get_matrix_data_batch(payload: MatrixBatchRequest):
+    """
+    Пакетный расчёт матриц: результат в колоночном виде
+    (для каждого показателя — список значений в порядке birth_dates).
+    """
+    dates = payload.birth_dates
+    day = np.fromiter((d.day for d in dates), dtype=np.int64, count=len(dates))
+    month = np.fromiter((d.month for d in dates), dtype=np.int64, count=len(dates))
+    year = np.fromiter((d.year for d in dates), dtype=np.int64, count=len(dates))
+
+    try:
+        columns = compute_matrix_batch(day, month, year)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result = _to_lists(columns)
+    result["birth_dates"] = [d.text for d in dates]
+    return result
+
+
+def _static_url(filename: str) -> str:
+    if BASE_URL:
+        return f"{BASE_URL.rstrip('/')}/static/{filename}"
+    # локально фронт ходит на http://localhost:8000
+    return f"http://localhost:8000/static/{filename}"
+
+
+def _create_image_store() -> ImageStore:
+    """
+    Хранилище картинок по переменной IMAGE_STORE (см. app/image_store.py):
+    local — папка static/matrix; s3 — бакет S3_BUCKET (S3_PREFIX, S3_ENDPOINT_URL,
+    S3_PUBLIC_URL — адрес CDN или публичный адрес бакета, S3_REGION, S3_ACL).
+    """
+    kind = os.getenv("IMAGE_STORE", "local").strip().lower()
+    if kind == "s3":
+        return S3ImageStore(
+            bucket=os.environ["S3_BUCKET"],
+            prefix=os.getenv("S3_PREFIX", "matrix/"),
+            endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+            public_url=os.getenv("S3_PUBLIC_URL") or None,
+            region=os.getenv("S3_REGION") or None,
+            cache_control=IMMUTABLE_CACHE_CONTROL,
+            acl=os.getenv("S3_ACL") or None,
+        )
+    if kind != "local":
+        raise ValueError(f"Неизвестное хранилище картинок IMAGE_STORE={kind}")
+    return LocalImageStore(
+        ImageCache(
+            root=os.path.join(STATIC_DIR, IMAGE_CACHE_SUBDIR),
+            max_bytes=int(float(os.getenv("IMAGE_CACHE_MAX_MB", "1024")) * 2**20),
+        ),
+        base_url=_static_url(IMAGE_CACHE_SUBDIR),
+    )
+
+
+image_store = _create_image_store()
+
+
+# matrix_<дд_мм_гггг>_<размер>_<ключ>.<расширение>; имена без ключа — до версионирования
+_VARIANT_NAME_RE = re.compile(r"^matrix_(\d{2}_\d{2}_\d{4})_([a-z]+)(?:_([0-9a-f]+))?\.([a-z]+)$")
+
+# matrix_<дд_мм_гггг>.png прямо в static/ — картинки до вариантов и хранилища
+_LEGACY_NAME_RE = re.compile(r"^matrix_\d{2}_\d{2}_\d{4}\.png$")
+
+_FORMAT_BY_EXTENSION = {extension: fmt for fmt, (_, _, extension, _) in IMAGE_FORMATS.items()}
+
+
+def variant_filename(birth_date, size: str, fmt: str) -> str:
+    """
+    Имя файла картинки в хранилище: дата, размер и ключ версии отрисовки
+    (drawing.variant_key), чтобы картинку новой версии не подменил старый кэш.
+    """
+    safe_date = birth_date.text.replace(".", "_")
+    key = variant_key(birth_date.text, SIZE_TIERS[size], fmt, DEFAULT_BACKGROUND_PATH)
+    return f"matrix_{safe_date}_{size}_{key}.{IMAGE_FORMATS[fmt][2]}"
+
+
+def _is_stale_variant(name: str) -> bool:
+    """
+    Картинка матрицы, которую текущая версия отрисовки назвала бы иначе
+    (другой ключ, размер или формат, которых больше нет). Чужие файлы не трогаются.
+    """
+    match = _VARIANT_NAME_RE.match(name)
+    if match is None:
+        return False
+    safe_date, size, _, extension = match.groups()
+    fmt = _FORMAT_BY_EXTENSION.get(extension)
+    if size not in SIZE_TIERS or fmt is None:
+        return True
+    try:
+        birth_date = BirthDate.parse(safe_date.replace("_", "."))
+    except ValueError:
+        return True
+    return name != variant_filename(birth_date, size, fmt)
+
+
+def collect_stale_images(dry_run: bool = False) -> Tuple[int, int]:
+    """
+    Сборщик старых версий: удалить из хранилища картинки, нарисованные прежней
+    версией отрисовки или с прежней подложкой. Возвращает число файлов и байт.
+    """
+    count, size = image_store.remove_stale(_is_stale_variant, dry_run=dry_run)
+    legacy_count, legacy_size = _remove_legacy_images(dry_run)
+    count += legacy_count
+    size += legacy_size
+    if count:
+        logger.info("Старые версии картинок: %d файлов, %.1f МБ%s", count, size / 2**20, " (не удалены)" if dry_run else "")
+    return count, size
+
+
+def _remove_legacy_images(dry_run: bool) -> Tuple[int, int]:
+    """
+    Картинки прежней схемы в корне static/ (одна PNG на дату): их больше никто
+    не запрашивает, а в бюджет кэша они не входят. Удаляются при любом IMAGE_STORE.
+    """
+    count = size = 0
+    with os.scandir(STATIC_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file() or not _LEGACY_NAME_RE.match(entry.name):
+                continue
+            try:
+                file_size = entry.stat().st_size
+                if not dry_run:
+                    os.remove(entry.path)
+            except OSError as e:
+                logger.warning("Не удалось удалить %s: %s", entry.path, e)
+                continue
+            count += 1
+            size += file_size
+    return count, size
+
+
+def _image_variants(birth_date) -> List[dict]:
+    """
+    Все варианты картинки для даты: формат, размер, URL и размер файла
+    (bytes = None — вариант ещё не нарисован, его можно запросить через format/size).
+    """
+    variants = []
+    for size, dpi in SIZE_TIERS.items():
+        side = image_side(dpi)
+        for fmt in IMAGE_FORMATS:
+            name = variant_filename(birth_date, size, fmt)
+            variants.append({
+                "format": fmt,
+                "size": size,
+                "width": side,
+                "height": side,
+                "url": image_store.url(name),
+                "bytes": image_store.peek(name),
+            })
+    return variants
+
+
+async def _render_variant(birth_date, size: str, fmt: str, name: str) -> bytes:
+    """
+    Нарисовать вариант (в пуле процессов отрисовки) и сохранить его в хранилище.
+    Возвращает содержимое файла.
+    """
+    if fmt == "svg":
+        # SVG собирается из готовых шаблонов за десятки микросекунд — без пула;
+        # статическая часть с подложкой собрана при старте (prepare_static в lifespan)
+        data = render_svg(compute_matrix(birth_date), image_side(SIZE_TIERS[size]), DEFAULT_BACKGROUND_PATH).encode("utf-8")
+    else:
+        data = await render_pool.run(
+            render_variant,
+            birth_date.text,
+            SIZE_TIERS[size],
+            fmt,
+            DEFAULT_BACKGROUND_PATH,
+        )
+    await io_pool.run(image_store.put, name, data, IMAGE_FORMATS[fmt][3])
+    return data
+
+
 @router.post("/image")
-def get_matrix_image(payload: MatrixRequest):
+async def get_matrix_image(payload: MatrixImageRequest):
     try:
-        safe_date = payload.birth_date.replace(".", "_")
-        filename = f"matrix_{safe_date}.png"
-        filepath = os.path.join(STATIC_DIR, filename)
-
-        # Проверяем, существует ли уже кэшированный файл
-        if os.path.exists(filepath):
-            # Файл уже существует, возвращаем его URL без пересчёта
-            if BASE_URL:
-                url = f"{BASE_URL.rstrip('/')}/static/{filename}"
-            else:
-                # локально фронт ходит на http://localhost:8000
-                url = f"http://localhost:8000/static/{filename}"
-
-            # Добавляем интерпретации цифр в ответ (пока заглушки)
-            digit_interpretations = {
-                str(d): f"Интерпретация цифры {d} (заглушка)"
-                for d in range(1, 10)
-            }
-
-            return {
-                "image_url": url,
-                "digit_interpretations": digit_interpretations
-            }
-
-        # Файла нет, нужно вычислить и нарисовать матрицу
-        try:
-            m = compute_matrix(payload.birth_date)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=str(e))
-
-        # Определяем путь к фоновому изображению
-        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        background_path = os.path.join(backend_dir, "man.png")
-        
-        # Проверяем существование фонового изображения
-        if not os.path.exists(background_path):
-            raise HTTPException(status_code=500, detail="Фоновое изображение не найдено")
-        
-        # ВАЖНО: передаём filename как именованный аргумент
-        try:
-            draw_matrix(m, filename=filepath, background_path=background_path)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Ошибка при создании изображения: {str(e)}")
-
-        # Формируем URL для фронта
-        if BASE_URL:
-            url = f"{BASE_URL.rstrip('/')}/static/{filename}"
-        else:
-            # локально фронт ходит на http://localhost:8000
-            url = f"http://localhost:8000/static/{filename}"
+        name = variant_filename(payload.birth_date, payload.size, payload.format)
+        data = None
+
+        # Каждый вариант (формат + размер) рисуется один раз и дальше берётся из хранилища.
+        # Проверка — в пуле io: у S3 это сетевой HEAD, event loop не должен его ждать
+        if await io_pool.run(image_store.lookup, name) is None:
+            # Проверяем существование фонового изображения
+            if not os.path.exists(DEFAULT_BACKGROUND_PATH):
+                raise HTTPException(status_code=500, detail="Фоновое изображение не найдено")
+
+            # Картинки нет — считаем и рисуем в пуле процессов отрисовки
+            # (при переполнении очереди или падении процесса — 503 с Retry-After, при таймауте — 504)
+            # Одновременные запросы того же варианта ждут один общий рендер
+            try:
+                data = await render_flights.run(name, lambda: _render_variant(
+                    payload.birth_date, payload.size, payload.format, name
+                ))
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Ошибка при создании изображения: {str(e)}")
+
+        if payload.stream:
+            # Картинка прямо в ответе, без второго запроса к /static или хранилищу
+            if data is None:
+                data = await io_pool.run(image_store.get, name)
+            if data is None:
+                # вытеснена между проверкой и чтением
+                data = await render_flights.run(name, lambda: _render_variant(
+                    payload.birth_date, payload.size, payload.format, name
+                ))
+            return Response(
+                content=data,
+                media_type=IMAGE_FORMATS[payload.format][3],
+                # байты те же, что по адресу из X-Image-URL (имя содержит ключ версии) — кэшируются навсегда
+                headers={"X-Image-URL": image_store.url(name), "Cache-Control": IMMUTABLE_CACHE_CONTROL},
+            )
 
         # Добавляем интерпретации цифр в ответ (пока заглушки)
         digit_interpretations = {
@@ -99,10 +327,21 @@ def get_matrix_image(payload: MatrixRequest):
         }
 
         return {
-            "image_url": url,
+            "image_url": image_store.url(name),
+            "format": payload.format,
+            "size": payload.size,
+            "variants": _image_variants(payload.birth_date),
             "digit_interpretations": digit_interpretations
         }
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Неожиданная ошибка: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Неожиданная ошибка: {str(e)}")
+
+
+@router.get("/image/cache")
+def get_image_cache_stats():
+    """
+    Состояние хранилища картинок: объём, попадания, вытеснения / записи.
+    """
+    return image_store.stats()
@@ -0,0 +1,25 @@
+"""
+Общие типы для Pydantic-схем запросов.
+"""
+from typing import Annotated
+
+from pydantic import PlainSerializer, PlainValidator, WithJsonSchema
+from pydantic_core import PydanticCustomError
+
+from calc.birth_date import BirthDate
+
+def _validate_birth_date(value) -> BirthDate:
+    try:
+        return BirthDate.coerce(value)
+    except ValueError as e:
+        raise PydanticCustomError("birth_date", str(e))
+
+
+# Дата рождения: разбирается и проверяется один раз на входе API,
+# в обработчик приходит готовый BirthDate, в ответах — строка 'ДД.ММ.ГГГГ'.
+BirthDateField = Annotated[
+    BirthDate,
+    PlainValidator(_validate_birth_date),
+    PlainSerializer(lambda d: d.text, return_type=str),
+    WithJsonSchema({"type": "string", "example": "30.07.1987"}),
+]
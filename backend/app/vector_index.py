@@ -0,0 +1,169 @@
+"""
+Векторный поиск по базе знаний (embedding чанков книг).
+
+- normalize_embeddings / top_k_rows — точный поиск по косинусному сходству:
+  матрица float32 с нормированными строками, умножение на вектор и argpartition;
+- IVFIndex — приближённый поиск IVF-flat: векторы разбиты на списки сферическим
+  k-means, запрос сравнивается с центроидами и просматривает только nprobe
+  ближайших списков. Строится скриптом индексации (scripts/index_books.py)
+  и сохраняется рядом с chunks.json.
+
+Строки матрицы переставляются в порядке списков (IVFIndex.order), поэтому каждый
+список — непрерывный срез матрицы: поиск не копирует векторы, а точный поиск
+по той же матрице работает как прежде.
+"""
+import hashlib
+import math
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+# Итерации k-means и максимум обучающих векторов на список (больше — только дольше)
+KMEANS_ITERATIONS = 20
+KMEANS_SAMPLES_PER_LIST = 256
+
+# Строк за один шаг назначения списков: ограничивает временную матрицу сходств
+ASSIGN_BLOCK = 8192
+
+
+def normalize_embeddings(vectors) -> np.ndarray:
+    """
+    Векторы (список списков или массив) → float32 C-порядка с единичной L2-нормой строк.
+    Нулевые векторы остаются нулевыми.
+    """
+    matrix = np.array(vectors, dtype=np.float32, order="C", ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.maximum(norms, 1e-10, out=norms)
+    matrix /= norms
+    return matrix
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Индексы k наибольших значений по последней оси, по убыванию.
+    argpartition — O(n) вместо полной сортировки; сортируются только k отобранных.
+    """
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    if k < n:
+        top = np.argpartition(scores, n - k, axis=-1)[..., n - k:]
+    else:
+        top = np.broadcast_to(np.arange(n), scores.shape)
+    order = np.argsort(np.take_along_axis(scores, top, axis=-1), axis=-1)[..., ::-1]
+    return np.take_along_axis(top, order, axis=-1)
+
+
+def fingerprint(embeddings: np.ndarray) -> str:
+    """
+    Отпечаток матрицы (форма и первые координаты строк): индекс, построенный
+    по другой версии chunks.json, не подходит и не загружается.
+    """
+    h = hashlib.sha1(str(embeddings.shape).encode())
+    h.update(np.ascontiguousarray(embeddings[:, :8]).tobytes())
+    return h.hexdigest()
+
+
+# ---------- K-MEANS ----------
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Номер ближайшего (по косинусу) центроида для каждой строки.
+    """
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK):
+        block = vectors[start:start + ASSIGN_BLOCK]
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    Центроиды (n_clusters, размерность) с единичной нормой для нормированных векторов.
+    Пустой кластер получает случайный вектор выборки.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    n_clusters = min(n_clusters, n)
+    max_samples = n_clusters * KMEANS_SAMPLES_PER_LIST
+    sample = vectors[np.sort(rng.choice(n, max_samples, replace=False))] if n > max_samples else vectors
+
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = normalize_embeddings(sums)
+    return centroids
+
+
+# ---------- IVF-FLAT ----------
+
+class IVFIndex:
+    """
+    Индекс IVF-flat над матрицей, переставленной в порядке order:
+    строки списка i — срез offsets[i]:offsets[i + 1].
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, source: str):
+        self.centroids = centroids  # (списков, размерность), float32, нормированы
+        self.order = order  # новая строка → строка исходной матрицы
+        self.offsets = offsets  # границы списков в переставленной матрице
+        self.source = source  # fingerprint исходной матрицы
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, n_lists: Optional[int] = None, seed: int = 0) -> "IVFIndex":
+        """
+        Индекс по нормированной матрице (normalize_embeddings).
+        По умолчанию ~sqrt(n) списков — по несколько десятков векторов в каждом.
+        """
+        n = len(embeddings)
+        if n_lists is None:
+            n_lists = max(1, round(math.sqrt(n)))
+        centroids = spherical_kmeans(embeddings, n_lists, seed=seed)
+        labels = _assign(embeddings, centroids)
+        order = np.argsort(labels, kind="stable").astype(np.int32)
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=len(centroids)), out=offsets[1:])
+        return cls(centroids, order, offsets, fingerprint(embeddings))
+
+    def save(self, path: Path) -> None:
+        # через временный файл: сервер не должен увидеть недописанный индекс
+        tmp_path = Path(path).with_suffix(".tmp.npz")
+        np.savez(tmp_path, centroids=self.centroids, order=self.order, offsets=self.offsets, source=np.array(self.source))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(
+                np.ascontiguousarray(data["centroids"], dtype=np.float32),
+                data["order"],
+                data["offsets"],
+                str(data["source"]),
+            )
+
+    def search(self, embeddings: np.ndarray, queries: np.ndarray, k: int, nprobe: int) -> List[np.ndarray]:
+        """
+        Top-k строк переставленной матрицы embeddings для каждого нормированного запроса
+        (queries — матрица (запросов, размерность)). Если в просмотренных списках
+        меньше k векторов, строк в ответе на этот запрос меньше.
+        """
+        nprobe = max(1, min(nprobe, self.n_lists))
+        probes = top_k_rows(queries @ self.centroids.T, nprobe)
+        results = []
+        for query, lists in zip(queries, probes):
+            rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+            scores = np.concatenate([embeddings[self.offsets[i]:self.offsets[i + 1]] @ query for i in lists])
+            results.append(rows[top_k_rows(scores, k)])
+        return results
@@ -1 +1,2 @@
 # Пакет с нумерологическими калькуляторами
+# Общее числовое ядро: сумма цифр и свёртки (digits.py)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import datetime as _dt
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Union
+
+# =====================================================
+# ДАТА РОЖДЕНИЯ КАК ОБЪЕКТ-ЗНАЧЕНИЕ
+# =====================================================
+#
+# Дата разбирается и проверяется один раз (на входе API),
+# дальше во все калькуляторы передаётся готовый BirthDate.
+# Одинаковые даты возвращают один и тот же (кешированный) объект.
+
+# ДД.ММ.ГГГГ / Д.М.ГГГГ, допускаются разделители "-" и "/"
+_DMY_RE = re.compile(r"\s*(\d{1,2})[.\-/](\d{1,2})[.\-/](\d{4})\s*")
+# ГГГГ-ММ-ДД (ISO)
+_ISO_RE = re.compile(r"\s*(\d{4})-(\d{1,2})-(\d{1,2})\s*")
+
+FORMAT_ERROR = "Неверный формат даты рождения. Ожидается ДД.ММ.ГГГГ"
+
+
+@dataclass(frozen=True)
+class BirthDate:
+    day: int
+    month: int
+    year: int
+
+    # каноническая строка 'ДД.ММ.ГГГГ' и порядковый номер даты
+    text: str = field(init=False, repr=False, compare=False)
+    ordinal: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        d = _dt.date(self.year, self.month, self.day)  # ValueError для несуществующих дат
+        object.__setattr__(self, "text", f"{self.day:02d}.{self.month:02d}.{self.year:04d}")
+        object.__setattr__(self, "ordinal", d.toordinal())
+
+    def __str__(self) -> str:
+        return self.text
+
+    @property
+    def date(self) -> _dt.date:
+        return _dt.date.fromordinal(self.ordinal)
+
+    @classmethod
+    def of(cls, day: int, month: int, year: int) -> "BirthDate":
+        """
+        Получить (кешированный) объект по дню, месяцу и году.
+        """
+        return _intern(int(day), int(month), int(year))
+
+    @classmethod
+    def parse(cls, value: str) -> "BirthDate":
+        """
+        Разобрать строку даты. Поддерживаются ДД.ММ.ГГГГ, Д.М.ГГГГ,
+        ДД-ММ-ГГГГ, ДД/ММ/ГГГГ и ГГГГ-ММ-ДД.
+        """
+        if not isinstance(value, str):
+            raise ValueError(FORMAT_ERROR)
+        return _parse(value)
+
+    @classmethod
+    def coerce(cls, value: Union[str, "BirthDate"]) -> "BirthDate":
+        """
+        BirthDate возвращаем как есть, строку — разбираем.
+        """
+        if isinstance(value, BirthDate):
+            return value
+        return cls.parse(value)
+
+
+@lru_cache(maxsize=65536)
+def _intern(day: int, month: int, year: int) -> BirthDate:
+    return BirthDate(day, month, year)
+
+
+@lru_cache(maxsize=65536)
+def _parse(value: str) -> BirthDate:
+    m = _DMY_RE.fullmatch(value)
+    if m:
+        day, month, year = map(int, m.groups())
+    else:
+        m = _ISO_RE.fullmatch(value)
+        if not m:
+            raise ValueError(FORMAT_ERROR)
+        year, month, day = map(int, m.groups())
+
+    try:
+        return _intern(day, month, year)
+    except ValueError:
+        raise ValueError(f"Несуществующая дата: {value.strip()}") from None
@@ -1,23 +1,10 @@
 from __future__ import annotations
 
-import json
-from functools import lru_cache
-from pathlib import Path
+from typing import Dict, Tuple, Union
 
-
-# Базовая директория проекта (папка numerology_bot/xxx)
-BASE_DIR = Path(__file__).resolve().parents[2]
-INTERPRETATIONS_DIR = BASE_DIR / "interpretations"
-
-
-@lru_cache(maxsize=None)
-def _load_json(filename: str) -> dict:
-    """
-    Загружаем JSON из папки interpretations один раз и кешируем.
-    """
-    path = INTERPRETATIONS_DIR / filename
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+from calc.birth_date import BirthDate
+from calc.digits import digit_sum
+from calc.fragments import get_pack
 
 
 def _calc_birth_energy(day: int) -> int:
@@ -28,36 +15,21 @@ def _calc_birth_energy(day: int) -> int:
     """
     if 1 <= day <= 22:
         return day
-    return sum(int(d) for d in str(day))
+    return digit_sum(day)
 
 
-def calculate(birth_date: str) -> str:
+def _render_body(day: int, month: int) -> str:
     """
-    Основной калькулятор «Расшифровка по дате рождения».
-
-    birth_date ожидается в формате 'ДД.ММ.ГГГГ',
-    как и сохраняется в состоянии бота.
+    Текст расшифровки без заголовка. Зависит только от дня и месяца.
     """
-    day_str, month_str, *_ = birth_date.strip().split(".")
-    day = int(day_str)
-    month = int(month_str)
-
-    # Загружаем интерпретации
-    birth_day_data = _load_json("birth_day.json")
-    last_day_data = _load_json("last_day.json")
-    birth_month_data = _load_json("birth_month.json")
+    # Интерпретации из общего пакета фрагментов
+    pack = get_pack()
 
     lines: list[str] = []
 
-    # Заголовок
-    lines.append("🔢 Расшифровка по дате рождения")
-    lines.append("")
-    lines.append(f"Дата рождения: {birth_date}")
-    lines.append("")
-
     # 1. Энергия дня рождения (1–22, либо сумма цифр дня, если > 22)
     energy_num = _calc_birth_energy(day)
-    energy_text = birth_day_data.get(str(energy_num))
+    energy_text = pack.text(pack.table("birth_day").id(energy_num))
     if energy_text:
         lines.append("Энергия дня рождения")
         lines.append("-" * 30)
@@ -65,8 +37,8 @@ def calculate(birth_date: str) -> str:
         lines.append("")
 
     # 2. Интерпретация по дню рождения (1–31, + общий вступительный текст)
-    day_intro = last_day_data.get("intro")
-    day_text = last_day_data.get(str(day))
+    day_intro = pack.scalar("last_day.intro")
+    day_text = pack.text(pack.table("last_day").id(day))
 
     if day_intro or day_text:
         lines.append("Информация по дню рождения")
@@ -81,8 +53,8 @@ def calculate(birth_date: str) -> str:
             lines.append("")
 
     # 3. Интерпретация по месяцу рождения (1–12, + общий вступительный текст)
-    month_intro = birth_month_data.get("intro")
-    month_text = birth_month_data.get(str(month))
+    month_intro = pack.scalar("birth_month.intro")
+    month_text = pack.text(pack.table("birth_month").id(month))
 
     if month_intro or month_text:
         lines.append("Информация по месяцу рождения")
@@ -96,4 +68,44 @@ def calculate(birth_date: str) -> str:
             lines.append(month_text.strip())
             lines.append("")
 
-    return "\n".join(lines).strip()
+    return "\n".join(lines).rstrip()
+
+
+# =====================================================
+# ГОТОВЫЕ ТЕКСТЫ ДЛЯ ВСЕХ КЛЮЧЕЙ
+# =====================================================
+#
+# Текст зависит только от дня и месяца (31 × 12 ключей), поэтому все
+# варианты считаются заранее; к готовому тексту добавляется только заголовок с датой.
+_BODIES: Dict[Tuple[int, int], str] | None = None
+
+
+def precompute() -> int:
+    """
+    Посчитать тексты для всех пар (день, месяц). Возвращает количество ключей.
+    """
+    global _BODIES
+    _BODIES = {
+        (day, month): _render_body(day, month)
+        for day in range(1, 32)
+        for month in range(1, 13)
+    }
+    return len(_BODIES)
+
+
+def calculate(birth_date: Union[str, BirthDate]) -> str:
+    """
+    Основной калькулятор «Расшифровка по дате рождения».
+
+    birth_date — BirthDate или строка в формате 'ДД.ММ.ГГГГ',
+    как и сохраняется в состоянии бота.
+    """
+    birth_date = BirthDate.coerce(birth_date)
+
+    if _BODIES is None:
+        precompute()
+    body = _BODIES[(birth_date.day, birth_date.month)]
+
+    # Заголовок
+    text = f"🔢 Расшифровка по дате рождения\n\nДата рождения: {birth_date}"
+    return text + "\n\n" + body if body else text
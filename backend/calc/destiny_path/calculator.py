@@ -1,97 +1,54 @@
 from __future__ import annotations
 
-import json
-import re
-from pathlib import Path
-from typing import Any, Dict
+from typing import Dict, Optional, Tuple, Union
 
+from calc.birth_date import BirthDate
+from calc.digits import digit_sum, reduce_to_9
+from calc.fragments import get_pack
 
-_INTERPRETATIONS_CACHE: Dict[str, Any] | None = None
 
-
-def _load_interpretations() -> Dict[str, Any]:
+def _reduce_to_one_digit(n: int) -> int:
     """
-    Загружаем 3-ю и 4-ю зоны один раз и кешируем.
-    Путь считается от корня проекта: ../.. от этого файла → корень бота.
+    Сводим число к однозначному (1–9), суммируя цифры, пока > 9.
     """
-    global _INTERPRETATIONS_CACHE
-    if _INTERPRETATIONS_CACHE is not None:
-        return _INTERPRETATIONS_CACHE
-
-    base_dir = Path(__file__).resolve().parents[2]
-    interpretations_dir = base_dir / "interpretations"
-
-    with open(interpretations_dir / "3_zone.json", "r", encoding="utf-8") as f:
-        zone3 = json.load(f)
-
-    with open(interpretations_dir / "4_zone.json", "r", encoding="utf-8") as f:
-        zone4_default = json.load(f)
-
-    # Может быть пустым/ещё не заполненным — это нормально
-    zone4_2000_path = interpretations_dir / "4_zone_2000.json"
-    if zone4_2000_path.exists():
-        with open(zone4_2000_path, "r", encoding="utf-8") as f:
-            zone4_2000 = json.load(f)
-    else:
-        zone4_2000 = {}
+    return reduce_to_9(abs(n))
 
-    _INTERPRETATIONS_CACHE = {
-        "3": zone3,
-        "4_default": zone4_default,
-        "4_2000": zone4_2000,
-    }
-    return _INTERPRETATIONS_CACHE
 
-
-def _parse_birth_date(birth_date: str) -> tuple[int, int, int]:
-    """
-    Принимаем строку формата ДД.MM.ГГГГ (или D.M.YYYY)
-    и возвращаем (day, month, year).
+def _zone_numbers(day: int, month: int, year: int) -> tuple[int, int | None]:
     """
-    match = re.fullmatch(r"\s*(\d{1,2})\.(\d{1,2})\.(\d{4})\s*", birth_date)
-    if not match:
-        raise ValueError("Неверный формат даты рождения. Ожидается ДД.ММ.ГГГГ")
-
-    day, month, year = map(int, match.groups())
-    return day, month, year
-
+    Числа, от которых зависит весь текст (кроме даты в заголовке).
 
-def _sum_digits(n: int) -> int:
-    return sum(int(d) for d in str(abs(n)) if d.isdigit())
-
-
-def _reduce_to_one_digit(n: int) -> int:
+    1) Число 1 — сумма всех цифр даты рождения (ДДММГГГГ).
+    2) Число 3 = число 1 - (первая_цифра_дня * 2); None, если получилось <= 0.
     """
-    Сводим число к однозначному (1–9), суммируя цифры, пока > 9.
-    """
-    n = abs(n)
-    while n > 9:
-        n = _sum_digits(n)
-    return n
+    num1 = digit_sum(day) + digit_sum(month) + digit_sum(year)
+
+    first_digit = _first_nonzero_day_digit(day)
+    num3 = num1 - first_digit * 2
+    if num3 <= 0:
+        # Не очень типичный, но возможный кейс — просто не даём интерпретацию
+        return num1, None
+    return num1, num3
 
 
-def _calculate_zone3(day: int, month: int, year: int, zone3: Dict[str, Any]) -> tuple[int, int, str, str]:
+def _calculate_zone3(num1: int) -> tuple[int, str, str]:
     """
     Расчёт для 3_zone.json (Число жизненного пути).
 
-    1) Число 1 — сумма всех цифр даты рождения.
-    2) Число 2 — сумма цифр числа 1 (сводим к однозначному).
+    Число 2 — сумма цифр числа 1 (сводим к однозначному).
     Интерпретацию берём по цифре 2.
     """
-    # формируем строку из даты в виде ДДММГГГГ и суммируем все цифры
-    date_digits = f"{day:02d}{month:02d}{year:04d}"
-    num1 = sum(int(d) for d in date_digits)
-
     num2 = _reduce_to_one_digit(num1)
-    key = str(num2)
 
-    if key not in zone3:
+    pack = get_pack()
+    titles = pack.table("zone3.title")
+    if num2 not in titles:
         raise KeyError(f"В 3_zone.json нет интерпретации для числа {num2}")
 
-    title = zone3[key].get("title", "").strip()
-    description = zone3[key].get("description", "").strip()
+    title = pack.text(titles.id(num2)).strip()
+    description = pack.text(pack.table("zone3.description").id(num2)).strip()
 
-    return num1, num2, title, description
+    return num2, title, description
 
 
 def _first_nonzero_day_digit(day: int) -> int:
@@ -107,88 +64,48 @@ def _first_nonzero_day_digit(day: int) -> int:
 
 
 def _calculate_zone4(
-    day: int,
-    month: int,
-    year: int,
-    zone4_default: Dict[str, Any],
-    zone4_2000: Dict[str, Any],
-) -> tuple[int | None, int | None, str | None, str | None, str | None]:
+    num3: int | None,
+    born_2000: bool,
+) -> tuple[int | None, str | None, str | None, str | None]:
     """
     Расчёт для 4_zone.json / 4_zone_2000.json.
 
-    1) Число 1 — сумма всех цифр даты рождения (то же, что и в зоне 3).
-    2) Берём первую цифру даты рождения (дня). Если день начинается на 0 — берём вторую.
-       Умножаем её на 2.
-    3) Число 3 = число 1 - (первая_цифра_дня * 2).
-    4) Число 4 = сумма цифр числа 3, сведённая к однозначному.
+    Число 4 = сумма цифр числа 3, сведённая к однозначному.
     Интерпретацию (base) берём по числу 4.
     Shades берём по ключу \"ЧИСЛО_3/ЧИСЛО_4\" из словаря shades.
     Для людей до 2000 года включительно — берём 4_zone.json,
     для 2000 и дальше — 4_zone_2000.json.
     """
-    # Число 1 (как в зоне 3)
-    date_digits = f"{day:02d}{month:02d}{year:04d}"
-    num1 = sum(int(d) for d in date_digits)
-
-    first_digit = _first_nonzero_day_digit(day)
-    num3 = num1 - first_digit * 2
-
-    if num3 <= 0:
-        # Не очень типичный, но возможный кейс — просто не даём интерпретацию
-        return None, None, None, None, None
+    if num3 is None:
+        return None, None, None, None
 
     num4 = _reduce_to_one_digit(num3)
 
     # Выбор набора интерпретаций по году рождения
-    if year < 2000:
-        zone4 = zone4_default
-    else:
-        zone4 = zone4_2000
-
-    base_title = base_description = shade_title = shade_description = None
-    base_key = str(num4)
+    prefix = "zone4.2000" if born_2000 else "zone4.default"
+    pack = get_pack()
 
-    if isinstance(zone4, dict) and base_key in zone4:
-        base_block = zone4[base_key].get("base") or {}
-        base_title = base_block.get("title", "").strip() or None
-        base_description = base_block.get("description", "").strip() or None
+    base_title = pack.text(pack.table(f"{prefix}.base.title").id(num4)).strip() or None
+    base_description = pack.text(pack.table(f"{prefix}.base.description").id(num4)).strip() or None
+    # оттенок по ключу "ЧИСЛО_3/ЧИСЛО_4": таблица блока ЧИСЛА_4, индекс — ЧИСЛО_3
+    shade_description = pack.text(pack.table(f"{prefix}.shades.{num4}").id(num3)).strip() or None
 
-        shade_key = f"{num3}/{num4}"
-        shades = zone4[base_key].get("shades") or {}
-        shade_block = shades.get(shade_key)
-        if shade_block:
-            shade_title = shade_block.get("title", "").strip() or None
-            shade_description = shade_block.get("description", "").strip() or None
+    return num4, base_title, base_description, shade_description
 
-    return num3, num4, base_title, base_description, shade_description
 
-
-def _calculate_internal(birth_date: str) -> str:
+def _render_body(num1: int, num3: int | None, born_2000: bool) -> str:
     """
-    Основная логика калькулятора пути предназначения.
+    Текст 3-й и 4-й зон. Зависит только от (число 1, число 3, год >= 2000).
     Использует 3_zone.json и 4_zone.json / 4_zone_2000.json.
     """
-    day, month, year = _parse_birth_date(birth_date)
-    data = _load_interpretations()
-
-    zone3 = data["3"]
-    zone4_default = data["4_default"]
-    zone4_2000 = data["4_2000"]
-
     # ---- 3 зона (число жизненного пути) ----
-    num1, num2, title3, desc3 = _calculate_zone3(day, month, year, zone3)
+    num2, title3, desc3 = _calculate_zone3(num1)
 
     # ---- 4 зона ----
-    num3, num4, base_title4, base_desc4, shade_desc4 = _calculate_zone4(
-        day, month, year, zone4_default, zone4_2000
-    )
+    num4, base_title4, base_desc4, shade_desc4 = _calculate_zone4(num3, born_2000)
 
     parts: list[str] = []
 
-    # Заголовок
-    parts.append("🧭 <b>Путь предназначения</b>\n\n")
-    parts.append(f"Дата: <b>{birth_date}</b>\n\n")
-
     # --------- Блок 3-й зоны ---------
     parts.append(f"<b>{title3}</b>\n")
     parts.append(f"<b>{num1}/{num2}</b>\n\n")
@@ -204,7 +121,7 @@ def _calculate_internal(birth_date: str) -> str:
             parts.append(shade_desc4.strip() + "\n\n")
     else:
         # Если для года 2000+ ещё нет интерпретаций
-        if year >= 2000:
+        if born_2000:
             parts.append(
                 "<b>4-я зона</b>\n\n"
                 "Интерпретации для 4-й зоны для людей, рождённых в 2000 году и позже, "
@@ -216,17 +133,79 @@ def _calculate_internal(birth_date: str) -> str:
             else:
                 parts.append("\n\n")
 
-    return "".join(parts).strip()
+    return "".join(parts).rstrip()
+
+
+# =====================================================
+# ГОТОВЫЕ ТЕКСТЫ ДЛЯ ВСЕХ КЛЮЧЕЙ
+# =====================================================
+#
+# Ключей (число 1, число 3, год >= 2000) для реальных дат всего несколько сотен,
+# поэтому все тексты считаются заранее (precompute) и запрос — это один поиск в словаре.
+
+# Годы, для которых ключи перечисляются заранее; остальные считаются на лету
+PRECOMPUTE_YEARS = range(1900, 2101)
+
+_BODIES: Dict[Tuple[int, Optional[int], bool], str] | None = None
+
+
+def precompute() -> int:
+    """
+    Посчитать тексты для всех ключей, встречающихся у дат из PRECOMPUTE_YEARS.
+    Возвращает количество ключей.
+    """
+    global _BODIES
+    # годы с одинаковой суммой цифр (по одну сторону от 2000) дают одни и те же ключи
+    years = {(digit_sum(y), y >= 2000): y for y in PRECOMPUTE_YEARS}.values()
+
+    bodies: Dict[Tuple[int, Optional[int], bool], str] = {}
+    for day in range(1, 32):
+        for month in range(1, 13):
+            for year in years:
+                num1, num3 = _zone_numbers(day, month, year)
+                born_2000 = year >= 2000
+                key = (num1, num3, born_2000)
+                if key in bodies:
+                    continue
+                try:
+                    bodies[key] = _render_body(num1, num3, born_2000)
+                except KeyError:
+                    # нет интерпретации — такие даты обработает обычный путь (с ошибкой)
+                    continue
+
+    _BODIES = bodies
+    return len(bodies)
+
+
+def _calculate_internal(birth_date: BirthDate) -> str:
+    """
+    Основная логика калькулятора пути предназначения.
+    """
+    num1, num3 = _zone_numbers(birth_date.day, birth_date.month, birth_date.year)
+    born_2000 = birth_date.year >= 2000
+
+    if _BODIES is None:
+        precompute()
+    body = _BODIES.get((num1, num3, born_2000))
+    if body is None:
+        body = _render_body(num1, num3, born_2000)
+
+    # Заголовок
+    return (
+        "🧭 <b>Путь предназначения</b>\n\n"
+        f"Дата: <b>{birth_date}</b>\n\n"
+        + body
+    )
 
 
-def calculate(birth_date: str) -> str:
+def calculate(birth_date: Union[str, BirthDate]) -> str:
     """
     Публичная функция, которую вызывает бот.
-    На вход получает строку даты рождения в формате ДД.ММ.ГГГГ,
+    На вход получает BirthDate или строку даты рождения в формате ДД.ММ.ГГГГ,
     на выход — готовый текст с 3-й зоной и 4-й зоной пути предназначения.
     """
     try:
-        return _calculate_internal(birth_date)
+        return _calculate_internal(BirthDate.coerce(birth_date))
     except Exception:
         return (
             "🧭 <b>Путь предназначения</b>\n\n"
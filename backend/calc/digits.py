@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from typing import List
+
+# =====================================================
+# ОБЩЕЕ ЧИСЛОВОЕ ЯДРО: СУММА ЦИФР И СВЁРТКИ
+# =====================================================
+#
+# Все калькуляторы сводят числа суммой цифр к диапазонам 1–9, 1–12 или 1–22.
+# Вместо str()/int() на каждом шаге держим готовые таблицы для 0..TABLE_SIZE-1
+# (покрывает годы до 9999 и любые суммы, которые встречаются в расчётах).
+# Числа за пределами таблицы обрабатываются обычным циклом.
+
+TABLE_SIZE = 10000
+
+
+def _build_digit_sum_table(size: int) -> List[int]:
+    table = [0] * size
+    for n in range(1, size):
+        table[n] = table[n // 10] + n % 10
+    return table
+
+
+def _build_reduce_table(digit_sums: List[int], limit: int) -> List[int]:
+    """
+    Таблица свёртки: пока n > limit — заменяем n на сумму его цифр.
+    Сумма цифр всегда меньше самого числа, поэтому хватает одного прохода.
+    """
+    table = list(range(len(digit_sums)))
+    for n in range(limit + 1, len(digit_sums)):
+        table[n] = table[digit_sums[n]]
+    return table
+
+
+def _build_master_table(digit_sums: List[int]) -> List[int]:
+    table = list(range(len(digit_sums)))
+    for n in range(10, len(digit_sums)):
+        if n not in MASTER_NUMBERS:
+            table[n] = table[digit_sums[n]]
+    return table
+
+
+# Мастер-числа, которые не сворачиваются в reduce_to_9_master
+MASTER_NUMBERS = frozenset((11, 22, 33))
+
+DIGIT_SUM_TABLE = _build_digit_sum_table(TABLE_SIZE)
+REDUCE_9_TABLE = _build_reduce_table(DIGIT_SUM_TABLE, 9)
+REDUCE_12_TABLE = _build_reduce_table(DIGIT_SUM_TABLE, 12)
+REDUCE_22_TABLE = _build_reduce_table(DIGIT_SUM_TABLE, 22)
+REDUCE_9_MASTER_TABLE = _build_master_table(DIGIT_SUM_TABLE)
+
+
+# =====================================================
+# ПУБЛИЧНЫЕ ФУНКЦИИ
+# =====================================================
+
+def digit_sum(n: int) -> int:
+    """
+    Сумма цифр числа (знак игнорируется): 1987 → 25.
+    """
+    if n < 0:
+        n = -n
+    if n < TABLE_SIZE:
+        return DIGIT_SUM_TABLE[n]
+    s = 0
+    while n:
+        s += n % 10
+        n //= 10
+    return s
+
+
+def _reduce_slow(n: int, limit: int) -> int:
+    # числа вне таблицы сворачиваем обычным циклом
+    while n > limit:
+        n = digit_sum(n)
+    return n
+
+
+def reduce_to_9(n: int) -> int:
+    """
+    Пока число > 9 — складываем цифры (22 → 4, 11 → 2).
+    Значения <= 9 возвращаются как есть.
+    """
+    if 0 <= n < TABLE_SIZE:
+        return REDUCE_9_TABLE[n]
+    return _reduce_slow(n, 9)
+
+
+def reduce_to_12(n: int) -> int:
+    """
+    Пока число > 12 — складываем цифры. Значения <= 12 возвращаются как есть.
+    """
+    if 0 <= n < TABLE_SIZE:
+        return REDUCE_12_TABLE[n]
+    return _reduce_slow(n, 12)
+
+
+def reduce_to_22(n: int) -> int:
+    """
+    Сведение к аркану: пока число > 22 — складываем цифры.
+    Значения <= 22 возвращаются как есть.
+    """
+    if 0 <= n < TABLE_SIZE:
+        return REDUCE_22_TABLE[n]
+    return _reduce_slow(n, 22)
+
+
+def reduce_to_9_master(n: int) -> int:
+    """
+    Как reduce_to_9, но мастер-числа 11, 22, 33 не сворачиваются.
+    """
+    if 0 <= n < TABLE_SIZE:
+        return REDUCE_9_MASTER_TABLE[n]
+    while n > 9 and n not in MASTER_NUMBERS:
+        n = digit_sum(n)
+    return n
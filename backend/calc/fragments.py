@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# =====================================================
+# ЕДИНЫЙ ПАКЕТ ФРАГМЕНТОВ ИНТЕРПРЕТАЦИЙ
+# =====================================================
+#
+# Все interpretations/*.json компилируются в один пакет:
+# - fragments — плоский список текстов, индекс в нём = ID фрагмента внутри
+#               пакета. Он зависит от порядка и содержимого всех исходников
+#               (правка одного текста сдвигает ID следующих), поэтому наружу
+#               (API, клиенты) отдаётся ключ фрагмента — хеш его текста
+#               (fragment_key): он меняется, только если меняется сам текст;
+# - tables    — целочисленные таблицы «число → ID фрагмента». Ключи-корзины
+#               вида "1-2", "3-5", "6+" разворачиваются в таблицы заранее,
+#               поэтому калькуляторам не нужны цепочки if и строковые ключи;
+# - scalars   — одиночные фрагменты (intro, header, base и т.п.) по имени.
+#
+# Собранный пакет можно сохранить в interpretations/fragments.pack.json
+# (python -m calc.fragments). При загрузке он используется, только если
+# хеш исходных JSON совпадает, иначе пакет компилируется из исходников.
+
+PACK_VERSION = 1
+
+INTERPRETATIONS_DIR = Path(__file__).resolve().parents[1] / "interpretations"
+PACK_FILENAME = "fragments.pack.json"
+
+# Порядок исходников фиксирован — от него зависят ID фрагментов внутри пакета
+SOURCES = (
+    "pifagor.json",
+    "3_zone.json",
+    "4_zone.json",
+    "4_zone_2000.json",
+    "calendar_year.json",
+    "calendar_month.json",
+    "calendar_day.json",
+    "birth_day.json",
+    "last_day.json",
+    "birth_month.json",
+)
+
+NO_FRAGMENT = -1
+
+# Длина ключа фрагмента (hex-символов SHA-256 текста)
+FRAGMENT_KEY_LENGTH = 16
+
+# "5" / "1-2" / "6+"
+_BUCKET_RE = re.compile(r"(\d+)(?:-(\d+)|(\+))?")
+
+
+def fragment_key(text: str) -> str:
+    """
+    Стабильный ключ фрагмента для клиентов: не зависит от положения текста в пакете.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:FRAGMENT_KEY_LENGTH]
+
+
+class FragmentTable:
+    """
+    Таблица «число → ID фрагмента». Для корзины вида "N+" (open_ended)
+    все числа больше последнего индекса попадают в последнюю ячейку.
+    """
+
+    __slots__ = ("ids", "open_ended")
+
+    def __init__(self, ids: List[int], open_ended: bool = False):
+        self.ids = ids
+        self.open_ended = open_ended
+
+    def id(self, n: int) -> int:
+        ids = self.ids
+        if n < 0:
+            return NO_FRAGMENT
+        if n >= len(ids):
+            return ids[-1] if self.open_ended and ids else NO_FRAGMENT
+        return ids[n]
+
+    def __contains__(self, n: int) -> bool:
+        return self.id(n) != NO_FRAGMENT
+
+
+class FragmentPack:
+    def __init__(
+        self,
+        fragments: List[str],
+        tables: Dict[str, FragmentTable],
+        scalars: Dict[str, int],
+        source_hash: str = "",
+    ):
+        self.fragments = fragments
+        self.tables = tables
+        self.scalars = scalars
+        self.source_hash = source_hash
+        # ключи не сохраняются в fragments.pack.json — считаются по текстам при загрузке
+        self.keys = [fragment_key(t) for t in fragments]
+
+    def key(self, fragment_id: int) -> Optional[str]:
+        """
+        Ключ фрагмента по ID в пакете (None — фрагмента нет).
+        """
+        if fragment_id < 0:
+            return None
+        return self.keys[fragment_id]
+
+    def text(self, fragment_id: int, default: str = "") -> str:
+        if fragment_id < 0:
+            return default
+        return self.fragments[fragment_id]
+
+    def table(self, name: str) -> FragmentTable:
+        """
+        Таблица по имени; отсутствующая таблица ведёт себя как пустая.
+        """
+        return self.tables.get(name) or _EMPTY_TABLE
+
+    def scalar(self, name: str, default: str = "") -> str:
+        return self.text(self.scalars.get(name, NO_FRAGMENT), default)
+
+    # ---------- сериализация ----------
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": PACK_VERSION,
+            "source_hash": self.source_hash,
+            "fragments": self.fragments,
+            "tables": {
+                name: {"ids": t.ids, "open_ended": t.open_ended}
+                for name, t in self.tables.items()
+            },
+            "scalars": self.scalars,
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "FragmentPack":
+        if data.get("version") != PACK_VERSION:
+            raise ValueError("Неподдерживаемая версия пакета фрагментов")
+        return cls(
+            fragments=data["fragments"],
+            tables={
+                name: FragmentTable(t["ids"], t["open_ended"])
+                for name, t in data["tables"].items()
+            },
+            scalars=data["scalars"],
+            source_hash=data.get("source_hash", ""),
+        )
+
+
+_EMPTY_TABLE = FragmentTable([])
+
+
+# =====================================================
+# КОМПИЛЯЦИЯ
+# =====================================================
+
+class _Builder:
+    def __init__(self):
+        self.fragments: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.tables: Dict[str, FragmentTable] = {}
+        self.scalars: Dict[str, int] = {}
+
+    def add(self, text: Optional[str]) -> int:
+        """
+        Добавить фрагмент (одинаковые тексты получают один ID).
+        """
+        if text is None:
+            return NO_FRAGMENT
+        fid = self._ids.get(text)
+        if fid is None:
+            fid = len(self.fragments)
+            self.fragments.append(text)
+            self._ids[text] = fid
+        return fid
+
+    def set(self, table: str, n: int, text: Optional[str], open_ended: bool = False) -> None:
+        fid = self.add(text)
+        if fid == NO_FRAGMENT:
+            return
+        t = self.tables.setdefault(table, FragmentTable([]))
+        if len(t.ids) <= n:
+            t.ids.extend([NO_FRAGMENT] * (n + 1 - len(t.ids)))
+        t.ids[n] = fid
+        t.open_ended = t.open_ended or open_ended
+
+    def scalar(self, name: str, text: Optional[str]) -> None:
+        fid = self.add(text)
+        if fid != NO_FRAGMENT:
+            self.scalars[name] = fid
+
+    def buckets(
+        self,
+        name: str,
+        mapping: Dict[str, Any],
+        value: Callable[[Any], Optional[str]] = lambda v: v,
+    ) -> None:
+        """
+        Разложить словарь вида {"0": ..., "1-2": ..., "6+": ..., "intro": ...}:
+        числовые ключи и корзины → таблица name, остальные → scalars name.key.
+        """
+        for key, raw in mapping.items():
+            m = _BUCKET_RE.fullmatch(key)
+            if not m:
+                self.scalar(f"{name}.{key}", raw if isinstance(raw, str) else None)
+                continue
+            lo = int(m.group(1))
+            hi = int(m.group(2)) if m.group(2) else lo
+            for n in range(lo, hi + 1):
+                self.set(name, n, value(raw), open_ended=bool(m.group(3)))
+
+
+def _text_field(field: str) -> Callable[[Any], Optional[str]]:
+    def get(v: Any) -> Optional[str]:
+        if isinstance(v, dict):
+            return v.get(field)
+        return None
+    return get
+
+
+def _compile_pifagor(b: _Builder, data: Dict[str, Any]) -> None:
+    for digit, block in data.get("digits", {}).items():
+        b.buckets(f"pifagor.digits.{digit}", block)
+    for row, block in data.get("rows", {}).items():
+        b.buckets(f"pifagor.rows.{row}", block)
+    for diag, block in data.get("diagonals", {}).items():
+        b.buckets(f"pifagor.diagonals.{diag}", block)
+    for key, text in data.get("psychotype", {}).items():
+        b.scalar(f"pifagor.psychotype.{key}", text)
+    b.scalar("pifagor.pereliv.text", data.get("pereliv", {}).get("text"))
+
+
+def _compile_zone3(b: _Builder, data: Dict[str, Any]) -> None:
+    # пустая строка вместо отсутствующего поля: наличие записи в таблице = наличие числа в JSON
+    b.buckets("zone3.title", data, lambda v: v.get("title", "") if isinstance(v, dict) else None)
+    b.buckets("zone3.description", data, lambda v: v.get("description", "") if isinstance(v, dict) else None)
+
+
+def _compile_zone4(b: _Builder, data: Dict[str, Any], variant: str) -> None:
+    if not isinstance(data, dict):
+        return
+    prefix = f"zone4.{variant}"
+    for key, block in data.items():
+        num4 = int(key)
+        base = block.get("base") or {}
+        b.set(f"{prefix}.base.title", num4, base.get("title"))
+        b.set(f"{prefix}.base.description", num4, base.get("description"))
+        # Оттенки ищутся по ключу "ЧИСЛО_3/ЧИСЛО_4" внутри блока ЧИСЛА_4,
+        # поэтому достижимы только ключи, где ЧИСЛО_4 совпадает с ключом блока
+        for shade_key, shade in (block.get("shades") or {}).items():
+            num3, _, shade_num4 = shade_key.partition("/")
+            if shade_num4 == key and num3.isdigit():
+                b.set(f"{prefix}.shades.{num4}", int(num3), shade.get("description"))
+
+
+def compile_pack(interpretations_dir: Path = INTERPRETATIONS_DIR) -> FragmentPack:
+    """
+    Скомпилировать все JSON интерпретаций в один пакет.
+    """
+    sources = _read_sources(interpretations_dir)
+    b = _Builder()
+
+    _compile_pifagor(b, sources["pifagor.json"])
+    _compile_zone3(b, sources["3_zone.json"])
+    _compile_zone4(b, sources["4_zone.json"], "default")
+    _compile_zone4(b, sources["4_zone_2000.json"], "2000")
+    for name in ("year", "month", "day"):
+        b.buckets(f"calendar.{name}", sources[f"calendar_{name}.json"], _text_field("text"))
+    for name in ("birth_day", "last_day", "birth_month"):
+        b.buckets(name, sources[f"{name}.json"])
+
+    return FragmentPack(b.fragments, b.tables, b.scalars, _source_hash(interpretations_dir))
+
+
+def _read_sources(interpretations_dir: Path) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    for filename in SOURCES:
+        path = interpretations_dir / filename
+        # 4_zone_2000.json может отсутствовать или быть пустым — это нормально
+        if not path.exists():
+            data[filename] = {}
+            continue
+        with path.open("r", encoding="utf-8") as f:
+            data[filename] = json.load(f) or {}
+    return data
+
+
+def _source_hash(interpretations_dir: Path) -> str:
+    h = hashlib.sha256(f"v{PACK_VERSION}".encode())
+    for filename in SOURCES:
+        path = interpretations_dir / filename
+        h.update(filename.encode())
+        if path.exists():
+            h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+# =====================================================
+# ЗАГРУЗКА
+# =====================================================
+
+_PACK: Optional[FragmentPack] = None
+_PACK_LOCK = threading.Lock()
+
+
+def load_pack(interpretations_dir: Path = INTERPRETATIONS_DIR) -> FragmentPack:
+    """
+    Взять собранный пакет из fragments.pack.json, если он актуален,
+    иначе скомпилировать из исходных JSON.
+    """
+    pack_path = interpretations_dir / PACK_FILENAME
+    if pack_path.exists():
+        try:
+            with pack_path.open("r", encoding="utf-8") as f:
+                pack = FragmentPack.from_json(json.load(f))
+            if pack.source_hash == _source_hash(interpretations_dir):
+                return pack
+        except Exception as e:
+            print(f"Ошибка загрузки пакета фрагментов '{pack_path}': {e}")
+    return compile_pack(interpretations_dir)
+
+
+def get_pack() -> FragmentPack:
+    """
+    Пакет фрагментов для калькуляторов (загружается один раз на процесс).
+    """
+    global _PACK
+    if _PACK is None:
+        with _PACK_LOCK:
+            if _PACK is None:
+                _PACK = load_pack()
+    return _PACK
+
+
+def save_pack(pack: FragmentPack, path: Path = INTERPRETATIONS_DIR / PACK_FILENAME) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(pack.to_json(), f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    # python -m calc.fragments — собрать interpretations/fragments.pack.json
+    p = compile_pack()
+    save_pack(p)
+    print(
+        f"Пакет фрагментов: {len(p.fragments)} фрагментов, "
+        f"{len(p.tables)} таблиц, {len(p.scalars)} одиночных → "
+        f"{INTERPRETATIONS_DIR / PACK_FILENAME}"
+    )
@@ -1,4 +1,10 @@
-def calculate(birth_date: str) -> str:
+from typing import Union
+
+from calc.birth_date import BirthDate
+
+
+def calculate(birth_date: Union[str, BirthDate]) -> str:
+    birth_date = BirthDate.coerce(birth_date)
     return (
         "💰 <b>Денежный код</b>\n\n"
         f"Дата: <b>{birth_date}</b>\n\n"
@@ -1,127 +1,83 @@
 from __future__ import annotations
 
 import datetime as _dt
-import json
-import re
-from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Dict, Optional, Tuple, Union
 
-# Кэш интерпретаций, чтобы не читать JSON при каждом запросе
-_INTERPRETATIONS_CACHE: Dict[str, Dict[str, Any]] | None = None
+import numpy as np
 
-
-def _load_interpretations() -> Dict[str, Dict[str, Any]]:
-    """
-    Загружаем interpretations/calendar_*.json один раз и кешируем.
-    Путь считается от корня проекта: ../.. от этого файла → numerology_bot/.
-    """
-    global _INTERPRETATIONS_CACHE
-    if _INTERPRETATIONS_CACHE is not None:
-        return _INTERPRETATIONS_CACHE
-
-    base_dir = Path(__file__).resolve().parents[2]
-    interp_dir = base_dir / "interpretations"
-
-    data: Dict[str, Dict[str, Any]] = {}
-    for filename, key in [
-        ("calendar_year.json", "year"),
-        ("calendar_month.json", "month"),
-        ("calendar_day.json", "day"),
-    ]:
-        json_path = interp_dir / filename
-        with json_path.open("r", encoding="utf-8") as f:
-            data[key] = json.load(f)
-
-    _INTERPRETATIONS_CACHE = data
-    return _INTERPRETATIONS_CACHE
-
-
-def _parse_birth_date(birth_date: str) -> _dt.date:
-    """
-    Принимаем строку формата ДД.ММ.ГГГГ (или D.M.YYYY) и возвращаем date.
-    """
-    match = re.fullmatch(r"\s*(\d{1,2})\.(\d{1,2})\.(\d{4})\s*", birth_date)
-    if not match:
-        raise ValueError("Неверный формат даты рождения")
-
-    day, month, year = map(int, match.groups())
-    return _dt.date(year, month, day)
-
-
-def _sum_digits(n: int) -> int:
-    return sum(int(d) for d in str(abs(n)))
+from calc.birth_date import BirthDate
+from calc.digits import DIGIT_SUM_TABLE, digit_sum
+from calc.fragments import NO_FRAGMENT, FragmentTable, get_pack
 
 
 def _lookup_interpretation(
-    mapping: Dict[str, Any],
+    table: FragmentTable,
     value: int,
-) -> Tuple[int, str]:
+) -> Tuple[int, int]:
     """
     Ищем интерпретацию:
     1) сначала пробуем составное число (13, 14, 16, 22 и т.п.)
     2) если нет — сводим до однозначного (1–9).
-    Возвращаем финальное число и текст.
+    Возвращаем финальное число и ID фрагмента в пакете.
     """
     original = value
 
     # прямое попадание по составному числу
-    if str(value) in mapping:
-        return value, mapping[str(value)]["text"]
+    fragment_id = table.id(value)
+    if fragment_id >= 0:
+        return value, fragment_id
 
     # сводим до однозначного, пока не найдём ключ
     while value > 9:
-        value = _sum_digits(value)
-        if str(value) in mapping:
-            return value, mapping[str(value)]["text"]
-
-    # на всякий случай ещё раз проверим уже сведённое значение
-    if str(value) in mapping:
-        return value, mapping[str(value)]["text"]
+        value = digit_sum(value)
+        fragment_id = table.id(value)
+        if fragment_id >= 0:
+            return value, fragment_id
 
     # если ничего не нашли — падаем с понятной ошибкой
     raise KeyError(f"Для числа {original} не найдена интерпретация в JSON.")
 
 
-def _calculate_internal(birth_date: str) -> str:
+def _render_body(day: int, month: int, today: _dt.date) -> str:
     """
-    Основная логика прогностики:
+    Основная логика прогностики (текст без заголовка):
     - ритм на год
     - ритм на месяц
     - ритм на день
 
     Для расчётов используем:
     - день и месяц рождения
-    - текущий календарный год / месяц / день на момент расчёта.
+    - календарный год / месяц / день, на который строится прогноз.
     """
-    interpretations = _load_interpretations()
-    year_map = interpretations["year"]
-    month_map = interpretations["month"]
-    day_map = interpretations["day"]
-
-    bdate = _parse_birth_date(birth_date)
-    today = _dt.date.today()
+    pack = get_pack()
+    year_table = pack.table("calendar.year")
+    month_table = pack.table("calendar.month")
+    day_table = pack.table("calendar.day")
 
     # -----------------------------
     # РИТМ НА ГОД
     # Формула: день рождения + месяц рождения + сумма цифр интересующего года
     # -----------------------------
-    year_digits_sum = _sum_digits(today.year)
-    year_raw = bdate.day + bdate.month + year_digits_sum
-    year_final, year_text = _lookup_interpretation(year_map, year_raw)
+    year_digits_sum = digit_sum(today.year)
+    year_raw = day + month + year_digits_sum
+    year_final, year_id = _lookup_interpretation(year_table, year_raw)
+    year_text = pack.text(year_id)
 
     # -----------------------------
     # РИТМ НА МЕСЯЦ
     # Формула: ритм года + номер текущего месяца
     # -----------------------------
     month_raw = year_raw + today.month
-    month_final, month_text = _lookup_interpretation(month_map, month_raw)
+    month_final, month_id = _lookup_interpretation(month_table, month_raw)
+    month_text = pack.text(month_id)
 
     # -----------------------------
     # РИТМ НА ДЕНЬ
     # Формула: ритм месяца + число текущего дня
     # -----------------------------
     day_raw = month_raw + today.day
-    day_final, day_text = _lookup_interpretation(day_map, day_raw)
+    day_final, day_id = _lookup_interpretation(day_table, day_raw)
+    day_text = pack.text(day_id)
 
     def _format_value(raw: int, final: int) -> str:
         """
@@ -137,11 +93,6 @@ def _calculate_internal(birth_date: str) -> str:
 
     parts: list[str] = []
 
-    # Заголовок
-    parts.append("📅 <b>Прогностика</b>\n")
-    parts.append(f"\nДата рождения: <b>{birth_date}</b>")
-    parts.append(f"\nТекущая дата: <b>{today.strftime('%d.%m.%Y')}</b>\n\n")
-
     # ЦИКЛИЧНОСТЬ ЭНЕРГИЙ — общий блок в начале
     parts.append(
         "ЦИКЛИЧНОСТЬ ЭНЕРГИЙ\n"
@@ -219,14 +170,153 @@ def _calculate_internal(birth_date: str) -> str:
     return "".join(parts)
 
 
-def calculate(birth_date: str) -> str:
+# =====================================================
+# КЕШ ТЕКСТОВ НА ТЕКУЩИЙ ДЕНЬ
+# =====================================================
+#
+# Текст прогноза (кроме заголовка) зависит только от (день рождения,
+# месяц рождения, текущая дата). Раз в сутки — в полночь, из фоновой задачи
+# приложения — считаются все 366 вариантов (день, месяц) на новую дату,
+# и готовый словарь подменяется одним присваиванием. В течение дня любой
+# запрос прогностики — это поиск в словаре.
+
+# (дата, {(день, месяц): текст}) — подменяется целиком, без блокировок
+_DAILY: Tuple[_dt.date, Dict[Tuple[int, int], str]] | None = None
+
+# Все пары (день, месяц), включая 29.02
+_DAY_MONTH_KEYS = tuple(
+    (d.day, d.month)
+    for d in (_dt.date(2000, 1, 1) + _dt.timedelta(days=i) for i in range(366))
+)
+
+
+def precompute(today: Optional[_dt.date] = None) -> int:
+    """
+    Посчитать тексты для всех пар (день, месяц) на дату today (по умолчанию —
+    сегодня) и атомарно подменить кеш. Возвращает количество ключей.
+    """
+    global _DAILY
+    today = today or _dt.date.today()
+
+    bodies: Dict[Tuple[int, int], str] = {}
+    for day, month in _DAY_MONTH_KEYS:
+        try:
+            bodies[(day, month)] = _render_body(day, month, today)
+        except KeyError:
+            # нет интерпретации — такие даты обработает обычный путь (с ошибкой)
+            continue
+
+    _DAILY = (today, bodies)
+    return len(bodies)
+
+
+def cached_date() -> Optional[_dt.date]:
+    """
+    Дата, на которую посчитан кеш (None — кеш ещё не строился).
+    """
+    daily = _DAILY
+    return daily[0] if daily is not None else None
+
+
+def _calculate_internal(birth_date: BirthDate) -> str:
+    today = _dt.date.today()
+
+    body = None
+    daily = _DAILY
+    if daily is not None and daily[0] == today:
+        body = daily[1].get((birth_date.day, birth_date.month))
+    if body is None:
+        # кеш ещё не пересчитан на новую дату — считаем на лету
+        body = _render_body(birth_date.day, birth_date.month, today)
+
+    # Заголовок
+    return (
+        "📅 <b>Прогностика</b>\n"
+        f"\nДата рождения: <b>{birth_date}</b>"
+        f"\nТекущая дата: <b>{today.strftime('%d.%m.%Y')}</b>\n\n"
+        + body
+    )
+
+
+# =====================================================
+# РИТМЫ ЗА ПЕРИОД (ВЕКТОРНЫЙ РАСЧЁТ)
+# =====================================================
+#
+# Те же формулы, что в _render_body, но сразу для всех дней периода.
+# Значения ритмов небольшие (< 200), поэтому _lookup_interpretation заранее
+# раскладывается в таблицы «сырое число → (итоговое число, ID фрагмента)».
+
+_DIGIT_SUM_ARR = np.asarray(DIGIT_SUM_TABLE, dtype=np.int64)
+
+# Максимальный период для rhythm_range, дней
+MAX_RANGE_DAYS = 366 * 5
+
+
+def _resolve_table(table: FragmentTable, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Итоговое число и ID фрагмента для всех значений 0..size-1.
+    Где интерпретации нет — NO_FRAGMENT в обоих массивах.
+    """
+    finals = np.full(size, NO_FRAGMENT, dtype=np.int64)
+    ids = np.full(size, NO_FRAGMENT, dtype=np.int64)
+    for value in range(size):
+        try:
+            finals[value], ids[value] = _lookup_interpretation(table, value)
+        except KeyError:
+            continue
+    return finals, ids
+
+
+def rhythm_range(
+    day: int,
+    month: int,
+    start: _dt.date,
+    end: _dt.date,
+) -> Dict[str, np.ndarray]:
+    """
+    Ритмы года / месяца / дня для каждой даты из [start, end].
+
+    Возвращает словарь массивов одинаковой длины:
+    date (datetime64[D]), {year,month,day}_raw, {year,month,day}_value
+    (итоговое число) и {year,month,day}_id (ID фрагмента в пакете; наружу
+    отдаётся его ключ — FragmentPack.key).
+    """
+    if end < start:
+        raise ValueError("Конец периода раньше начала")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f"Период больше {MAX_RANGE_DAYS} дней")
+
+    dates = np.arange(
+        np.datetime64(start, "D"), np.datetime64(end, "D") + 1, dtype="datetime64[D]"
+    )
+    years = dates.astype("datetime64[Y]")
+    months = dates.astype("datetime64[M]")
+    cur_year = years.astype(np.int64) + 1970
+    cur_month = (months - years.astype("datetime64[M]")).astype(np.int64) + 1
+    cur_day = (dates - months.astype("datetime64[D]")).astype(np.int64) + 1
+
+    year_raw = day + month + _DIGIT_SUM_ARR[cur_year]
+    month_raw = year_raw + cur_month
+    day_raw = month_raw + cur_day
+
+    pack = get_pack()
+    result: Dict[str, np.ndarray] = {"date": dates}
+    for name, raw in (("year", year_raw), ("month", month_raw), ("day", day_raw)):
+        finals, ids = _resolve_table(pack.table(f"calendar.{name}"), int(raw.max()) + 1)
+        result[f"{name}_raw"] = raw
+        result[f"{name}_value"] = finals[raw]
+        result[f"{name}_id"] = ids[raw]
+    return result
+
+
+def calculate(birth_date: Union[str, BirthDate]) -> str:
     """
     Публичная функция, которую вызывает бот.
-    На вход получает строку даты рождения в формате ДД.MM.ГГГГ,
+    На вход получает BirthDate или строку даты рождения в формате ДД.MM.ГГГГ,
     на выход — готовый текст для PDF с ритмами года / месяца / дня.
     """
     try:
-        return _calculate_internal(birth_date)
+        return _calculate_internal(BirthDate.coerce(birth_date))
     except Exception:
         return (
             "📅 <b>Прогностика</b>\n\n"
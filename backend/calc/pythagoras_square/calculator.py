@@ -1,36 +1,14 @@
 from __future__ import annotations
 
-import json
-import re
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Optional, Tuple, Union
 
-# =====================================================
-# ЗАГРУЗКА ИНТЕРПРЕТАЦИЙ ИЗ JSON
-# =====================================================
-
-_INTERPRETATIONS_CACHE: Dict[str, Any] | None = None
-
-
-def _load_interpretations() -> Dict[str, Any]:
-    """
-    Загружаем interpretations/pifagor.json один раз и кешируем.
-    Путь считается от корня проекта: ../.. от этого файла → numerology_bot/.
-    При необходимости можно подправить количество parents.
-    """
-    global _INTERPRETATIONS_CACHE
-    if _INTERPRETATIONS_CACHE is not None:
-        return _INTERPRETATIONS_CACHE
-
-    # calculators/pythagoras_square/calculator.py
-    base_dir = Path(__file__).resolve().parents[2]
-    json_path = base_dir / "interpretations" / "pifagor.json"
-
-    with json_path.open("r", encoding="utf-8") as f:
-        _INTERPRETATIONS_CACHE = json.load(f)
-
-    return _INTERPRETATIONS_CACHE
+from calc.birth_date import BirthDate
+from calc.digits import reduce_to_12
+from calc.fragments import get_pack
 
 
 @dataclass
@@ -54,11 +32,11 @@ class PythagorasResult:
 # ПУБЛИЧНАЯ ФУНКЦИЯ ДЛЯ БОТА
 # =====================================================
 
-def calculate(birth_date: str) -> str:
+def calculate(birth_date: Union[str, BirthDate]) -> str:
     """
     Главная функция, которую вызывает бот.
 
-    На вход получает строку даты в формате ДД.MM.ГГГГ (или D.M.YYYY),
+    На вход получает BirthDate или строку даты в формате ДД.MM.ГГГГ (или D.M.YYYY),
     на выход отдаёт готовый текст для PDF.
     """
     try:
@@ -71,11 +49,23 @@ def calculate(birth_date: str) -> str:
             "Проверь формат даты (дд.мм.гггг) и попробуй ещё раз."
         )
 
-    parts: List[str] = []
+    # Заголовок зависит от даты, всё остальное — только от сигнатуры психоматрицы
+    header = (
+        "🟩 <b>Квадрат Пифагора (психоматрица)</b>\n\n"
+        f"Дата рождения: <b>{result.birth_date}</b>\n"
+    )
+
+    key = _report_signature(result)
+    body = _REPORT_CACHE.get(key)
+    if body is None:
+        body = _render_report_body(result)
+        _REPORT_CACHE.put(key, body)
+
+    return header + "\n\n" + body
 
-    # Заголовок
-    parts.append("🟩 <b>Квадрат Пифагора (психоматрица)</b>")
-    parts.append(f"Дата рождения: <b>{result.birth_date}</b>\n")
+
+def _render_report_body(result: PythagorasResult) -> str:
+    parts: List[str] = []
 
     # Формула и зоны
     parts.append(_format_formula_block(result))
@@ -102,25 +92,96 @@ def calculate(birth_date: str) -> str:
     return "\n\n".join(parts)
 
 
+# =====================================================
+# КЕШ ОТЧЁТОВ ПО СИГНАТУРЕ ПСИХОМАТРИЦЫ
+# =====================================================
+
+def _report_signature(result: PythagorasResult) -> Tuple[int, ...]:
+    """
+    Текст отчёта (кроме заголовка) зависит только от количества цифр 1–9
+    и чисел третьей/четвёртой зон — у многих дат они совпадают.
+    """
+    return (
+        *(result.counts[d] for d in range(1, 10)),
+        result.third_zone,
+        result.third_zone_reduced,
+        result.fourth_zone,
+        result.fourth_zone_reduced,
+    )
+
+
+class _ReportCache:
+    """
+    Ограниченный LRU-кеш готовых отчётов со счётчиками попаданий/промахов.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Tuple[int, ...], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, ...]) -> Optional[str]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple[int, ...], value: str) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+# Размер кеша можно задать через PYTHAGORAS_CACHE_SIZE (0 — отключить)
+_REPORT_CACHE = _ReportCache(int(os.getenv("PYTHAGORAS_CACHE_SIZE", "4096")))
+
+
+def cache_stats() -> Dict[str, int]:
+    """
+    Статистика кеша отчётов: попадания, промахи, текущий и максимальный размер.
+    """
+    return _REPORT_CACHE.stats()
+
+
 # =====================================================
 # РАСЧЁТ ЦИФР И ЗОН
 # =====================================================
 
-def _calculate_internal(birth_date: str) -> PythagorasResult:
+def _calculate_internal(birth_date: Union[str, BirthDate]) -> PythagorasResult:
+    # Разбор и проверка формата ("03.11.1990", "3.11.1990", "03-11-1990" и т.п.)
+    bd = BirthDate.coerce(birth_date)
+    birth_date = bd.text
+
     # Все цифры даты для суммы
     raw_digits = [int(ch) for ch in birth_date if ch.isdigit()]
-    if len(raw_digits) < 3:
-        raise ValueError("Недостаточно цифр в дате")
 
     # --------- ВАЖНО: корректный расчёт первой цифры дня ---------
-    # Поддерживаем форматы вроде "03.11.1990", "3.11.1990", "03-11-1990"
-    m = re.match(r"\s*(\d{1,2})[.\-\/]", birth_date)
-    if not m:
-        raise ValueError("Неверный формат даты (ожидается дд.мм.гггг)")
-
-    day = int(m.group(1))  # "03" → 3, "18" → 18
-    if not (1 <= day <= 31):
-        raise ValueError("Неверный день в дате рождения")
+    day = bd.day  # "03" → 3, "18" → 18
 
     # Логика:
     #  03 → 3 (первая значащая цифра дня)
@@ -136,13 +197,13 @@ def _calculate_internal(birth_date: str) -> PythagorasResult:
 
     # 3-я зона: сумма и свёртка до 12
     third_zone = sum_digits
-    third_zone_reduced = _reduce_to_12(third_zone)
+    third_zone_reduced = reduce_to_12(third_zone)
 
     # 4-я зона: сумма − 2 * первая цифра дня (уже корректно: 03 → 3)
     fourth_zone = third_zone - 2 * day_first_digit
     if fourth_zone <= 0:
         fourth_zone = abs(fourth_zone)
-    fourth_zone_reduced = _reduce_to_12(fourth_zone)
+    fourth_zone_reduced = reduce_to_12(fourth_zone)
 
     # Цифры для матрицы (без нулей)
     digits_for_matrix: List[int] = []
@@ -184,18 +245,6 @@ def _calculate_internal(birth_date: str) -> PythagorasResult:
     )
 
 
-def _reduce_to_12(n: int) -> int:
-    n = abs(int(n))
-    while n > 12:
-        s = 0
-        t = n
-        while t > 0:
-            s += t % 10
-            t //= 10
-        n = s
-    return n
-
-
 # =====================================================
 # ОФОРМЛЕНИЕ ВЫВОДА
 # =====================================================
@@ -250,7 +299,7 @@ def _format_counts_summary(counts: Dict[int, int]) -> str:
 
 
 # =====================================================
-# ИНТЕРПРЕТАЦИИ ЧЕРЕЗ JSON
+# ИНТЕРПРЕТАЦИИ ИЗ ПАКЕТА ФРАГМЕНТОВ (calc/fragments.py)
 # =====================================================
 
 def _interpret_digits_block(counts: Dict[int, int]) -> str:
@@ -264,147 +313,47 @@ def _interpret_digits_block(counts: Dict[int, int]) -> str:
 
 
 def _interpret_single_digit(digit: int, count: int) -> str:
-    data = _load_interpretations()["digits"][str(digit)]
-    header = data.get("header", "")
-
-    # Маппинг количества → ключ в JSON
-    if digit == 1:
-        if count <= 0:
-            key = "0"
-        elif count == 1:
-            key = "1"
-        elif count == 2:
-            key = "2"
-        elif count == 3:
-            key = "3"
-        elif count == 4:
-            key = "4"
-        elif count == 5:
-            key = "5"
-        elif count == 6:
-            key = "6"
-        elif count == 7:
-            key = "7"
-        else:
-            key = "8+"
-    elif digit == 2:
-        if count <= 0:
-            key = "0"
-        elif count == 1:
-            key = "1"
-        elif count == 2:
-            key = "2"
-        elif count == 3:
-            key = "3"
-        elif count == 4:
-            key = "4"
-        elif count == 5:
-            key = "5"
-        else:
-            key = "6+"
-    else:
-        # для 3–9: 0 / 1 / 2 / 3 / 4+
-        if count <= 0:
-            key = "0"
-        elif count == 1:
-            key = "1"
-        elif count == 2:
-            key = "2"
-        elif count == 3:
-            key = "3"
-        else:
-            key = "4+"
-
-    text = data.get(key, "")
+    pack = get_pack()
+    header = pack.scalar(f"pifagor.digits.{digit}.header")
+
+    # Количество → фрагмент: корзины (0 / 1 / … / "4+") уже развёрнуты в таблицу
+    text = pack.text(pack.table(f"pifagor.digits.{digit}").id(count))
     return (header + "\n\n" + text).strip()
 
 
 def _interpret_rows_and_diagonals_block(result: PythagorasResult) -> str:
-    interp = _load_interpretations()
+    pack = get_pack()
     parts: List[str] = []
     parts.append("<b>РАЗДЕЛ 3. Интерпретация строк и диагоналей</b>")
 
     # Строка 1–4–7
     n = result.row_147
-    if n == 0:
-        key = "0"
-    elif n == 1:
-        key = "1"
-    elif n == 2:
-        key = "2"
-    elif n == 3:
-        key = "3"
-    elif n == 4:
-        key = "4"
-    elif n == 5:
-        key = "5"
-    else:
-        key = "6+"
-    txt_147 = interp["rows"]["147"][key]
+    txt_147 = pack.text(pack.table("pifagor.rows.147").id(n))
     parts.append(f"Строка 1–4–7 (цели, достижения): {n} цифр.\n{txt_147}")
 
     # Строка 2–5–8
     n = result.row_258
-    if n == 0:
-        key = "0"
-    elif n in (1, 2):
-        key = "1-2"
-    elif n == 3:
-        key = "3"
-    elif n == 4:
-        key = "4"
-    elif n == 5:
-        key = "5"
-    else:
-        key = "6+"
-    txt_258 = interp["rows"]["258"][key]
+    txt_258 = pack.text(pack.table("pifagor.rows.258").id(n))
     parts.append(f"Строка 2–5–8 (семья, партнёрство): {n} цифр.\n{txt_258}")
 
     # Строка 3–6–9
     n = result.row_369
-    if n == 0:
-        key = "0"
-    elif n in (1, 2):
-        key = "1-2"
-    elif n == 3:
-        key = "3"
-    elif n in (4, 5):
-        key = "4-5"
-    else:
-        key = "6+"
-    txt_369 = interp["rows"]["369"][key]
+    txt_369 = pack.text(pack.table("pifagor.rows.369").id(n))
     parts.append(f"Строка 3–6–9 (стабильность, привычки): {n} цифр.\n{txt_369}")
 
     # Диагональ 3–5–7
     n = result.diag_357
-    if n == 0:
-        key = "0"
-    elif n == 1:
-        key = "1"
-    elif n == 2:
-        key = "2"
-    elif 3 <= n <= 5:
-        key = "3-5"
-    else:
-        key = "6+"
-    txt_357 = interp["diagonals"]["357"][key]
+    txt_357 = pack.text(pack.table("pifagor.diagonals.357").id(n))
     # Доп. текст, если пусто и много двоек
     extra = ""
     if n == 0 and result.counts[2] >= 3:
-        extra = " " + interp["diagonals"]["357"].get("extra_2_many", "")
+        extra = " " + pack.scalar("pifagor.diagonals.357.extra_2_many")
     parts.append(f"Диагональ 3–5–7 (темперамент): {n} цифр.\n{txt_357}{extra}")
 
     # Диагональ 1–5–9
     n = result.diag_159
-    if n <= 3:
-        key = "0-3"
-    elif 4 <= n <= 5:
-        key = "4-5"
-    else:
-        key = "6+"
-    d159 = interp["diagonals"]["159"]
-    base = d159.get("base", "")
-    spec = d159.get(key, "")
+    base = pack.scalar("pifagor.diagonals.159.base")
+    spec = pack.text(pack.table("pifagor.diagonals.159").id(n))
     parts.append(
         f"Диагональ 1–5–9 (духовность, общественная значимость): {n} цифр.\n"
         f"{base}\n\n{spec}"
@@ -414,16 +363,16 @@ def _interpret_rows_and_diagonals_block(result: PythagorasResult) -> str:
 
 
 def _interpret_psychotype_block(result: PythagorasResult) -> str:
-    interp = _load_interpretations()["psychotype"]
+    pack = get_pack()
     n1 = result.counts[1]
     n2 = result.counts[2]
 
     if n1 > n2:
-        txt = interp["1_gt_2"]
+        txt = pack.scalar("pifagor.psychotype.1_gt_2")
     elif n2 > n1:
-        txt = interp["2_gt_1"]
+        txt = pack.scalar("pifagor.psychotype.2_gt_1")
     else:
-        txt = interp["equal"]
+        txt = pack.scalar("pifagor.psychotype.equal")
 
     return (
         "<b>РАЗДЕЛ 4. Психотип</b>\n\n"
@@ -433,5 +382,5 @@ def _interpret_psychotype_block(result: PythagorasResult) -> str:
 
 
 def _pereliv_block() -> str:
-    interp = _load_interpretations()["pereliv"]["text"]
-    return "<b>ПЕРЕЛИВАНИЕ ЭНЕРГИЙ</b>\n\n" + interp
+    text = get_pack().scalar("pifagor.pereliv.text")
+    return "<b>ПЕРЕЛИВАНИЕ ЭНЕРГИЙ</b>\n\n" + text
@@ -1,30 +1,34 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, asdict
-from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Union
 
+import numpy as np
 
-# ---------- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ----------
+from calc.birth_date import BirthDate
+from calc.digits import (
+    DIGIT_SUM_TABLE,
+    REDUCE_9_TABLE,
+    REDUCE_22_TABLE,
+    TABLE_SIZE,
+    digit_sum,
+    reduce_to_9,
+    reduce_to_22,
+)
 
-def arcana_reduce(n: int) -> int:
-    """
-    Сведение к аркану 1..22.
-    Пока число > 22 — складываем цифры.
-    """
-    while n > 22:
-        n = sum(int(d) for d in str(n))
-    return n
 
+# ---------- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ----------
 
-def digit_reduce(n: int) -> int:
-    """
-    Обычная нумерология: оставляем число от 1 до 9.
-    22 -> 4, 11 -> 2 и т.д.
-    """
-    while n > 9:
-        n = sum(int(d) for d in str(n))
-    return n
+# Свёртки берём из общего табличного ядра calc/digits.py:
+# arcana_reduce — сведение к аркану 1..22 (пока число > 22 — складываем цифры),
+# digit_reduce — обычная нумерология 1..9 (22 -> 4, 11 -> 2 и т.д.).
+arcana_reduce = reduce_to_22
+digit_reduce = reduce_to_9
+
+# Те же таблицы в виде массивов — для пакетного расчёта
+_DIGIT_SUM_ARR = np.asarray(DIGIT_SUM_TABLE, dtype=np.int64)
+_REDUCE_9_ARR = np.asarray(REDUCE_9_TABLE, dtype=np.int64)
+_REDUCE_22_ARR = np.asarray(REDUCE_22_TABLE, dtype=np.int64)
 
 
 # ---------- СТРУКТУРЫ ДАННЫХ ----------
@@ -81,18 +85,44 @@ class MatrixDestiny:
 
 # ---------- ОСНОВНОЙ РАСЧЁТ ----------
 
-def compute_matrix(date_str: str) -> MatrixDestiny:
+# Предрасчитанная таблица матриц (см. matrix_table.py).
+# Подключается через set_matrix_table(); если не подключена — считаем как обычно.
+_MATRIX_TABLE = None
+
+
+def set_matrix_table(table) -> None:
     """
-    date_str: строка формата 'DD.MM.YYYY', например '30.07.1987'
+    Подключить (или отключить, передав None) предрасчитанную таблицу матриц.
+    Таблица должна иметь метод lookup(ordinal) -> MatrixDestiny | None.
     """
-    # базовая проверка формата
-    d = datetime.strptime(date_str, "%d.%m.%Y")
-    day, month, year = d.day, d.month, d.year
+    global _MATRIX_TABLE
+    _MATRIX_TABLE = table
+
+
+def compute_matrix(birth_date: Union[str, BirthDate]) -> MatrixDestiny:
+    """
+    birth_date: BirthDate или строка формата 'DD.MM.YYYY', например '30.07.1987'
+    """
+    # строку разбираем и проверяем (BirthDate уже проверен)
+    d = BirthDate.coerce(birth_date)
+
+    # быстрый путь: готовая строка из таблицы по порядковому номеру даты
+    if _MATRIX_TABLE is not None:
+        m = _MATRIX_TABLE.lookup(d.ordinal)
+        if m is not None:
+            return m
 
+    return compute_matrix_for(d.day, d.month, d.year)
+
+
+def compute_matrix_for(day: int, month: int, year: int) -> MatrixDestiny:
+    """
+    Расчёт матрицы по уже разобранной дате (без проверки формата и без таблицы).
+    """
     # 1. Базовые точки ромба (личный квадрат)
     A = arcana_reduce(day)                         # лево
     B = arcana_reduce(month)                       # верх
-    C = arcana_reduce(sum(int(c) for c in str(year)))  # право
+    C = arcana_reduce(digit_sum(year))             # право
     D = arcana_reduce(A + B + C)                   # низ
     center = arcana_reduce(A + B + C + D)          # центр
 
@@ -166,4 +196,136 @@ def compute_matrix(date_str: str) -> MatrixDestiny:
         purpose_personal=purpose_personal,
         purpose_social=purpose_social,
         purpose_general=purpose_general,
-    )
\ No newline at end of file
+    )
+
+
+# ---------- ПАКЕТНЫЙ (ВЕКТОРНЫЙ) РАСЧЁТ ----------
+
+def _in_table(n: np.ndarray) -> bool:
+    return n.size == 0 or (n.min() >= 0 and n.max() < TABLE_SIZE)
+
+
+def _digit_sum_vec(n: np.ndarray) -> np.ndarray:
+    """
+    Сумма цифр для массива неотрицательных целых.
+    """
+    if _in_table(n):
+        return _DIGIT_SUM_ARR[n]
+    s = np.zeros_like(n)
+    while np.any(n):
+        s += n % 10
+        n = n // 10
+    return s
+
+
+def _reduce_vec(n: np.ndarray, limit: int, table: np.ndarray) -> np.ndarray:
+    mask = n > limit
+    while np.any(mask) and not _in_table(n):
+        n = np.where(mask, _digit_sum_vec(n), n)
+        mask = n > limit
+    return table[n] if _in_table(n) else n
+
+
+def arcana_reduce_vec(n: np.ndarray) -> np.ndarray:
+    """
+    Векторный аналог arcana_reduce: сводим каждый элемент к 1..22.
+    """
+    return _reduce_vec(np.asarray(n, dtype=np.int64), 22, _REDUCE_22_ARR)
+
+
+def digit_reduce_vec(n: np.ndarray) -> np.ndarray:
+    """
+    Векторный аналог digit_reduce: сводим каждый элемент к 1..9.
+    """
+    return _reduce_vec(np.asarray(n, dtype=np.int64), 9, _REDUCE_9_ARR)
+
+
+def _validate_dates_vec(day: np.ndarray, month: np.ndarray, year: np.ndarray) -> None:
+    """
+    Проверяем, что все тройки (день, месяц, год) — существующие даты.
+    """
+    bad = (month < 1) | (month > 12) | (day < 1) | (year < 1) | (year > 9999)
+    if not np.any(bad):
+        months = (
+            (year - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+            + (month - 1).astype("timedelta64[M]")
+        )
+        days_in_month = (
+            (months + np.timedelta64(1, "M")).astype("datetime64[D]")
+            - months.astype("datetime64[D]")
+        ).astype(np.int64)
+        bad = day > days_in_month
+    if np.any(bad):
+        i = int(np.flatnonzero(bad)[0])
+        raise ValueError(
+            f"Некорректная дата №{i}: {int(day[i]):02d}.{int(month[i]):02d}.{int(year[i]):04d}"
+        )
+
+
+def compute_matrix_batch(day, month, year) -> Dict[str, Any]:
+    """
+    Пакетный расчёт матриц судьбы для массивов дней, месяцев и лет.
+
+    Возвращает ту же структуру, что MatrixDestiny.to_dict(),
+    но вместо чисел — массивы numpy (по одному значению на дату).
+    """
+    day = np.asarray(day, dtype=np.int64)
+    month = np.asarray(month, dtype=np.int64)
+    year = np.asarray(year, dtype=np.int64)
+    if not (day.shape == month.shape == year.shape) or day.ndim != 1:
+        raise ValueError("day, month и year должны быть одномерными массивами одной длины")
+    _validate_dates_vec(day, month, year)
+
+    # 1. Базовые точки
+    A = arcana_reduce_vec(day)
+    B = arcana_reduce_vec(month)
+    C = arcana_reduce_vec(_digit_sum_vec(year))
+    D = arcana_reduce_vec(A + B + C)
+    center = arcana_reduce_vec(A + B + C + D)
+
+    # 2–5. Портрет, таланты, материальная карма, кармический хвост
+    portrait_3 = arcana_reduce_vec(A + center)
+    portrait_2 = arcana_reduce_vec(A + portrait_3)
+    talents_3 = arcana_reduce_vec(B + center)
+    talents_2 = arcana_reduce_vec(B + talents_3)
+    mk_3 = arcana_reduce_vec(C + center)
+    mk_2 = arcana_reduce_vec(C + mk_3)
+    kt_3 = arcana_reduce_vec(D + center)
+    kt_2 = arcana_reduce_vec(D + kt_3)
+
+    # 6. Квадрат рода
+    E = arcana_reduce_vec(A + B)
+    F = arcana_reduce_vec(B + C)
+    I = arcana_reduce_vec(C + D)
+    H = arcana_reduce_vec(D + A)
+
+    # 7. Баланс, партнёр, профессия
+    balance = arcana_reduce_vec(mk_3 + kt_3)
+    ideal_partner = arcana_reduce_vec(kt_3 + balance)
+    ideal_profession = arcana_reduce_vec(mk_3 + balance)
+
+    # 8. Предназначения (arcana_reduce не меняет значения <= 22)
+    purpose_personal = arcana_reduce_vec(
+        digit_reduce_vec(A) + digit_reduce_vec(B) + digit_reduce_vec(C) + digit_reduce_vec(D)
+    )
+    purpose_social = arcana_reduce_vec(
+        digit_reduce_vec(E) + digit_reduce_vec(F) + digit_reduce_vec(I) + digit_reduce_vec(H)
+    )
+    purpose_general = arcana_reduce_vec(purpose_personal + purpose_social)
+
+    return {
+        "primary": {"A": A, "B": B, "C": C, "D": D, "center": center},
+        "portrait": {"first": A, "second": portrait_2, "third": portrait_3},
+        "talents": {"first": B, "second": talents_2, "third": talents_3},
+        "material_karma": {"first": mk_3, "second": mk_2, "third": C},
+        "karmic_tail": {"first": kt_3, "second": kt_2, "third": D},
+        "rod_square": {"E": E, "F": F, "I": I, "H": H},
+        "balance": balance,
+        "ideal_partner": ideal_partner,
+        "ideal_profession": ideal_profession,
+        "purpose": {
+            "personal": purpose_personal,
+            "social": purpose_social,
+            "general": purpose_general,
+        },
+    }
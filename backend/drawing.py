@@ -1,16 +1,54 @@
 from __future__ import annotations
 
-from typing import Union
-from math import sin, cos, pi
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Tuple, Union
+import hashlib
+import io
+import json
 import os
+import tempfile
+import threading
 
 import matplotlib
 matplotlib.use("Agg")  # ВАЖНО: headless режим, не вызывает GUI
 
-import matplotlib.pyplot as plt
-import matplotlib.image as mpimg
-
-from calculations import MatrixDestiny
+# Без pyplot: его глобальный менеджер фигур не потокобезопасен.
+# Каждая отрисовка создаёт свою Figure со своим холстом Agg, общего состояния нет,
+# поэтому рисовать можно из нескольких потоков одновременно
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
+import numpy as np
+from PIL import Image
+
+from calculations import MatrixDestiny, compute_matrix
+from drawing_svg import render_svg
+from matrix_layout import (
+    AGE_CAPTION_R,
+    AGE_CAPTIONS,
+    AGE_LABEL_R,
+    BACKGROUND_ALPHA,
+    CROWN_CIRCLES,
+    CROWN_COLOR,
+    CROWN_LINE,
+    EXTENT,
+    FACECOLOR,
+    FIGSIZE,
+    LABELS,
+    LINE_COLOR,
+    LINES,
+    MAIN_CIRCLE_COLOR,
+    NODES,
+    R_MAIN,
+    SIZE_TIERS,
+    TICK_COLOR,
+    TOP_NODE_Y,
+    age_label_xy,
+    age_ticks,
+    image_side,
+    top_arc,
+)
 
 
 # ---------- ФОН: КРУГ С ГОДАМИ И ВЕРХНЕЙ ДУГОЙ ----------
@@ -20,62 +58,33 @@ def _draw_background(ax):
     Рисует фон-геометрию (круг, деления, дуга, корона).
     """
 
-    # радиус основного круга матрицы
-    R_MAIN = 4.0
-
     # большой круг
-    main_circle = plt.Circle(
+    main_circle = Circle(
         (0, 0),
         R_MAIN,
         fill=False,
         linewidth=2,
         linestyle="solid",
-        edgecolor="#1a8f5c",
+        edgecolor=MAIN_CIRCLE_COLOR,
         alpha=0.9,
         zorder=1,
     )
     ax.add_patch(main_circle)
 
-    # окружность для делений возрастов
-    R_TICK_IN = R_MAIN - 0.25
-    R_TICK_OUT = R_MAIN + 0.15
-
-    def age_to_angle(age: float) -> float:
-        return pi * (1 + (20 - age) / 40.0)
-
-    for age in range(0, 71):
-        ang = age_to_angle(age)
-        x_in = R_TICK_IN * cos(ang)
-        y_in = R_TICK_IN * sin(ang)
-        x_out = R_TICK_OUT * cos(ang)
-        y_out = R_TICK_OUT * sin(ang)
-
-        if age % 10 == 0:
-            lw = 1.6
-            alpha = 0.9
-        elif age % 5 == 0:
-            lw = 1.2
-            alpha = 0.6
-        else:
-            lw = 0.8
-            alpha = 0.3
-
+    # деления возрастов
+    for age, x_in, y_in, x_out, y_out, lw, alpha in age_ticks():
         ax.plot(
             [x_in, x_out],
             [y_in, y_out],
-            color="#8088aa",
+            color=TICK_COLOR,
             linewidth=lw,
             alpha=alpha,
             zorder=1,
         )
 
         if age % 10 == 0:
-            label_r = R_TICK_OUT + 0.25
-            lx = label_r * cos(ang)
-            ly = label_r * sin(ang)
             ax.text(
-                lx,
-                ly,
+                *age_label_xy(age, AGE_LABEL_R),
                 str(age),
                 ha="center",
                 va="center",
@@ -85,14 +94,9 @@ def _draw_background(ax):
             )
 
     # подписи лет
-    for age in (0, 10, 20, 30, 40, 50, 60, 70):
-        ang = age_to_angle(age)
-        r = R_TICK_OUT + 0.55
-        x = r * cos(ang)
-        y = r * sin(ang)
+    for age in AGE_CAPTIONS:
         ax.text(
-            x,
-            y,
+            *age_label_xy(age, AGE_CAPTION_R),
             f"{age} лет",
             ha="center",
             va="center",
@@ -102,85 +106,218 @@ def _draw_background(ax):
         )
 
     # верхняя дуга
-    R_TOP = 6.4
-    CENTER_TOP_Y = -0.8
-
-    angles = [i * pi / 180 for i in range(40, 140)]
-    xs = [R_TOP * cos(a) for a in angles]
-    ys = [CENTER_TOP_Y + R_TOP * sin(a) for a in angles]
-
-    ax.plot(xs, ys, color="#1d7b4a", linewidth=1.4, alpha=0.7, zorder=1)
+    xs, ys = top_arc()
+    ax.plot(xs, ys, color=LINE_COLOR, linewidth=1.4, alpha=0.7, zorder=1)
 
     # центральная линия к короне
+    x1, y1, x2, y2 = CROWN_LINE
     ax.plot(
-        [0, 0],
-        [R_MAIN, CENTER_TOP_Y + R_TOP - 0.9],
-        color="#f2c94c",
+        [x1, x2],
+        [y1, y2],
+        color=CROWN_COLOR,
         linewidth=1.2,
         alpha=0.7,
         zorder=1,
     )
 
     # корона: две окружности
-    TOP_NODE_Y = CENTER_TOP_Y + R_TOP
-    top_circle_outer = plt.Circle(
-        (0, TOP_NODE_Y),
-        1.0,
-        fill=False,
-        linewidth=2,
-        edgecolor="#f2c94c",
-        alpha=0.9,
-        zorder=1,
-    )
-    top_circle_inner = plt.Circle(
-        (0, TOP_NODE_Y),
-        0.7,
-        fill=False,
-        linewidth=2,
-        edgecolor="#f2c94c",
-        alpha=0.5,
-        zorder=1,
-    )
-    ax.add_patch(top_circle_outer)
-    ax.add_patch(top_circle_inner)
+    for radius, alpha in CROWN_CIRCLES:
+        ax.add_patch(Circle(
+            (0, TOP_NODE_Y),
+            radius,
+            fill=False,
+            linewidth=2,
+            edgecolor=CROWN_COLOR,
+            alpha=alpha,
+            zorder=1,
+        ))
 
 
-# ---------- РИСОВАНИЕ МАТРИЦЫ ----------
+# ---------- КАРТИНКА И ФОРМАТЫ ----------
 
-def draw_matrix(
-    matrix: MatrixDestiny,
-    filename: str = "destiny_matrix.png",
-    dpi: int = 200,
-    background_path: str = "man.png",
-) -> None:
+# Размеры, координаты, узлы и подписи схемы — в matrix_layout.py
 
-    # --- ФИКС DPI ---
+# Уровень сжатия PNG (0–9): 3 даёт размер как у прежних файлов
+# при кодировании в 2–3 раза быстрее уровня по умолчанию
+PNG_COMPRESS_LEVEL = 3
+
+# Подложка по умолчанию — man.png рядом с этим файлом
+DEFAULT_BACKGROUND_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "man.png")
+
+# Форматы: формат Pillow, параметры кодирования, расширение файла, MIME-тип.
+# svg рисуется без matplotlib и Pillow (drawing_svg.py)
+IMAGE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 2}, "webp", "image/webp"),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True}, "jpg", "image/jpeg"),
+    "png": ("PNG", {"compress_level": PNG_COMPRESS_LEVEL}, "png", "image/png"),
+    "svg": (None, {}, "svg", "image/svg+xml"),
+}
+
+# Версия отрисовки — часть ключа (имени) каждой сохранённой картинки.
+# Увеличить при любом изменении вида картинок (drawing.py, drawing_svg.py,
+# matrix_layout.py): у всех вариантов появятся новые имена, поэтому копии
+# в CDN и Telegram по старым URL не устаревают, а старые файлы удаляет сборщик
+# (app/matrix_api.collect_stale_images)
+RENDERER_VERSION = 1
+
+
+# ---------- КЛЮЧ ВАРИАНТА ----------
+
+def _file_digest(path: str) -> str:
     try:
-        dpi_value = float(dpi)
-    except Exception:
-        dpi_value = 300.0  # хардкод, чтобы не было ошибок
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return "missing"
 
-    m = matrix
 
-    # создаём фигуру
-    fig, ax = plt.subplots(figsize=(8, 8), dpi=dpi_value)
-    ax.set_aspect("equal")
-    ax.axis("off")
+@lru_cache(maxsize=None)
+def _variant_salt(dpi: float, fmt: str, background_path: str) -> str:
+    """
+    Всё, кроме даты, от чего зависит файл варианта. Считается один раз на процесс
+    (подложка читается целиком — замена man.png учитывается после перезапуска).
+    """
+    return "|".join((
+        str(RENDERER_VERSION),
+        matplotlib.__version__,
+        f"{FIGSIZE:g}in",
+        f"{dpi:g}dpi",
+        fmt,
+        repr(sorted(IMAGE_FORMATS[fmt][1].items())),
+        _file_digest(background_path),
+    ))
+
+
+def variant_key(
+    birth_date: str,
+    dpi: float,
+    fmt: str,
+    background_path: str = DEFAULT_BACKGROUND_PATH,
+) -> str:
+    """
+    Хеш входных данных отрисовки (дата, размер, формат, подложка, версия отрисовки):
+    одинаковый ключ — побайтно та же картинка, поэтому её можно кэшировать навсегда.
+    """
+    salt = _variant_salt(float(dpi), fmt, os.path.abspath(background_path))
+    return hashlib.sha1(f"{salt}|{birth_date}".encode("utf-8")).hexdigest()[:16]
 
-    # общий фон
-    fig.patch.set_facecolor("#02110d")
-    ax.set_facecolor("#02110d")
 
+# ---------- ОБЩИЕ РАСТРЫ: .npy С MEMORY-MAP ----------
+
+# Раскодированная подложка и растры статических слоёв хранятся в .npy
+# и открываются всеми процессами через memory-map только для чтения:
+# страницы файла общие для всех воркеров (page cache ОС), PNG не декодируется
+# в каждом процессе, а в памяти процесса не лежит своя копия растров.
+# Папка переопределяется MATRIX_RASTER_DIR, MATRIX_RASTER_MMAP=0 — держать растры
+# в памяти каждого процесса, как раньше.
+RASTER_DIR = os.getenv("MATRIX_RASTER_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "app", "data", "rasters"
+)
+
+
+def _raster_mmap_enabled() -> bool:
+    return os.getenv("MATRIX_RASTER_MMAP", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+@lru_cache(maxsize=None)
+def _renderer_hash() -> str:
+    """
+    Хеш исходников отрисовки и версии matplotlib: при их изменении
+    сохранённые слои перестают совпадать по имени и строятся заново.
+    """
+    h = hashlib.sha1(matplotlib.__version__.encode())
+    for module_file in (__file__, os.path.join(os.path.dirname(os.path.abspath(__file__)), "matrix_layout.py")):
+        with open(module_file, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+def _source_key(path: str) -> str:
+    """
+    Ключ исходного файла для имени растра: имя, размер и время изменения.
+    """
+    st = os.stat(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}_{st.st_size}_{st.st_mtime_ns}"
+
+
+def _save_npy_atomic(path: str, array: np.ndarray) -> None:
+    buf = io.BytesIO()
+    np.save(buf, np.ascontiguousarray(array))
+    write_atomic(path, buf.getvalue())
+
+
+def _remove_stale(prefix: str, current_prefix: str) -> None:
+    """
+    Удалить растры с тем же префиксом, но от прежних исходников или версии отрисовки.
+    """
+    try:
+        names = os.listdir(RASTER_DIR)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(prefix) and not name.startswith(current_prefix):
+            try:
+                os.unlink(os.path.join(RASTER_DIR, name))
+            except OSError:
+                pass
+
+
+def _shared_raster(name: str, build: Callable[[], np.ndarray], stale_prefix: str = "") -> np.ndarray:
+    """
+    Растр из RASTER_DIR/name (memory-map, только чтение); если файла нет —
+    build() и сохранение (прежние версии с префиксом stale_prefix удаляются).
+    Без memory-map или при ошибке записи — массив в памяти процесса.
+    """
+    if not _raster_mmap_enabled():
+        array = build()
+        array.setflags(write=False)
+        return array
+
+    path = os.path.join(RASTER_DIR, name)
+    if not os.path.exists(path):
+        array = build()
+        try:
+            os.makedirs(RASTER_DIR, exist_ok=True)
+            # процессы могут строить одновременно — файл пишется атомарно
+            _save_npy_atomic(path, array)
+            if stale_prefix:
+                _remove_stale(stale_prefix, name)
+        except OSError as e:
+            print(f"Не удалось сохранить растр '{path}': {e}")
+            array.setflags(write=False)
+            return array
+    return np.load(path, mmap_mode="r")
+
+
+def load_background(background_path: str) -> np.ndarray:
+    """
+    Подложка как RGB(A) uint8 (memory-map общего .npy; PNG декодируется один раз).
+    """
+    def decode() -> np.ndarray:
+        with Image.open(background_path) as img:
+            return np.asarray(img.convert("RGBA" if "A" in img.getbands() else "RGB"))
+
+    stem = os.path.splitext(os.path.basename(background_path))[0]
+    return _shared_raster(f"background_{_source_key(background_path)}.npy", decode, f"background_{stem}_")
+
+
+# ---------- СЛОИ ----------
+
+def _draw_static(ax, background_path: str) -> None:
+    """
+    Всё, что не зависит от даты: подложка, круг с годами, линии и круги узлов.
+    """
     # подложка-человек
     if background_path and os.path.exists(background_path):
         try:
-            img = mpimg.imread(background_path)
+            img = load_background(background_path)
             ax.imshow(
                 img,
-                extent=(-5.5, 5.5, -5.5, 5.5),
+                extent=(-EXTENT, EXTENT, -EXTENT, EXTENT),
                 zorder=0,
                 aspect="auto",
-                alpha=0.9,
+                alpha=BACKGROUND_ALPHA,
             )
         except Exception as e:
             print(f"Ошибка загрузки '{background_path}': {e}")
@@ -188,174 +325,296 @@ def draw_matrix(
     # геометрия
     _draw_background(ax)
 
-    # -------- функции рисования --------
-
-    def node(
-        x: float,
-        y: float,
-        value: Union[int, str],
-        radius: float = 0.3,
-        facecolor: str = "#02231d",
-        edgecolor: str = "#f2c94c",
-        fontsize: int = 14,
-        weight: str = "bold",
-    ):
-        circle = plt.Circle(
-            (x, y),
-            radius,
-            facecolor=facecolor,
-            edgecolor=edgecolor,
-            linewidth=2,
-            zorder=2,
-        )
-        ax.add_patch(circle)
-        ax.text(
-            x,
-            y,
-            str(value),
-            ha="center",
-            va="center",
-            fontsize=fontsize,
-            color="white",
-            weight=weight,
-            zorder=3,
-        )
-
-    def line(x1, y1, x2, y2, alpha: float = 0.5):
+    for x1, y1, x2, y2, alpha in LINES:
         ax.plot(
             [x1, x2],
             [y1, y2],
             linestyle="solid",
             linewidth=1.5,
-            color="#1d7b4a",
+            color=LINE_COLOR,
             alpha=alpha,
             zorder=2,
         )
 
-    # -------- координаты --------
-
-    A = (-2.3, 0.0)
-    B = (0.0, 2.7)
-    C = (2.3, 0.0)
-    D = (0.0, -2.7)
-    CENTER = (0.0, 0.0)
-
-    E = (-2.3, 2.7)
-    F = (2.3, 2.7)
-    H = (-2.3, -2.7)
-    I_ = (2.3, -2.7)
-
-    P1 = A
-    P2 = (-1.6, 0.0)
-    P3 = (-0.7, 0.0)
-
-    T1 = C
-    T2 = (1.6, 0.0)
-    T3 = (0.7, 0.0)
-
-    MK1 = (1.7, -0.9)
-    MK2 = (1.2, -1.8)
-    MK3 = C
-
-    KT1 = (-1.7, -0.9)
-    KT2 = (-1.2, -1.8)
-    KT3 = D
-
-    # -------- линии --------
-
-    line(*A, *B)
-    line(*B, *C)
-    line(*C, *D)
-    line(*D, *A)
-
-    line(*E, *F)
-    line(*F, *I_)
-    line(*I_, *H)
-    line(*H, *E)
-
-    line(-3.5, 0, 3.5, 0, alpha=0.25)
-    line(0, -3.5, 0, 3.5, alpha=0.25)
-
-    # -------- узлы --------
-
-    node(*CENTER, m.primary.center, radius=0.35, facecolor="#b29825", edgecolor="#ffe082", fontsize=16)
-
-    node(*A, m.primary.A, radius=0.35, facecolor="#4b3b8b")
-    node(*B, m.primary.B, radius=0.35, facecolor="#1a8f5c")
-    node(*C, m.primary.C, radius=0.35, facecolor="#b3433a")
-    node(*D, m.primary.D, radius=0.35, facecolor="#992a3b")
-
-    node(*E, m.rod_square["E"], radius=0.32, facecolor="#1d7b4a")
-    node(*F, m.rod_square["F"], radius=0.32, facecolor="#1d7b4a")
-    node(*H, m.rod_square["H"], radius=0.32, facecolor="#1d7b4a")
-    node(*I_, m.rod_square["I"], radius=0.32, facecolor="#1d7b4a")
-
-    node(*P1, m.portrait.first, radius=0.33, facecolor="#6c2c8a")
-    node(*P2, m.portrait.second, radius=0.28, facecolor="#1d7b4a")
-    node(*P3, m.portrait.third, radius=0.28, facecolor="#1a8f5c")
-
-    node(*T1, m.talents.first, radius=0.33, facecolor="#206b3a")
-    node(*T2, m.talents.second, radius=0.28, facecolor="#1d7b4a")
-    node(*T3, m.talents.third, radius=0.28, facecolor="#1a8f5c")
-
-    node(*MK1, m.material_karma.first, radius=0.28, facecolor="#c46b2a")
-    node(*MK2, m.material_karma.second, radius=0.28, facecolor="#c46b2a")
-
-    node(*KT1, m.karmic_tail.first, radius=0.28, facecolor="#c45782")
-    node(*KT2, m.karmic_tail.second, radius=0.28, facecolor="#c45782")
-
-    # корона — общее предназначение
-    TOP_NODE_Y = 6.4 - 0.8
-    ax.text(
-        0,
-        TOP_NODE_Y,
-        str(m.purpose_general),
-        ha="center",
-        va="center",
-        fontsize=16,
-        color="#ffffff",
-        weight="bold",
-        zorder=2,
-    )
+    for n in NODES:
+        ax.add_patch(Circle(
+            n.xy,
+            n.radius,
+            facecolor=n.facecolor,
+            edgecolor=n.edgecolor,
+            linewidth=2,
+            zorder=2,
+        ))
 
-    ax.text(
-        0,
-        4.6,
-        f"Баланс: {m.balance}\n"
-        f"Личное пред.: {m.purpose_personal}\n"
-        f"Соц. пред.: {m.purpose_social}\n"
-        f"Общее пред.: {m.purpose_general}",
-        ha="center",
-        va="bottom",
-        fontsize=10,
-        color="#cfd8ff",
-        zorder=2,
-    )
 
-    ax.text(
-        -4.3,
-        -4.4,
-        f"Партнёр: {m.ideal_partner}",
-        ha="left",
-        va="top",
-        fontsize=10,
-        color="#ffcdd2",
-        zorder=2,
-    )
-    ax.text(
-        4.3,
-        -4.4,
-        f"Профессия: {m.ideal_profession}",
-        ha="right",
-        va="top",
-        fontsize=10,
-        color="#ffe0b2",
-        zorder=2,
-    )
+def _draw_values(ax, m: MatrixDestiny) -> list:
+    """
+    Числа в узлах и подписи — единственная часть картинки, зависящая от даты.
+    Возвращает созданные текстовые объекты.
+    """
+    return [
+        ax.text(
+            *label.xy,
+            label.text(m),
+            ha=label.ha,
+            va=label.va,
+            fontsize=label.fontsize,
+            color=label.color,
+            weight=label.weight,
+            zorder=label.zorder,
+        )
+        for label in LABELS
+    ]
+
+
+def _new_figure(figsize: float, dpi: float) -> Figure:
+    """
+    Отдельная фигура с собственным холстом Agg (вне pyplot, закрывать не нужно).
+    """
+    fig = Figure(figsize=(figsize, figsize), dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _new_axes(fig, position=None):
+    ax = fig.add_axes(position) if position is not None else fig.add_subplot()
+    ax.set_aspect("equal")
+    ax.axis("off")
+    ax.set_facecolor(FACECOLOR)
+    ax.set_xlim(-EXTENT, EXTENT)
+    ax.set_ylim(-EXTENT, EXTENT)
+    return ax
 
-    ax.set_xlim(-5.5, 5.5)
-    ax.set_ylim(-5.5, 5.5)
 
+# ---------- СТАТИЧЕСКИЙ СЛОЙ: РАСТР ОДИН РАЗ НА DPI ----------
+
+@dataclass(frozen=True)
+class BackgroundLayer:
+    pixels: np.ndarray  # RGB uint8 (высота, ширина, 3), только чтение
+    axes_position: Tuple[float, float, float, float]  # положение осей после tight_layout
+    aspect: Union[str, float]  # imshow(aspect="auto") меняет "equal" на "auto"
+
+
+# (dpi, figsize, путь к подложке) → готовый слой
+_LAYERS: Dict[Tuple[float, float, str], BackgroundLayer] = {}
+_LAYERS_LOCK = threading.Lock()
+
+# Дата-заглушка для расчёта раскладки: высота блока подписей от чисел не зависит
+_LAYOUT_SAMPLE_DATE = "22.12.2000"
+
+
+def _render_background_layer(dpi: float, figsize: float, background_path: str) -> BackgroundLayer:
+    fig = _new_figure(figsize, dpi)
+    fig.patch.set_facecolor(FACECOLOR)
+    ax = _new_axes(fig)
+    _draw_static(ax, background_path)
+
+    # раскладка считается вместе с подписями (как при полной отрисовке),
+    # затем подписи убираются — в слое остаётся только статика
+    texts = _draw_values(ax, compute_matrix(_LAYOUT_SAMPLE_DATE))
     fig.tight_layout()
-    fig.savefig(filename, facecolor=fig.get_facecolor())
-    plt.close(fig)
\ No newline at end of file
+    for t in texts:
+        t.remove()
+
+    fig.canvas.draw()
+    pixels = np.ascontiguousarray(np.asarray(fig.canvas.buffer_rgba())[..., :3])
+    pixels.setflags(write=False)
+    position = tuple(ax.get_position(original=True).bounds)
+    aspect = ax.get_aspect()
+    return BackgroundLayer(pixels, position, aspect)
+
+
+def _load_background_layer(dpi: float, figsize: float, background_path: str) -> BackgroundLayer:
+    """
+    Слой из общего .npy с раскладкой в соседнем .json; если их нет —
+    отрисовка и сохранение (.json пишется последним и означает, что слой готов).
+    """
+    if not _raster_mmap_enabled():
+        return _render_background_layer(dpi, figsize, background_path)
+
+    source = _source_key(background_path) if background_path and os.path.exists(background_path) else "none"
+    name = f"layer_{_renderer_hash()}_{source}_{figsize:g}in_{dpi:g}dpi"
+    pixels_path = os.path.join(RASTER_DIR, name + ".npy")
+    meta_path = os.path.join(RASTER_DIR, name + ".json")
+
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        pixels = np.load(pixels_path, mmap_mode="r")
+        return BackgroundLayer(pixels, tuple(meta["axes_position"]), meta["aspect"])
+    except (OSError, ValueError, KeyError):
+        pass
+
+    layer = _render_background_layer(dpi, figsize, background_path)
+    try:
+        os.makedirs(RASTER_DIR, exist_ok=True)
+        _save_npy_atomic(pixels_path, layer.pixels)
+        write_atomic(meta_path, json.dumps({
+            "axes_position": layer.axes_position,
+            "aspect": layer.aspect,
+        }).encode("utf-8"))
+        _remove_stale("layer_", f"layer_{_renderer_hash()}_")
+    except OSError as e:
+        print(f"Не удалось сохранить растр '{pixels_path}': {e}")
+        return layer
+    return BackgroundLayer(np.load(pixels_path, mmap_mode="r"), layer.axes_position, layer.aspect)
+
+
+def get_background_layer(
+    dpi: float,
+    figsize: float = FIGSIZE,
+    background_path: str = "man.png",
+) -> BackgroundLayer:
+    """
+    Растр статического слоя для заданных DPI и размера (один раз на процесс;
+    сам растр — общий для всех процессов .npy, см. RASTER_DIR).
+    """
+    key = (float(dpi), float(figsize), os.path.abspath(background_path) if background_path else "")
+    layer = _LAYERS.get(key)
+    if layer is None:
+        with _LAYERS_LOCK:
+            layer = _LAYERS.get(key)
+            if layer is None:
+                layer = _load_background_layer(*key)
+                _LAYERS[key] = layer
+    return layer
+
+
+# ---------- РИСОВАНИЕ МАТРИЦЫ ----------
+
+def _composite(background: np.ndarray, overlay: np.ndarray) -> np.ndarray:
+    """
+    Наложить RGBA-слой (не премультиплицированный, как в буфере Agg)
+    на копию RGB-фона. Подписи занимают малую часть картинки,
+    поэтому смешиваются только пиксели с ненулевой альфой.
+    """
+    out = background.copy()
+    alpha = overlay[..., 3]
+    mask = alpha != 0
+    a = alpha[mask][:, None].astype(np.uint16)
+    fg = overlay[..., :3][mask].astype(np.uint16)
+    bg = out[mask].astype(np.uint16)
+    out[mask] = ((fg * a + bg * (255 - a) + 127) // 255).astype(np.uint8)
+    return out
+
+
+def render_matrix(
+    matrix: MatrixDestiny,
+    dpi: float = 200,
+    background_path: str = "man.png",
+) -> np.ndarray:
+    """
+    Картинка матрицы как RGB-массив: готовый статический слой + числа поверх.
+    """
+    layer = get_background_layer(dpi, FIGSIZE, background_path)
+
+    # прозрачная фигура только с подписями, в тех же координатах, что и слой
+    fig = _new_figure(FIGSIZE, dpi)
+    fig.patch.set_alpha(0)
+    ax = _new_axes(fig, layer.axes_position)
+    ax.set_aspect(layer.aspect)
+    ax.patch.set_visible(False)
+    _draw_values(ax, matrix)
+
+    fig.canvas.draw()
+    overlay = np.asarray(fig.canvas.buffer_rgba())
+    return _composite(layer.pixels, overlay)
+
+
+def _format_from_filename(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    for fmt, (_, _, extension, _) in IMAGE_FORMATS.items():
+        if ext in (fmt, extension):
+            return fmt
+    return "png"
+
+
+def encode_image(pixels: np.ndarray, fmt: str = "png", dpi: float = 200) -> bytes:
+    """
+    Закодировать RGB-массив в webp / jpeg / png.
+    """
+    pil_format, options, _, _ = IMAGE_FORMATS[fmt]
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format=pil_format, dpi=(dpi, dpi), **options)
+    return buf.getvalue()
+
+
+def draw_matrix(
+    matrix: MatrixDestiny,
+    filename: str = "destiny_matrix.png",
+    dpi: int = 200,
+    background_path: str = "man.png",
+    format: str | None = None,
+) -> None:
+    """
+    Нарисовать матрицу в файл. Формат (webp / jpeg / png / svg) берётся из параметра
+    format или из расширения имени файла.
+    """
+
+    # --- ФИКС DPI ---
+    try:
+        dpi_value = float(dpi)
+    except Exception:
+        dpi_value = 300.0  # хардкод, чтобы не было ошибок
+
+    fmt = format or _format_from_filename(filename)
+    write_atomic(filename, render_bytes(matrix, dpi_value, background_path, fmt))
+
+
+def render_bytes(
+    matrix: MatrixDestiny,
+    dpi: float = 200,
+    background_path: str = "man.png",
+    fmt: str = "png",
+) -> bytes:
+    """
+    Готовый файл картинки в памяти (webp / jpeg / png / svg).
+    """
+    if fmt == "svg":
+        # подложка встраивается в SVG (см. drawing_svg.render_svg)
+        return render_svg(matrix, image_side(dpi), background_path).encode("utf-8")
+    pixels = render_matrix(matrix, dpi=dpi, background_path=background_path)
+    return encode_image(pixels, fmt, dpi)
+
+
+def write_atomic(filename: str, data: bytes) -> None:
+    """
+    Запись через временный файл в той же папке и os.replace:
+    по имени filename никогда не виден недописанный файл.
+    """
+    directory, name = os.path.split(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# ---------- ОТРИСОВКА В ПРОЦЕССЕ-РЕНДЕРЕРЕ ----------
+
+def init_render_worker(background_path: str = DEFAULT_BACKGROUND_PATH) -> None:
+    """
+    Инициализация процесса пула отрисовки: растры фона для всех размеров
+    считаются сразу, чтобы первый запрос не платил за них.
+    """
+    for dpi in SIZE_TIERS.values():
+        get_background_layer(dpi, FIGSIZE, background_path)
+
+
+def render_variant(
+    birth_date: str,
+    dpi: float,
+    fmt: str,
+    background_path: str = DEFAULT_BACKGROUND_PATH,
+) -> bytes:
+    """
+    Посчитать матрицу и нарисовать её (задание для пула отрисовки).
+    Возвращает содержимое файла: куда его сохранить, решает хранилище картинок.
+    """
+    return render_bytes(compute_matrix(birth_date), dpi, background_path, fmt)
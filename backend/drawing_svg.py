@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import base64
+import io
+import os
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from PIL import Image
+
+from calculations import MatrixDestiny
+from matrix_layout import (
+    AGE_CAPTION_R,
+    AGE_CAPTIONS,
+    AGE_LABEL_R,
+    AXES_BOX,
+    BACKGROUND_ALPHA,
+    CROWN_CIRCLES,
+    CROWN_COLOR,
+    CROWN_LINE,
+    EXTENT,
+    FACECOLOR,
+    FIGSIZE,
+    LABELS,
+    LINE_COLOR,
+    LINES,
+    MAIN_CIRCLE_COLOR,
+    NODES,
+    R_MAIN,
+    TICK_COLOR,
+    TOP_NODE_Y,
+    age_label_xy,
+    age_ticks,
+    top_arc,
+)
+
+# =====================================================
+# SVG-РЕНДЕРЕР МАТРИЦЫ (БЕЗ MATPLOTLIB)
+# =====================================================
+#
+# Та же схема, что в drawing.py, но текстом SVG:
+# - всё, что не зависит от даты (подложка, круг с годами, линии, круги узлов),
+#   собирается в строку один раз на процесс;
+# - числа и подписи — один заранее скомпилированный шаблон str.format,
+#   на каждую дату остаётся только подставить значения.
+# Единица координат SVG — пункт (1/72 дюйма), как у размеров шрифтов
+# и толщин линий в matplotlib, поэтому стили переносятся один в один.
+
+# Сторона холста в пунктах
+CANVAS = FIGSIZE * 72
+
+FONT_FAMILY = "DejaVu Sans, Verdana, Arial, sans-serif"
+
+# Встроенная подложка: сторона в пикселях и качество webp.
+# ~9 КБ вместо 1 МБ исходного man.png; на схеме она полупрозрачна
+# и масштабируется браузером
+EMBED_BACKGROUND_SIDE = 512
+EMBED_BACKGROUND_QUALITY = 70
+
+# Межстрочный интервал и доля шрифта под базовой линией (как у DejaVu Sans в matplotlib)
+LINE_SPACING = 1.2
+DESCENT = 0.236
+
+_X0 = AXES_BOX[0] * CANVAS
+_Y0 = AXES_BOX[1] * CANVAS
+_SX = AXES_BOX[2] * CANVAS / (2 * EXTENT)
+_SY = AXES_BOX[3] * CANVAS / (2 * EXTENT)
+
+
+# Координаты округляются до 0.1 пт (0.3 px на самой большой картинке)
+
+def _x(x: float) -> str:
+    return f"{_X0 + (x + EXTENT) * _SX:.1f}"
+
+
+def _y(y: float) -> str:
+    # ось y в SVG направлена вниз
+    return f"{CANVAS - _Y0 - (y + EXTENT) * _SY:.1f}"
+
+
+def _path(segments: List[Tuple[float, float, float, float]], color: str, width: float, alpha: float) -> str:
+    """
+    Отрезки одного стиля — одним элементом path.
+    """
+    d = "".join(f"M{_x(x1)} {_y(y1)}L{_x(x2)} {_y(y2)}" for x1, y1, x2, y2 in segments)
+    return f'<path d="{d}" stroke="{color}" stroke-width="{width}" stroke-opacity="{alpha}"/>'
+
+
+def _styles(items: List[Tuple[Hashable, Any]]) -> Dict[Hashable, List[Any]]:
+    """
+    Сгруппировать элементы по стилю с сохранением порядка первых появлений.
+    """
+    groups: Dict[Hashable, List[Any]] = {}
+    for style, item in items:
+        groups.setdefault(style, []).append(item)
+    return groups
+
+
+def _ellipse(xy: Tuple[float, float], r: float, attrs: str) -> str:
+    # оси в drawing.py растянуты (aspect="auto"), поэтому круг схемы — эллипс
+    return (
+        f'<ellipse cx="{_x(xy[0])}" cy="{_y(xy[1])}" '
+        f'rx="{r * _SX:.1f}" ry="{r * _SY:.1f}" {attrs}/>'
+    )
+
+
+def _text_attrs(ha: str, va: str, fontsize: float, color: str, weight: str = "normal") -> str:
+    anchor = {"left": "start", "center": "middle", "right": "end"}[ha]
+    attrs = f'font-size="{fontsize}" fill="{color}" text-anchor="{anchor}"'
+    if va == "center":
+        attrs += ' dominant-baseline="central"'
+    elif va == "top":
+        attrs += ' dominant-baseline="hanging"'
+    if weight != "normal":
+        attrs += f' font-weight="{weight}"'
+    return attrs
+
+
+# ---------- СТАТИЧЕСКАЯ ЧАСТЬ ----------
+
+def _embedded_background(background_path: str) -> str:
+    """
+    Подложка как data-URI (уменьшенный webp); пустая строка, если файла нет.
+    """
+    if not background_path or not os.path.exists(background_path):
+        return ""
+    try:
+        with Image.open(background_path) as img:
+            img = img.convert("RGB").resize(
+                (EMBED_BACKGROUND_SIDE, EMBED_BACKGROUND_SIDE), Image.LANCZOS
+            )
+            buf = io.BytesIO()
+            img.save(buf, format="WEBP", quality=EMBED_BACKGROUND_QUALITY)
+    except Exception as e:
+        print(f"Ошибка загрузки '{background_path}': {e}")
+        return ""
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def _render_static(background_href: str) -> str:
+    parts: List[str] = [f'<rect width="{CANVAS:g}" height="{CANVAS:g}" fill="{FACECOLOR}"/>']
+
+    # подложка-человек
+    if background_href:
+        parts.append(
+            f'<image x="{_x(-EXTENT)}" y="{_y(EXTENT)}" '
+            f'width="{2 * EXTENT * _SX:.1f}" height="{2 * EXTENT * _SY:.1f}" '
+            f'preserveAspectRatio="none" opacity="{BACKGROUND_ALPHA}" href="{background_href}"/>'
+        )
+
+    # геометрия без заливки (fill="none" у корневой группы, узлы задают свою)
+    parts.append('<g fill="none">')
+
+    # большой круг
+    parts.append(_ellipse(
+        (0, 0), R_MAIN,
+        f'stroke="{MAIN_CIRCLE_COLOR}" stroke-width="2" stroke-opacity="0.9"',
+    ))
+
+    # деления возрастов: по одному path на толщину
+    ticks = _styles([((lw, alpha), (x_in, y_in, x_out, y_out)) for _, x_in, y_in, x_out, y_out, lw, alpha in age_ticks()])
+    for (lw, alpha), segments in ticks.items():
+        parts.append(_path(segments, TICK_COLOR, lw, alpha))
+
+    # подписи делений и лет
+    for ages, radius, fmt, fontsize, color in (
+        (range(0, 71, 10), AGE_LABEL_R, "{}", 8, "#cfd8ff"),
+        (AGE_CAPTIONS, AGE_CAPTION_R, "{} лет", 7, "#9fa8da"),
+    ):
+        texts = "".join(
+            f'<text x="{_x(lx)}" y="{_y(ly)}">{fmt.format(age)}</text>'
+            for age in ages
+            for lx, ly in (age_label_xy(age, radius),)
+        )
+        parts.append(f'<g {_text_attrs("center", "center", fontsize, color)}>{texts}</g>')
+
+    # верхняя дуга
+    xs, ys = top_arc()
+    points = " ".join(f"{_x(x)},{_y(y)}" for x, y in zip(xs, ys))
+    parts.append(
+        f'<polyline points="{points}" stroke="{LINE_COLOR}" '
+        f'stroke-width="1.4" stroke-opacity="0.7"/>'
+    )
+
+    # центральная линия и корона
+    parts.append(_path([CROWN_LINE], CROWN_COLOR, 1.2, 0.7))
+    for radius, alpha in CROWN_CIRCLES:
+        parts.append(_ellipse(
+            (0, TOP_NODE_Y), radius,
+            f'stroke="{CROWN_COLOR}" stroke-width="2" stroke-opacity="{alpha}"',
+        ))
+
+    # линии схемы и круги узлов
+    lines = _styles([(alpha, (x1, y1, x2, y2)) for x1, y1, x2, y2, alpha in LINES])
+    for alpha, segments in lines.items():
+        parts.append(_path(segments, LINE_COLOR, 1.5, alpha))
+    nodes = "".join(
+        _ellipse(n.xy, n.radius, f'fill="{n.facecolor}" stroke="{n.edgecolor}"')
+        for n in NODES
+    )
+    parts.append(f'<g stroke-width="2">{nodes}</g>')
+    parts.append("</g>")
+
+    return "".join(parts)
+
+
+# ссылка на подложку (data-URI, URL или "") → статическая часть
+_STATIC: Dict[str, str] = {}
+# путь к файлу подложки → data-URI
+_EMBEDDED: Dict[str, str] = {}
+_STATIC_LOCK = threading.Lock()
+
+
+def _get_static(background_path: Optional[str], background_href: Optional[str]) -> str:
+    if background_href is None:
+        key = os.path.abspath(background_path) if background_path else ""
+        background_href = _EMBEDDED.get(key)
+        if background_href is None:
+            with _STATIC_LOCK:
+                background_href = _EMBEDDED.get(key)
+                if background_href is None:
+                    background_href = _embedded_background(key)
+                    _EMBEDDED[key] = background_href
+
+    static = _STATIC.get(background_href)
+    if static is None:
+        with _STATIC_LOCK:
+            static = _STATIC.get(background_href)
+            if static is None:
+                static = _render_static(background_href)
+                _STATIC[background_href] = static
+    return static
+
+
+def prepare_static(background_path: Optional[str] = None, background_href: Optional[str] = None) -> None:
+    """
+    Собрать статическую часть заранее (при старте приложения): первый вызов
+    render_svg иначе раскодирует, уменьшает и кодирует в webp подложку — ~160 мс.
+    """
+    _get_static(background_path, background_href)
+
+
+# ---------- ПОДПИСИ: ШАБЛОН ----------
+
+def _compile_labels() -> str:
+    """
+    Шаблон подписей: по слоту {} на каждую строку каждой подписи из LABELS
+    (число строк подписи фиксировано раскладкой). Подряд идущие подписи
+    с одинаковым оформлением (числа в узлах) собираются в одну группу.
+    """
+    groups: List[Tuple[str, List[str]]] = []
+    for label in LABELS:
+        x, y = _x(label.xy[0]), _y(label.xy[1])
+        attrs = _text_attrs(label.ha, label.va, label.fontsize, label.color, label.weight)
+        if label.lines == 1:
+            text = f'<text x="{x}" y="{y}">{{}}</text>'
+        else:
+            # многострочная подпись: va="bottom" — низ последней строки на y
+            step = LINE_SPACING * label.fontsize
+            first = float(y) - DESCENT * label.fontsize - (label.lines - 1) * step
+            text = f'<text><tspan x="{x}" y="{first:.1f}">{{}}</tspan>' + "".join(
+                f'<tspan x="{x}" dy="{step:g}">{{}}</tspan>' for _ in range(label.lines - 1)
+            ) + "</text>"
+        if groups and groups[-1][0] == attrs:
+            groups[-1][1].append(text)
+        else:
+            groups.append((attrs, [text]))
+    return "".join(f'<g {attrs}>{"".join(texts)}</g>' for attrs, texts in groups)
+
+
+_LABELS_TEMPLATE = _compile_labels()
+
+_HEAD = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="{side}" height="{side}" '
+    f'viewBox="0 0 {CANVAS:g} {CANVAS:g}" font-family="{FONT_FAMILY}">'
+)
+
+_XML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+
+
+def render_svg(
+    matrix: MatrixDestiny,
+    side: int = 1024,
+    background_path: Optional[str] = None,
+    background_href: Optional[str] = None,
+) -> str:
+    """
+    Картинка матрицы как SVG-документ (строка).
+
+    side            — ширина и высота в пикселях (атрибуты width/height);
+    background_path — файл подложки, встраивается в SVG как data-URI;
+    background_href — вместо встраивания сослаться на подложку по URL
+                      (файл меньше, но браузер не грузит внешние ресурсы
+                      SVG, показанного через <img>).
+    """
+    values = []
+    for label in LABELS:
+        text = label.text(matrix).translate(_XML_ESCAPE)
+        if label.lines == 1:
+            values.append(text)
+        else:
+            values.extend(text.split("\n"))
+    return (
+        _HEAD.format(side=side)
+        + _get_static(background_path, background_href)
+        + _LABELS_TEMPLATE.format(*values)
+        + "</svg>"
+    )
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from math import sin, cos, pi
+from typing import Callable, Iterator, List, Tuple
+
+from calculations import MatrixDestiny
+
+# =====================================================
+# РАСКЛАДКА СХЕМЫ МАТРИЦЫ
+# =====================================================
+#
+# Геометрия и подписи схемы без привязки к способу рисования:
+# общие для растрового рендерера на matplotlib (drawing.py)
+# и SVG-рендерера (drawing_svg.py), который matplotlib не импортирует.
+# Координаты — в единицах схемы, центр матрицы в (0, 0).
+
+
+# ---------- КАРТИНКА ----------
+
+# Размер картинки (дюймы) и видимая область в координатах схемы
+FIGSIZE = 8.0
+EXTENT = 5.5
+FACECOLOR = "#02110d"
+
+# Размеры картинки: DPI при FIGSIZE дюймов (сторона 480 / 1024 / 1600 px)
+SIZE_TIERS = {
+    "thumb": 60,
+    "screen": 128,
+    "print": 200,
+}
+
+
+def image_side(dpi: float) -> int:
+    """
+    Сторона квадратной картинки в пикселях для заданного DPI.
+    """
+    return int(round(FIGSIZE * dpi))
+
+
+# Положение осей на картинке (доли ширины и высоты: x0, y0 снизу, ширина, высота),
+# которое даёт tight_layout в drawing.py с подложкой; используется в SVG
+AXES_BOX = (0.01875, 0.01875, 0.9625, 0.9416)
+
+# Прозрачность подложки-человека
+BACKGROUND_ALPHA = 0.9
+
+
+# ---------- ФОН: КРУГ С ГОДАМИ И ВЕРХНЕЙ ДУГОЙ ----------
+
+# радиус основного круга матрицы
+R_MAIN = 4.0
+
+# окружность для делений возрастов
+R_TICK_IN = R_MAIN - 0.25
+R_TICK_OUT = R_MAIN + 0.15
+
+# верхняя дуга
+R_TOP = 6.4
+CENTER_TOP_Y = -0.8
+
+# корона — общее предназначение
+TOP_NODE_Y = CENTER_TOP_Y + R_TOP
+
+MAIN_CIRCLE_COLOR = "#1a8f5c"
+TICK_COLOR = "#8088aa"
+LINE_COLOR = "#1d7b4a"
+CROWN_COLOR = "#f2c94c"
+
+
+def age_to_angle(age: float) -> float:
+    return pi * (1 + (20 - age) / 40.0)
+
+
+def age_ticks() -> Iterator[Tuple[int, float, float, float, float, float, float]]:
+    """
+    Деления возрастов 0..70: (возраст, x_in, y_in, x_out, y_out, толщина, alpha).
+    """
+    for age in range(0, 71):
+        ang = age_to_angle(age)
+        if age % 10 == 0:
+            lw = 1.6
+            alpha = 0.9
+        elif age % 5 == 0:
+            lw = 1.2
+            alpha = 0.6
+        else:
+            lw = 0.8
+            alpha = 0.3
+        yield (
+            age,
+            R_TICK_IN * cos(ang),
+            R_TICK_IN * sin(ang),
+            R_TICK_OUT * cos(ang),
+            R_TICK_OUT * sin(ang),
+            lw,
+            alpha,
+        )
+
+
+def age_label_xy(age: float, r: float) -> Tuple[float, float]:
+    ang = age_to_angle(age)
+    return r * cos(ang), r * sin(ang)
+
+
+# подписи делений (число) и лет
+AGE_LABEL_R = R_TICK_OUT + 0.25
+AGE_CAPTION_R = R_TICK_OUT + 0.55
+AGE_CAPTIONS = (0, 10, 20, 30, 40, 50, 60, 70)
+
+
+def top_arc() -> Tuple[List[float], List[float]]:
+    """
+    Точки верхней дуги (от 40° до 139°).
+    """
+    angles = [i * pi / 180 for i in range(40, 140)]
+    xs = [R_TOP * cos(a) for a in angles]
+    ys = [CENTER_TOP_Y + R_TOP * sin(a) for a in angles]
+    return xs, ys
+
+
+# центральная линия к короне
+CROWN_LINE = (0, R_MAIN, 0, CENTER_TOP_Y + R_TOP - 0.9)
+
+# корона: две окружности (радиус, alpha)
+CROWN_CIRCLES = ((1.0, 0.9), (0.7, 0.5))
+
+
+# ---------- КООРДИНАТЫ И УЗЛЫ ----------
+
+A = (-2.3, 0.0)
+B = (0.0, 2.7)
+C = (2.3, 0.0)
+D = (0.0, -2.7)
+CENTER = (0.0, 0.0)
+
+E = (-2.3, 2.7)
+F = (2.3, 2.7)
+H = (-2.3, -2.7)
+I_ = (2.3, -2.7)
+
+P1 = A
+P2 = (-1.6, 0.0)
+P3 = (-0.7, 0.0)
+
+T1 = C
+T2 = (1.6, 0.0)
+T3 = (0.7, 0.0)
+
+MK1 = (1.7, -0.9)
+MK2 = (1.2, -1.8)
+MK3 = C
+
+KT1 = (-1.7, -0.9)
+KT2 = (-1.2, -1.8)
+KT3 = D
+
+
+@dataclass(frozen=True)
+class Node:
+    """
+    Узел схемы: круг (статический слой) и число в нём (меняется от даты к дате).
+    """
+    xy: Tuple[float, float]
+    value: Callable[[MatrixDestiny], int]
+    radius: float = 0.3
+    facecolor: str = "#02231d"
+    edgecolor: str = "#f2c94c"
+    fontsize: int = 14
+
+
+# Порядок важен: круги рисуются друг поверх друга в этом порядке
+NODES: List[Node] = [
+    Node(CENTER, lambda m: m.primary.center, radius=0.35, facecolor="#b29825", edgecolor="#ffe082", fontsize=16),
+
+    Node(A, lambda m: m.primary.A, radius=0.35, facecolor="#4b3b8b"),
+    Node(B, lambda m: m.primary.B, radius=0.35, facecolor="#1a8f5c"),
+    Node(C, lambda m: m.primary.C, radius=0.35, facecolor="#b3433a"),
+    Node(D, lambda m: m.primary.D, radius=0.35, facecolor="#992a3b"),
+
+    Node(E, lambda m: m.rod_square["E"], radius=0.32, facecolor="#1d7b4a"),
+    Node(F, lambda m: m.rod_square["F"], radius=0.32, facecolor="#1d7b4a"),
+    Node(H, lambda m: m.rod_square["H"], radius=0.32, facecolor="#1d7b4a"),
+    Node(I_, lambda m: m.rod_square["I"], radius=0.32, facecolor="#1d7b4a"),
+
+    Node(P1, lambda m: m.portrait.first, radius=0.33, facecolor="#6c2c8a"),
+    Node(P2, lambda m: m.portrait.second, radius=0.28, facecolor="#1d7b4a"),
+    Node(P3, lambda m: m.portrait.third, radius=0.28, facecolor="#1a8f5c"),
+
+    Node(T1, lambda m: m.talents.first, radius=0.33, facecolor="#206b3a"),
+    Node(T2, lambda m: m.talents.second, radius=0.28, facecolor="#1d7b4a"),
+    Node(T3, lambda m: m.talents.third, radius=0.28, facecolor="#1a8f5c"),
+
+    Node(MK1, lambda m: m.material_karma.first, radius=0.28, facecolor="#c46b2a"),
+    Node(MK2, lambda m: m.material_karma.second, radius=0.28, facecolor="#c46b2a"),
+
+    Node(KT1, lambda m: m.karmic_tail.first, radius=0.28, facecolor="#c45782"),
+    Node(KT2, lambda m: m.karmic_tail.second, radius=0.28, facecolor="#c45782"),
+]
+
+# Линии схемы: (x1, y1, x2, y2, alpha)
+LINES = [
+    (*A, *B, 0.5),
+    (*B, *C, 0.5),
+    (*C, *D, 0.5),
+    (*D, *A, 0.5),
+
+    (*E, *F, 0.5),
+    (*F, *I_, 0.5),
+    (*I_, *H, 0.5),
+    (*H, *E, 0.5),
+
+    (-3.5, 0, 3.5, 0, 0.25),
+    (0, -3.5, 0, 3.5, 0.25),
+]
+
+
+# ---------- ПОДПИСИ ----------
+
+@dataclass(frozen=True)
+class Label:
+    """
+    Текст, зависящий от даты: положение и оформление фиксированы,
+    строка считается функцией text(matrix). Строки разделяются '\\n',
+    их число (lines) не зависит от даты.
+    """
+    xy: Tuple[float, float]
+    text: Callable[[MatrixDestiny], str]
+    ha: str = "center"
+    va: str = "center"
+    fontsize: int = 10
+    color: str = "#ffffff"
+    weight: str = "normal"
+    zorder: int = 2
+    lines: int = 1
+
+
+def _node_label(n: Node) -> Label:
+    value = n.value
+    return Label(n.xy, lambda m: str(value(m)), fontsize=n.fontsize, color="white", weight="bold", zorder=3)
+
+
+LABELS: List[Label] = [
+    *(_node_label(n) for n in NODES),
+
+    Label((0, TOP_NODE_Y), lambda m: str(m.purpose_general), fontsize=16, weight="bold"),
+
+    Label(
+        (0, 4.6),
+        lambda m: (
+            f"Баланс: {m.balance}\n"
+            f"Личное пред.: {m.purpose_personal}\n"
+            f"Соц. пред.: {m.purpose_social}\n"
+            f"Общее пред.: {m.purpose_general}"
+        ),
+        va="bottom",
+        color="#cfd8ff",
+        lines=4,
+    ),
+
+    Label((-4.3, -4.4), lambda m: f"Партнёр: {m.ideal_partner}", ha="left", va="top", color="#ffcdd2"),
+    Label((4.3, -4.4), lambda m: f"Профессия: {m.ideal_profession}", ha="right", va="top", color="#ffe0b2"),
+]
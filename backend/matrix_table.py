@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from calculations import (
+    MatrixDestiny,
+    PrimaryPoints,
+    TripleZone,
+    compute_matrix_batch,
+    set_matrix_table,
+)
+
+
+# ---------- НАСТРОЙКИ ----------
+
+# Диапазон дат, для которых храним готовые матрицы (включительно)
+TABLE_START = date(1900, 1, 1)
+TABLE_END = date(2100, 12, 31)
+
+# Файл с таблицей по умолчанию (можно переопределить через MATRIX_TABLE_PATH).
+# Фактическое имя содержит хеш исходников формул (см. versioned_path)
+DEFAULT_TABLE_PATH = Path(__file__).resolve().parent / "app" / "data" / "matrix_table.npy"
+
+# Исходники, от которых зависят значения таблицы: формулы и порядок колонок
+_BACKEND_DIR = Path(__file__).resolve().parent
+SOURCES = (
+    _BACKEND_DIR / "calculations.py",
+    _BACKEND_DIR / "calc" / "digits.py",
+    _BACKEND_DIR / "matrix_table.py",
+)
+
+# Порядок колонок в таблице. Все значения — арканы 1..22, поэтому хватает uint8.
+FIELDS = (
+    "A", "B", "C", "D", "center",
+    "portrait_first", "portrait_second", "portrait_third",
+    "talents_first", "talents_second", "talents_third",
+    "mk_first", "mk_second", "mk_third",
+    "kt_first", "kt_second", "kt_third",
+    "rod_E", "rod_F", "rod_I", "rod_H",
+    "balance", "ideal_partner", "ideal_profession",
+    "purpose_personal", "purpose_social", "purpose_general",
+)
+
+
+def matrix_to_row(m: MatrixDestiny) -> list[int]:
+    """
+    Развернуть MatrixDestiny в строку таблицы (в порядке FIELDS).
+    """
+    p = m.primary
+    return [
+        p.A, p.B, p.C, p.D, p.center,
+        m.portrait.first, m.portrait.second, m.portrait.third,
+        m.talents.first, m.talents.second, m.talents.third,
+        m.material_karma.first, m.material_karma.second, m.material_karma.third,
+        m.karmic_tail.first, m.karmic_tail.second, m.karmic_tail.third,
+        m.rod_square["E"], m.rod_square["F"], m.rod_square["I"], m.rod_square["H"],
+        m.balance, m.ideal_partner, m.ideal_profession,
+        m.purpose_personal, m.purpose_social, m.purpose_general,
+    ]
+
+
+def row_to_matrix(row: list[int]) -> MatrixDestiny:
+    """
+    Обратное преобразование: строка таблицы → MatrixDestiny.
+    """
+    (
+        A, B, C, D, center,
+        p1, p2, p3,
+        t1, t2, t3,
+        mk1, mk2, mk3,
+        kt1, kt2, kt3,
+        E, F, I, H,
+        balance, partner, profession,
+        personal, social, general,
+    ) = row
+    return MatrixDestiny(
+        primary=PrimaryPoints(A=A, B=B, C=C, D=D, center=center),
+        portrait=TripleZone(first=p1, second=p2, third=p3),
+        talents=TripleZone(first=t1, second=t2, third=t3),
+        material_karma=TripleZone(first=mk1, second=mk2, third=mk3),
+        karmic_tail=TripleZone(first=kt1, second=kt2, third=kt3),
+        rod_square={"E": E, "F": F, "I": I, "H": H},
+        balance=balance,
+        ideal_partner=partner,
+        ideal_profession=profession,
+        purpose_personal=personal,
+        purpose_social=social,
+        purpose_general=general,
+    )
+
+
+# ---------- ТАБЛИЦА ----------
+
+class MatrixTable:
+    """
+    Готовые матрицы судьбы для каждой даты из [TABLE_START, TABLE_END].
+    Строка таблицы = порядковый номер даты (date.toordinal()) - start_ordinal.
+    """
+
+    def __init__(self, data: np.ndarray, start: date = TABLE_START):
+        if data.ndim != 2 or data.shape[1] != len(FIELDS):
+            raise ValueError(f"Неверная форма таблицы матриц: {data.shape}")
+        self.data = data
+        self.start_ordinal = start.toordinal()
+        self.end_ordinal = self.start_ordinal + data.shape[0] - 1
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def lookup(self, ordinal: int) -> Optional[MatrixDestiny]:
+        """
+        O(1) поиск по порядковому номеру даты.
+        Для дат вне таблицы возвращает None — вызывающий считает сам.
+        """
+        if ordinal < self.start_ordinal or ordinal > self.end_ordinal:
+            return None
+        return row_to_matrix(self.data[ordinal - self.start_ordinal].tolist())
+
+    @classmethod
+    def build(cls, start: date = TABLE_START, end: date = TABLE_END) -> "MatrixTable":
+        """
+        Посчитать таблицу пакетным расчётом compute_matrix_batch.
+        """
+        days = np.arange(
+            np.datetime64(start, "D"), np.datetime64(end, "D") + 1, dtype="datetime64[D]"
+        )
+        years = days.astype("datetime64[Y]")
+        months = days.astype("datetime64[M]")
+        year = years.astype(np.int64) + 1970
+        month = (months - years.astype("datetime64[M]")).astype(np.int64) + 1
+        day = (days - months.astype("datetime64[D]")).astype(np.int64) + 1
+
+        r = compute_matrix_batch(day, month, year)
+        columns = [
+            r["primary"]["A"], r["primary"]["B"], r["primary"]["C"], r["primary"]["D"],
+            r["primary"]["center"],
+            *(r["portrait"][k] for k in ("first", "second", "third")),
+            *(r["talents"][k] for k in ("first", "second", "third")),
+            *(r["material_karma"][k] for k in ("first", "second", "third")),
+            *(r["karmic_tail"][k] for k in ("first", "second", "third")),
+            *(r["rod_square"][k] for k in ("E", "F", "I", "H")),
+            r["balance"], r["ideal_partner"], r["ideal_profession"],
+            r["purpose"]["personal"], r["purpose"]["social"], r["purpose"]["general"],
+        ]
+        data = np.stack(columns, axis=1).astype(np.uint8)
+        return cls(data, start)
+
+    def save(self, path: Path | str = DEFAULT_TABLE_PATH) -> None:
+        """
+        Сохранить таблицу в .npy (диапазон дат задан константами TABLE_START/TABLE_END).
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, np.ascontiguousarray(self.data))
+
+    @classmethod
+    def load(cls, path: Path | str = DEFAULT_TABLE_PATH) -> "MatrixTable":
+        """
+        Загрузить таблицу из .npy (memory-map, только чтение).
+        """
+        data = np.load(Path(path), mmap_mode="r")
+        if data.dtype != np.uint8:
+            raise ValueError(f"Неверный тип данных таблицы матриц: {data.dtype}")
+        return cls(data, TABLE_START)
+
+
+# ---------- ВЕРСИЯ ----------
+
+@lru_cache(maxsize=None)
+def source_hash() -> str:
+    """
+    Хеш исходников формул и диапазона дат: при изменении compute_matrix_for /
+    compute_matrix_batch прежняя таблица не подходит и строится заново.
+    """
+    h = hashlib.sha256(f"{TABLE_START}:{TABLE_END}".encode())
+    for path in SOURCES:
+        h.update(path.name.encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()[:12]
+
+
+def versioned_path(path: Path | str) -> Path:
+    """
+    matrix_table.npy → matrix_table_<хеш исходников>.npy
+    """
+    path = Path(path)
+    return path.with_name(f"{path.stem}_{source_hash()}{path.suffix}")
+
+
+def _remove_stale(path: Path, current: Path) -> None:
+    """
+    Удалить таблицы прежних версий (и файл без хеша в имени) рядом с текущей.
+    """
+    candidates = [path, *path.parent.glob(f"{path.stem}_*{path.suffix}")]
+    for stale in candidates:
+        if stale != current and stale.exists():
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+
+# ---------- ПОДКЛЮЧЕНИЕ ----------
+
+def init_matrix_table(path: Path | str | None = None) -> Optional[MatrixTable]:
+    """
+    Загрузить таблицу из файла (или построить и сохранить, если файла нет)
+    и подключить её к calculations.compute_matrix.
+
+    Отключается переменной окружения MATRIX_TABLE=0.
+    """
+    if os.getenv("MATRIX_TABLE", "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+
+    base_path = Path(path or os.getenv("MATRIX_TABLE_PATH") or DEFAULT_TABLE_PATH)
+    path = versioned_path(base_path)
+    table: Optional[MatrixTable] = None
+
+    if path.exists():
+        try:
+            table = MatrixTable.load(path)
+            expected = TABLE_END.toordinal() - TABLE_START.toordinal() + 1
+            if len(table) != expected:
+                print(f"Таблица матриц '{path}' устарела, пересчитываем")
+                table = None
+        except Exception as e:
+            print(f"Ошибка загрузки таблицы матриц '{path}': {e}")
+            table = None
+
+    if table is None:
+        table = MatrixTable.build()
+        try:
+            table.save(path)
+            _remove_stale(base_path, path)
+        except OSError as e:
+            # файловая система может быть только для чтения — работаем из памяти
+            print(f"Не удалось сохранить таблицу матриц '{path}': {e}")
+
+    set_matrix_table(table)
+    return table
+
+
+if __name__ == "__main__":
+    # python matrix_table.py [путь] — пересобрать файл таблицы
+    import sys
+    import time
+
+    base_path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TABLE_PATH
+    out_path = versioned_path(base_path)
+    t0 = time.perf_counter()
+    tbl = MatrixTable.build()
+    tbl.save(out_path)
+    _remove_stale(base_path, out_path)
+    print(
+        f"Таблица матриц: {len(tbl)} дат, {tbl.data.nbytes / 1024:.0f} КБ, "
+        f"{time.perf_counter() - t0:.1f} с → {out_path}"
+    )
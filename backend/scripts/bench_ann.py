@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Приближённый поиск IVF (app/vector_index.py) против точного перебора:
+recall@10, время запроса и доля просмотренных векторов для разных nprobe.
+
+recall@10 — доля настоящих 10 ближайших (точный поиск), найденных индексом.
+Корпус — синтетические embedding с перекрывающимися темами (как у чанков
+разных книг и глав) или настоящие из chunks.json (--chunks); запросы — векторы
+корпуса с шумом, то есть похожие на текст книг, но не совпадающие с ним.
+На синтетике recall — ориентир; на настоящих embedding его стоит перемерить.
+
+Запуск (из папки backend):
+   python -m scripts.bench_ann
+   python -m scripts.bench_ann --size 200000 --nprobe 1,4,16,64 --lists 512
+   python -m scripts.bench_ann --chunks app/data/ai_knowledge/chunks.json
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.vector_index import IVFIndex, normalize_embeddings, top_k_rows
+
+K = 10
+
+# Внутренняя размерность синтетического корпуса
+LATENT_DIM = 32
+
+
+def synthetic_corpus(n: int, dim: int, topics: int, rng) -> np.ndarray:
+    """
+    Embedding текстов лежат около подпространства малой размерности: точки вокруг
+    topics центров тем в LATENT_DIM-мерном пространстве (темы перекрываются),
+    случайно вложенном в dim-мерное, плюс небольшой шум по всем осям.
+    """
+    centers = 2.0 * rng.standard_normal((topics, LATENT_DIM))
+    latent = centers[rng.integers(0, topics, n)] + 2.0 * rng.standard_normal((n, LATENT_DIM))
+    projection = rng.standard_normal((LATENT_DIM, dim)).astype(np.float32)
+    noise = 0.3 * np.sqrt(LATENT_DIM) * rng.standard_normal((n, dim), dtype=np.float32)
+    return latent.astype(np.float32) @ projection + noise
+
+
+def per_query_ms(func, queries: np.ndarray) -> float:
+    t0 = time.perf_counter()
+    for q in queries:
+        func(q[None, :])
+    return (time.perf_counter() - t0) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="recall@10 индекса IVF против точного поиска")
+    parser.add_argument("--size", type=int, default=50000, help="число векторов синтетического корпуса")
+    parser.add_argument("--dim", type=int, default=1536, help="размерность синтетических векторов")
+    parser.add_argument("--topics", type=int, default=300, help="тематических кластеров в синтетическом корпусе")
+    parser.add_argument("--chunks", help="взять embedding из chunks.json вместо синтетических")
+    parser.add_argument("--lists", type=int, default=0, help="списков IVF (по умолчанию ~sqrt(n))")
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32", help="значения nprobe через запятую")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.chunks:
+        with open(args.chunks, "r", encoding="utf-8") as f:
+            raw = np.array([c["embedding"] for c in json.load(f) if "embedding" in c])
+    else:
+        raw = synthetic_corpus(args.size, args.dim, args.topics, rng)
+    embeddings = normalize_embeddings(raw)
+    del raw
+    n, dim = embeddings.shape
+
+    t0 = time.perf_counter()
+    index = IVFIndex.build(embeddings, args.lists or None)
+    build_s = time.perf_counter() - t0
+    # как в load_chunks: строки в порядке списков
+    embeddings = np.ascontiguousarray(embeddings[index.order])
+    sizes = index.offsets[1:] - index.offsets[:-1]
+    print(
+        f"векторов: {n}, размерность: {dim}, списков: {index.n_lists} "
+        f"(от {sizes.min()} до {sizes.max()}), построение: {build_s:.1f} с"
+    )
+
+    picked = embeddings[rng.choice(n, args.queries, replace=False)]
+    queries = normalize_embeddings(picked + 0.5 * rng.standard_normal(picked.shape).astype(np.float32) / np.sqrt(dim))
+
+    exact = top_k_rows(queries @ embeddings.T, K)
+    t_exact = per_query_ms(lambda q: top_k_rows(q @ embeddings.T, K), queries)
+    print(f"{'nprobe':>7} {'recall@10':>10} {'мс/запрос':>10} {'ускорение':>10} {'просмотрено':>12}")
+    print(f"{'точно':>7} {1.0:>10.3f} {t_exact:>10.3f} {1.0:>9.1f}x {1.0:>12.1%}")
+
+    for nprobe in (int(v) for v in args.nprobe.split(",")):
+        found = index.search(embeddings, queries, K, nprobe)
+        recall = np.mean([len(np.intersect1d(f, e)) / K for f, e in zip(found, exact)])
+        probes = top_k_rows(queries @ index.centroids.T, min(nprobe, index.n_lists))
+        scanned = np.mean(sizes[probes].sum(axis=1)) / n
+        t_ann = per_query_ms(lambda q: index.search(embeddings, q, K, nprobe), queries)
+        print(f"{nprobe:>7} {recall:>10.3f} {t_ann:>10.3f} {t_exact / t_ann:>9.1f}x {scanned:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
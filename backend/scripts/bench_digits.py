@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк табличного ядра calc/digits.py против прежних реализаций
+через str()/int().
+
+Запуск (из папки backend):
+   python -m scripts.bench_digits
+"""
+import sys
+import timeit
+from pathlib import Path
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from calc.digits import digit_sum, reduce_to_9, reduce_to_12, reduce_to_22, reduce_to_9_master
+
+
+# ---------- ПРЕЖНИЕ РЕАЛИЗАЦИИ (для сравнения) ----------
+
+def old_digit_sum(n: int) -> int:
+    return sum(int(d) for d in str(abs(n)))
+
+
+def old_reduce(n: int, limit: int) -> int:
+    while n > limit:
+        n = sum(int(d) for d in str(n))
+    return n
+
+
+def old_reduce_to_12(n: int) -> int:
+    n = abs(int(n))
+    while n > 12:
+        s = 0
+        t = n
+        while t > 0:
+            s += t % 10
+            t //= 10
+        n = s
+    return n
+
+
+def old_reduce_master(n: int) -> int:
+    while n > 9 and n not in [11, 22, 33]:
+        n = sum(int(d) for d in str(n))
+    return n
+
+
+# Типичные входы: дни, месяцы, годы, суммы точек матрицы
+VALUES = list(range(1, 32)) + list(range(1, 89)) + list(range(1900, 2101, 7))
+
+CASES = [
+    ("digit_sum", old_digit_sum, digit_sum),
+    ("reduce_to_9", lambda n: old_reduce(n, 9), reduce_to_9),
+    ("reduce_to_12", old_reduce_to_12, reduce_to_12),
+    ("reduce_to_22", lambda n: old_reduce(n, 22), reduce_to_22),
+    ("reduce_to_9_master", old_reduce_master, reduce_to_9_master),
+]
+
+
+def bench(func, number: int) -> float:
+    """Среднее время одного вызова в наносекундах."""
+    values = VALUES
+
+    def run():
+        for v in values:
+            func(v)
+
+    best = min(timeit.repeat(run, number=number, repeat=5))
+    return best / (number * len(values)) * 1e9
+
+
+def main():
+    number = 200
+    print(f"{'функция':<20} {'было, нс':>10} {'стало, нс':>10} {'ускорение':>10}")
+    for name, old, new in CASES:
+        for v in VALUES:
+            assert old(v) == new(v), (name, v)
+        t_old = bench(old, number)
+        t_new = bench(new, number)
+        print(f"{name:<20} {t_old:>10.0f} {t_new:>10.0f} {t_old / t_new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
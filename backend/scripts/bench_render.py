@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк отрисовки картинки матрицы (drawing.draw_matrix): время, пиковая память
+и размер файла для каждого сочетания размера (DPI), формата и подложки (с ней и без)
+при 1..N одновременных отрисовках.
+
+Одновременность — как у пула render сервера: N процессов (spawn), каждый рисует
+свои даты. Для каждого сочетания поднимается свежий пул, поэтому пиковый RSS
+(ru_maxrss процесса) относится только к нему. Первая отрисовка в каждом процессе
+(построение слоя фона) не входит в замер и выводится отдельно как cold_ms.
+
+Отчёт — JSON с версиями библиотек и коммитом; два отчёта сравниваются через --compare:
+   python -m scripts.bench_render --output before.json
+   (изменения)
+   python -m scripts.bench_render --output after.json --compare before.json
+
+Запуск (из папки backend, пиковый RSS — только Linux/macOS):
+   python -m scripts.bench_render
+   python -m scripts.bench_render --sizes screen --formats webp,png --concurrency 1,2,4,8 --renders 40
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import drawing
+from drawing import DEFAULT_BACKGROUND_PATH, IMAGE_FORMATS, SIZE_TIERS, image_side
+from scripts.common import parse_list, sample_dates
+
+# Показатели, по которым --compare ищет регрессии (больше — хуже)
+COMPARED_METRICS = ("p50_ms", "p95_ms", "peak_rss_mb", "bytes")
+
+
+# ---------- ПРОЦЕСС-РЕНДЕРЕР ----------
+
+_WORKER: Dict[str, object] = {}
+
+
+def _init_worker(background_path: str, dpi: float, tmpdir: str) -> None:
+    # слой фона строится здесь, как в init_render_worker сервера
+    t0 = time.perf_counter()
+    drawing.get_background_layer(dpi, drawing.FIGSIZE, background_path)
+    _WORKER["init_ms"] = (time.perf_counter() - t0) * 1000
+    # каталог создаёт и удаляет measure(); процессу — свой подкаталог
+    _WORKER["tmpdir"] = os.path.join(tmpdir, str(os.getpid()))
+    os.makedirs(_WORKER["tmpdir"], exist_ok=True)
+
+
+def _render(birth_date: str, dpi: float, fmt: str, background_path: str) -> Dict[str, float]:
+    """
+    Одна отрисовка draw_matrix в файл: время, размер файла, пиковый RSS процесса.
+    """
+    from calculations import compute_matrix
+
+    filename = os.path.join(_WORKER["tmpdir"], f"{birth_date}.{IMAGE_FORMATS[fmt][2]}")
+    matrix = compute_matrix(birth_date)
+    t0 = time.perf_counter()
+    drawing.draw_matrix(matrix, filename=filename, dpi=dpi, background_path=background_path, format=fmt)
+    elapsed = time.perf_counter() - t0
+    size = os.path.getsize(filename)
+    os.unlink(filename)
+    return {
+        "ms": elapsed * 1000,
+        "bytes": size,
+        "init_ms": _WORKER["init_ms"],
+        "pid": os.getpid(),
+        # ru_maxrss: КБ на Linux, байты на macOS
+        "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform == "darwin" else 1),
+    }
+
+
+# ---------- ЗАМЕР ----------
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(size: str, fmt: str, background: bool, concurrency: int, renders: int) -> Dict[str, object]:
+    dpi = SIZE_TIERS[size]
+    background_path = DEFAULT_BACKGROUND_PATH if background else ""
+    dates = sample_dates(renders + concurrency)
+    warmup, timed = dates[:concurrency], dates[concurrency:]
+
+    ctx = multiprocessing.get_context("spawn")
+    # процессы пула завершаются без atexit, поэтому временный каталог живёт в родителе
+    with tempfile.TemporaryDirectory(prefix="bench_render_") as tmpdir, \
+            ctx.Pool(concurrency, initializer=_init_worker, initargs=(background_path, dpi, tmpdir)) as pool:
+        # по одной отрисовке на процесс вне замера: импорт шрифтов, первые кэши matplotlib
+        cold = pool.starmap(_render, [(d, dpi, fmt, background_path) for d in warmup], chunksize=1)
+        t0 = time.perf_counter()
+        rows = pool.starmap(_render, [(d, dpi, fmt, background_path) for d in timed], chunksize=1)
+        wall = time.perf_counter() - t0
+
+    times = [r["ms"] for r in rows]
+    peak_rss: Dict[int, float] = {}
+    for r in cold + rows:
+        peak_rss[r["pid"]] = max(peak_rss.get(r["pid"], 0.0), r["rss_kb"])
+    return {
+        "size": size,
+        "dpi": dpi,
+        "side": image_side(dpi),
+        "format": fmt,
+        "background": background,
+        "concurrency": concurrency,
+        "renders": renders,
+        "wall_s": round(wall, 4),
+        "throughput_per_s": round(renders / wall, 2),
+        "mean_ms": round(sum(times) / len(times), 2),
+        "p50_ms": round(_percentile(times, 0.5), 2),
+        "p95_ms": round(_percentile(times, 0.95), 2),
+        "max_ms": round(max(times), 2),
+        "cold_ms": round(max(r["ms"] for r in cold), 2),
+        "init_ms": round(max(r["init_ms"] for r in cold), 2),
+        "bytes": round(sum(r["bytes"] for r in rows) / len(rows)),
+        # максимум по процессам пула
+        "peak_rss_mb": round(max(peak_rss.values()) / 1024, 1),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment() -> Dict[str, object]:
+    import matplotlib
+    import numpy as np
+    import PIL
+
+    return {
+        "commit": _git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "renderer_version": drawing.RENDERER_VERSION,
+        "python": platform.python_version(),
+        "matplotlib": matplotlib.__version__,
+        "numpy": np.__version__,
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "raster_mmap": drawing._raster_mmap_enabled(),
+    }
+
+
+# ---------- СРАВНЕНИЕ ОТЧЁТОВ ----------
+
+def _case_key(row: Dict[str, object]) -> tuple:
+    return (row["size"], row["format"], row["background"], row["concurrency"])
+
+
+def compare(baseline: Dict[str, object], results: List[Dict[str, object]], threshold: float) -> int:
+    """
+    Таблица изменений относительно прежнего отчёта; возвращает число регрессий
+    (показатель вырос больше чем на threshold).
+    """
+    old = {_case_key(r): r for r in baseline["results"]}
+    print(f"\nсравнение с {baseline['meta'].get('commit') or 'отчётом'} (порог {threshold:.0%}):")
+    print(f"{'вариант':<28} " + " ".join(f"{m:>16}" for m in COMPARED_METRICS))
+    regressions = 0
+    for row in results:
+        prev = old.get(_case_key(row))
+        if prev is None:
+            continue
+        cells = []
+        for metric in COMPARED_METRICS:
+            before, after = prev[metric], row[metric]
+            change = (after - before) / before if before else 0.0
+            mark = ""
+            if change > threshold:
+                mark = " !"
+                regressions += 1
+            cells.append(f"{change:>+13.1%}{mark:<3}")
+        print(f"{_case_label(row):<28} " + " ".join(cells))
+    return regressions
+
+
+def _case_label(row: Dict[str, object]) -> str:
+    bg = "фон" if row["background"] else "без фона"
+    return f"{row['size']}/{row['format']}/{bg}/x{row['concurrency']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк отрисовки картинки матрицы")
+    parser.add_argument("--sizes", default=",".join(SIZE_TIERS), help=f"через запятую: {', '.join(SIZE_TIERS)}")
+    parser.add_argument("--formats", default=",".join(IMAGE_FORMATS), help=f"через запятую: {', '.join(IMAGE_FORMATS)}")
+    parser.add_argument("--background", default="on,off", help="on, off или on,off")
+    parser.add_argument("--concurrency", default="1,4", help="числа одновременных отрисовок через запятую")
+    parser.add_argument("--renders", type=int, default=20, help="отрисовок на каждый замер")
+    parser.add_argument("--output", default="bench_render.json", help="куда записать отчёт")
+    parser.add_argument("--compare", help="прежний отчёт для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.10, help="рост показателя, считающийся регрессией")
+    args = parser.parse_args()
+
+    sizes = parse_list(args.sizes, SIZE_TIERS, "--sizes")
+    formats = parse_list(args.formats, IMAGE_FORMATS, "--formats")
+    backgrounds = [v == "on" for v in parse_list(args.background, ("on", "off"), "--background")]
+    levels = sorted({int(v) for v in args.concurrency.split(",") if v.strip()})
+    if not levels or levels[0] < 1:
+        raise SystemExit("--concurrency: целые числа от 1")
+
+    meta = _environment()
+    print(
+        f"коммит {meta['commit'] or '?'}, matplotlib {meta['matplotlib']}, "
+        f"CPU {meta['cpu_count']}, отрисовок на замер: {args.renders}"
+    )
+    print(
+        f"{'вариант':<28} {'сторона':>7} {'p50, мс':>8} {'p95, мс':>8} {'шт/с':>7} "
+        f"{'cold, мс':>9} {'RSS, МБ':>8} {'байт':>9}"
+    )
+
+    results = []
+    for size in sizes:
+        for fmt in formats:
+            for background in backgrounds:
+                for concurrency in levels:
+                    row = measure(size, fmt, background, concurrency, args.renders)
+                    results.append(row)
+                    print(
+                        f"{_case_label(row):<28} {row['side']:>7} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                        f"{row['throughput_per_s']:>7.1f} {row['cold_ms']:>9.1f} {row['peak_rss_mb']:>8.1f} "
+                        f"{row['bytes']:>9}",
+                        flush=True,
+                    )
+
+    report = {"meta": {**meta, "renders": args.renders}, "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nотчёт: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Память процессов отрисовки: растры фона в памяти каждого процесса
+(MATRIX_RASTER_MMAP=0) против общих .npy через memory-map.
+
+В каждом из N процессов (spawn, как пул render) выполняется init_render_worker
+и по одной отрисовке каждого размера, затем читается /proc/self/smaps_rollup:
+- RSS     — всё, что процесс видит в памяти (общие страницы файлов тоже);
+- PSS     — общие страницы делятся поровну между процессами;
+- private — страницы только этого процесса: столько добавляет каждый новый воркер.
+
+Запуск (из папки backend, только Linux):
+   python -m scripts.bench_render_memory
+   python -m scripts.bench_render_memory --processes 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+SAMPLE_DATE = "22.12.2000"
+
+
+def _smaps_rollup() -> Dict[str, int]:
+    """
+    Показатели памяти процесса из /proc/self/smaps_rollup, КБ.
+    """
+    values = {}
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return values
+
+
+def _worker(_) -> Dict[str, float]:
+    import drawing
+    from calculations import compute_matrix
+
+    t0 = time.perf_counter()
+    drawing.init_render_worker(drawing.DEFAULT_BACKGROUND_PATH)
+    init_s = time.perf_counter() - t0
+
+    m = compute_matrix(SAMPLE_DATE)
+    for dpi in drawing.SIZE_TIERS.values():
+        drawing.render_matrix(m, dpi, drawing.DEFAULT_BACKGROUND_PATH)
+
+    mem = _smaps_rollup()
+    return {
+        "init_s": init_s,
+        "rss": mem["Rss"],
+        "pss": mem["Pss"],
+        "private": mem["Private_Clean"] + mem["Private_Dirty"],
+    }
+
+
+def measure(processes: int, mmap: bool) -> List[Dict[str, float]]:
+    # процессы стартуют через spawn и берут переменную окружения родителя
+    os.environ["MATRIX_RASTER_MMAP"] = "1" if mmap else "0"
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes) as pool:
+        # по одному заданию на процесс; все процессы живы, пока идут замеры
+        return pool.map(_worker, range(processes), chunksize=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Память процессов отрисовки: копии растров против memory-map")
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        raise SystemExit("Нужен Linux с /proc/self/smaps_rollup")
+
+    # общие .npy строятся заранее, чтобы в замер не попала их первая сборка
+    measure(1, mmap=True)
+
+    print(f"процессов: {args.processes}; средние значения на процесс, МБ")
+    print(f"{'режим':<10} {'init, с':>8} {'RSS':>8} {'PSS':>8} {'private':>8} {'private×N':>10}")
+    results = {}
+    for label, mmap in (("копии", False), ("mmap", True)):
+        rows = measure(args.processes, mmap)
+        avg = {k: sum(r[k] for r in rows) / len(rows) for k in rows[0]}
+        results[label] = avg
+        print(
+            f"{label:<10} {avg['init_s']:>8.2f} {avg['rss'] / 1024:>8.1f} {avg['pss'] / 1024:>8.1f} "
+            f"{avg['private'] / 1024:>8.1f} {avg['private'] * args.processes / 1024:>10.1f}"
+        )
+
+    saved = results["копии"]["private"] - results["mmap"]["private"]
+    print(
+        f"экономия: {saved / 1024:.1f} МБ private на процесс, "
+        f"{saved * args.processes / 1024:.1f} МБ на {args.processes} процессов"
+    )
+
+
+if __name__ == "__main__":
+    main()
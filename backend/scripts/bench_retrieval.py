@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска чанков базы знаний (ai_interpretation): прежний get_top_chunks
+(нормировка всей матрицы float64 на каждом запросе + полный argsort) против
+заранее нормированной матрицы float32 с argpartition и пакетного поиска.
+
+Для каждого размера корпуса — время одного запроса, пиковые выделения памяти
+на запрос (tracemalloc) и совпадение top-k с прежней реализацией. Корпус —
+случайные векторы размерности text-embedding-3-small или настоящие embedding
+из chunks.json (--chunks).
+
+Запуск (из папки backend):
+   python -m scripts.bench_retrieval
+   python -m scripts.bench_retrieval --sizes 1000,50000 --dim 1536 --batch 16
+   python -m scripts.bench_retrieval --chunks app/data/ai_knowledge/chunks.json
+"""
+import argparse
+import json
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import ai_interpretation
+from app.ai_interpretation import search_chunks, search_chunks_batch
+from app.vector_index import normalize_embeddings
+
+K = 10
+
+
+# ---------- ПРЕЖНЯЯ РЕАЛИЗАЦИЯ (для сравнения) ----------
+
+def old_search(embeddings: np.ndarray, chunks, query_embedding, k: int = K):
+    query_embedding = np.array(query_embedding)
+    query_norm = query_embedding / (np.linalg.norm(query_embedding) + 1e-10)
+    embeddings_norm = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10)
+    similarities = np.dot(embeddings_norm, query_norm)
+    top_indices = np.argsort(similarities)[::-1][:k]
+    return [chunks[i] for i in top_indices]
+
+
+# ---------- ЗАМЕРЫ ----------
+
+def per_call_ms(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1000
+
+
+def peak_alloc_mb(func) -> float:
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def load_corpus(args):
+    if args.chunks:
+        with open(args.chunks, "r", encoding="utf-8") as f:
+            vectors = [c["embedding"] for c in json.load(f) if "embedding" in c]
+        yield np.array(vectors)
+        return
+    rng = np.random.default_rng(0)
+    for n in (int(v) for v in args.sizes.split(",")):
+        # прежний код хранил матрицу как np.array(списки) — float64
+        yield rng.standard_normal((n, args.dim))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поиск чанков: прежний get_top_chunks против float32 + argpartition")
+    parser.add_argument("--sizes", default="1000,5000,20000", help="размеры случайного корпуса через запятую")
+    parser.add_argument("--dim", type=int, default=1536, help="размерность случайных векторов")
+    parser.add_argument("--chunks", help="взять embedding из chunks.json вместо случайных")
+    parser.add_argument("--queries", type=int, default=50, help="запросов для проверки совпадения")
+    parser.add_argument("--batch", type=int, default=8, help="запросов в пакетном поиске")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    print(
+        f"{'чанков':>8} {'было, мс':>9} {'стало, мс':>10} {'ускор.':>7} "
+        f"{'было, МБ':>9} {'стало, МБ':>10} {f'пакет {args.batch}, мс/запр':>20} {'совпало':>8}"
+    )
+    for raw in load_corpus(args):
+        n, dim = raw.shape
+        chunks = [{"id": i} for i in range(n)]
+        # как после load_chunks
+        ai_interpretation.EMBEDDINGS = normalize_embeddings(raw)
+        ai_interpretation.EMBEDDED_CHUNKS = chunks
+
+        queries = rng.standard_normal((max(args.queries, args.batch), dim))
+        query = queries[0].tolist()  # get_embedding возвращает список
+        batch = queries[:args.batch].tolist()
+
+        matched = sum(
+            [c["id"] for c in old_search(raw, chunks, q)] == [c["id"] for c in search_chunks(q)]
+            for q in queries[:args.queries]
+        )
+        batch_ids = [[c["id"] for c in row] for row in search_chunks_batch(batch)]
+        assert batch_ids == [[c["id"] for c in search_chunks(q)] for q in batch]
+
+        number = max(1, 2000 // max(1, n // 1000))
+        t_old = per_call_ms(lambda: old_search(raw, chunks, query), max(1, number // 10))
+        t_new = per_call_ms(lambda: search_chunks(query), number)
+        t_batch = per_call_ms(lambda: search_chunks_batch(batch), number) / args.batch
+        m_old = peak_alloc_mb(lambda: old_search(raw, chunks, query))
+        m_new = peak_alloc_mb(lambda: search_chunks(query))
+        print(
+            f"{n:>8} {t_old:>9.3f} {t_new:>10.3f} {t_old / t_new:>6.1f}x "
+            f"{m_old:>9.2f} {m_new:>10.3f} {t_batch:>20.3f} {matched:>4}/{args.queries}"
+        )
+
+
+if __name__ == "__main__":
+    main()
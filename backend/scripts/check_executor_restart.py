@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Проверка восстановления пула процессов (app/executor.py) после падения воркера:
+вызов, во время которого процесс умер (os._exit — как OOM или segfault),
+получает 503, а следующие вызовы идут в новые процессы с initializer.
+
+Запуск (из папки backend):
+   python -m scripts.check_executor_restart
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.executor import BoundedExecutor, ExecutorBroken
+
+_INITIALIZED = []
+
+
+def _init_worker() -> None:
+    _INITIALIZED.append(os.getpid())
+
+
+def crash() -> None:
+    os._exit(1)
+
+
+def worker_state():
+    return os.getpid(), list(_INITIALIZED)
+
+
+async def check() -> int:
+    pool = BoundedExecutor("check", workers=2, max_queue=4, timeout=30, kind="process",
+                           initializer=_init_worker, start_method="spawn")
+    failed = 0
+    try:
+        pid_before, _ = await pool.run(worker_state)
+
+        try:
+            await pool.run(crash)
+            print("ОШИБКА вызов с os._exit завершился без исключения")
+            failed += 1
+        except ExecutorBroken as e:
+            print(f"ok  упавший вызов: {e.status_code} {e.detail}")
+
+        for i in range(3):
+            try:
+                pid, initialized = await pool.run(worker_state)
+            except Exception as e:
+                print(f"ОШИБКА вызов {i + 1} после падения: {e!r}")
+                failed += 1
+                continue
+            ok = pid != pid_before and initialized == [pid]
+            failed += not ok
+            print(f"{'ok ' if ok else 'ОШИБКА'} вызов {i + 1} после падения: процесс {pid}, initializer {initialized}")
+
+        stats = pool.stats()
+        ok = stats["restarts"] == 1 and stats["failed"] == 1
+        failed += not ok
+        print(f"{'ok ' if ok else 'ОШИБКА'} stats: restarts={stats['restarts']}, failed={stats['failed']}, "
+              f"in_flight={stats['in_flight']}")
+    finally:
+        pool.shutdown()
+    return failed
+
+
+def main():
+    if asyncio.run(check()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Проверка ключей фрагментов интерпретаций (calc/fragments.py), которые отдаются
+клиентам (GET /calculators/prognosis/range): ключи уникальны, а правка текста
+в одном исходнике (pifagor.json, первый в SOURCES) меняет ключ только этого
+текста — ключи calendar_* остаются прежними, хотя ID внутри пакета сдвигаются.
+
+Запуск (из папки backend):
+   python -m scripts.check_fragment_keys
+"""
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from calc.fragments import INTERPRETATIONS_DIR, SOURCES, compile_pack
+
+CALENDAR_TABLES = ("calendar.year", "calendar.month", "calendar.day")
+
+
+def table_keys(pack, name: str) -> dict:
+    return {n: pack.key(fid) for n, fid in enumerate(pack.table(name).ids) if fid >= 0}
+
+
+def main():
+    failed = 0
+    pack = compile_pack()
+
+    ok = len(set(pack.keys)) == len(pack.fragments)
+    failed += not ok
+    print(f"{'ok ' if ok else 'ОШИБКА'} ключей: {len(set(pack.keys))} на {len(pack.fragments)} фрагментов")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        for filename in SOURCES:
+            if (INTERPRETATIONS_DIR / filename).exists():
+                shutil.copy(INTERPRETATIONS_DIR / filename, tmp_dir / filename)
+        # новый текст в первом исходнике: ID всех фрагментов после него сдвигаются на 1
+        path = tmp_dir / "pifagor.json"
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data.setdefault("psychotype", {})["_check"] = "Новый текст для проверки ключей"
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        edited = compile_pack(tmp_dir)
+
+    shifted = edited.table("calendar.day").ids != pack.table("calendar.day").ids
+    print(f"{'ok ' if shifted else 'ОШИБКА'} ID в пакете после правки pifagor.json сдвинулись: {shifted}")
+    failed += not shifted
+    for name in CALENDAR_TABLES:
+        ok = table_keys(edited, name) == table_keys(pack, name)
+        failed += not ok
+        print(f"{'ok ' if ok else 'ОШИБКА'} ключи {name} не изменились")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
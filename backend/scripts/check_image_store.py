@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Проверка S3ImageStore (app/image_store.py, IMAGE_STORE=s3) на локальной заглушке S3:
+put / lookup / peek / exists / get / url и remove_stale (с --dry-run и без),
+в том числе удаление больше S3_DELETE_BATCH объектов и объекты вне префикса.
+
+По умолчанию поднимает moto_server в этом же процессе (pip install "moto[server]");
+с --endpoint-url проверяет уже запущенный MinIO или другое S3-совместимое
+хранилище (ключи — AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY, бакет создаётся).
+
+Запуск (из папки backend):
+   python -m scripts.check_image_store
+   python -m scripts.check_image_store --endpoint-url http://localhost:9000 --bucket matrix-check
+"""
+import argparse
+import logging
+import os
+import sys
+import uuid
+from pathlib import Path
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.image_store import S3_DELETE_BATCH, S3ImageStore
+
+PREFIX = "matrix/"
+CONTENT_TYPE = "image/webp"
+
+
+def _start_moto() -> tuple:
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        raise SystemExit('Нужен moto: pip install "moto[server]" (или укажите --endpoint-url)') from None
+    # moto принимает любые ключи, но boto3 без них не подписывает запросы
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "check")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "check")
+    # журнал каждого запроса к заглушке не нужен
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return server, f"http://{host}:{port}"
+
+
+def check(store: S3ImageStore, client, bucket: str) -> int:
+    failed = 0
+
+    def expect(ok: bool, message: str) -> None:
+        nonlocal failed
+        failed += not ok
+        print(f"{'ok ' if ok else 'ОШИБКА'} {message}")
+
+    # запись и чтение
+    data = b"RIFF\x00\x00\x00\x00WEBPcheck"
+    expect(store.lookup("fresh_1.webp") is None, "lookup отсутствующего ключа — None")
+    expect(store.get("fresh_1.webp") is None, "get отсутствующего ключа — None")
+    expect(store.put("fresh_1.webp", data, CONTENT_TYPE) == len(data), "put возвращает размер")
+    expect(store.lookup("fresh_1.webp") == len(data), "lookup после put — размер")
+    expect(store.get("fresh_1.webp") == data, "get возвращает записанные байты")
+
+    head = client.head_object(Bucket=bucket, Key=PREFIX + "fresh_1.webp")
+    expect(head["ContentType"] == CONTENT_TYPE, f"Content-Type объекта: {head['ContentType']}")
+    expect(head.get("CacheControl") == store.cache_control, f"Cache-Control объекта: {head.get('CacheControl')}")
+    expect(store.url("fresh_1.webp").endswith(f"/{bucket}/{PREFIX}fresh_1.webp"), f"url: {store.url('fresh_1.webp')}")
+
+    # объект, записанный другим процессом: peek его не знает, lookup находит через HEAD
+    client.put_object(Bucket=bucket, Key=PREFIX + "fresh_2.webp", Body=b"x" * 7)
+    expect(store.peek("fresh_2.webp") is None, "peek чужого объекта — None (без запроса к S3)")
+    expect(store.exists("fresh_2.webp"), "exists чужого объекта")
+    expect(store.lookup("fresh_2.webp") == 7 and store.peek("fresh_2.webp") == 7, "lookup запоминает размер")
+
+    # старые версии: больше одного пакета DeleteObjects
+    n_stale = S3_DELETE_BATCH + 5
+    for i in range(n_stale):
+        client.put_object(Bucket=bucket, Key=f"{PREFIX}stale_{i}.webp", Body=b"s")
+    store.lookup("stale_0.webp")
+    # вне префикса и во вложенной «папке» — не трогаются
+    client.put_object(Bucket=bucket, Key="other/stale_x.webp", Body=b"o")
+    client.put_object(Bucket=bucket, Key=f"{PREFIX}nested/stale_y.webp", Body=b"n")
+
+    def is_stale(key: str) -> bool:
+        return key.startswith("stale_")
+
+    count, size = store.remove_stale(is_stale, dry_run=True)
+    expect((count, size) == (n_stale, n_stale), f"remove_stale --dry-run: {count} объектов, {size} байт")
+    expect(store.exists("stale_0.webp"), "после --dry-run объекты на месте")
+
+    count, size = store.remove_stale(is_stale)
+    expect((count, size) == (n_stale, n_stale), f"remove_stale: {count} объектов, {size} байт")
+    keys = [
+        obj["Key"]
+        for page in client.get_paginator("list_objects_v2").paginate(Bucket=bucket)
+        for obj in page.get("Contents", [])
+    ]
+    expect(not any(k.startswith(PREFIX + "stale_") for k in keys), "старые версии удалены")
+    expect({"other/stale_x.webp", f"{PREFIX}nested/stale_y.webp"} <= set(keys), "объекты вне префикса не тронуты")
+    expect(store.peek("stale_0.webp") is None, "удалённый ключ забыт в памяти")
+    expect(store.lookup("stale_0.webp") is None, "lookup удалённого ключа — None")
+    expect(store.get("fresh_1.webp") == data, "свежие объекты на месте")
+
+    stats = store.stats()
+    expect(stats["puts"] == 1 and stats["put_bytes"] == len(data), f"stats: {stats}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка S3ImageStore на локальной заглушке S3")
+    parser.add_argument("--endpoint-url", help="адрес MinIO или другого S3 (по умолчанию — moto в процессе)")
+    parser.add_argument("--bucket", help="бакет для проверки (по умолчанию — новый со случайным именем)")
+    args = parser.parse_args()
+
+    server = None
+    endpoint_url = args.endpoint_url
+    if endpoint_url is None:
+        server, endpoint_url = _start_moto()
+    bucket = args.bucket or f"matrix-check-{uuid.uuid4().hex[:8]}"
+    try:
+        store = S3ImageStore(
+            bucket=bucket,
+            prefix=PREFIX,
+            endpoint_url=endpoint_url,
+            region="us-east-1",
+            cache_control="public, max-age=31536000, immutable",
+        )
+        client = store._client
+        try:
+            client.create_bucket(Bucket=bucket)
+        except store._client_error as e:
+            if e.response.get("Error", {}).get("Code") != "BucketAlreadyOwnedByYou":
+                raise
+        print(f"S3: {endpoint_url}, бакет {bucket}")
+        failed = check(store, client, bucket)
+    finally:
+        if server is not None:
+            server.stop()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Сверка готовых текстов (precompute) калькуляторов destiny_path и birth_decoding
+с выводом прежней реализации (до материализации) для всех дат 1900–2100.
+
+Прежний вывод заморожен в виде SHA-256 по строкам «дата<TAB>текст» в порядке дат
+(посчитано на коммите до материализации). Если тексты интерпретаций меняются
+намеренно, дайджесты пересчитываются: python -m scripts.check_materialized --print
+
+Запуск (из папки backend):
+   python -m scripts.check_materialized
+"""
+import argparse
+import hashlib
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from calc.birth_date import BirthDate
+from calc.birth_decoding import calculator as birth_decoding
+from calc.destiny_path import calculator as destiny_path
+
+# Вывод calculate() прежней реализации (расчёт на каждый запрос) за 1900–2100
+BASELINE_DIGESTS = {
+    "destiny_path": "a51465664a24326e40b76d41f491f82b7346885136a792f96d3cee8dc3a1d2d5",
+    "birth_decoding": "227732e6de6c1455d8aee5d57b79b1b0f2ac4c18e2103f15cd97eb2511b1ec71",
+}
+
+CALCULATORS = {
+    "destiny_path": destiny_path,
+    "birth_decoding": birth_decoding,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сверка готовых текстов с прежней реализацией")
+    parser.add_argument("--print", action="store_true", help="только напечатать дайджесты текущего вывода")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    n_destiny = destiny_path.precompute()
+    n_decoding = birth_decoding.precompute()
+    print(f"precompute: destiny_path {n_destiny} ключей, birth_decoding {n_decoding} ключей, "
+          f"{time.perf_counter() - t0:.2f} с")
+
+    digests = {name: hashlib.sha256() for name in CALCULATORS}
+    cur, end = date(1900, 1, 1), date(2100, 12, 31)
+    checked = misses = 0
+    while cur <= end:
+        d = BirthDate.of(cur.day, cur.month, cur.year)
+        num1, num3 = destiny_path._zone_numbers(d.day, d.month, d.year)
+        if (num1, num3, d.year >= 2000) not in destiny_path._BODIES:
+            misses += 1
+        for name, calculator in CALCULATORS.items():
+            digests[name].update(f"{d.text}\t{calculator.calculate(d)}\n".encode("utf-8"))
+        checked += 1
+        cur += timedelta(days=1)
+
+    failed = False
+    for name, h in digests.items():
+        digest = h.hexdigest()
+        if args.print:
+            print(f"{name}: {digest}")
+        elif digest != BASELINE_DIGESTS[name]:
+            print(f"{name}: вывод отличается от прежней реализации ({digest})")
+            failed = True
+
+    print(f"проверено дат: {checked}, промахов destiny_path: {misses}")
+    if misses or failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
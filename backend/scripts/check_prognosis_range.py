@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Проверка GET /calculators/prognosis/range на границах календаря: период по умолчанию
+(from + год) у date.max обрезается до 9999-12-31, а не падает с 500;
+строки ICS переносятся по 75 октетов (RFC 5545).
+
+Запуск (из папки backend):
+   python -m scripts.check_prognosis_range
+"""
+import datetime as dt
+import json
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import calculators
+
+BIRTH_DATE = "01.02.1990"
+
+# from, to (None — по умолчанию), ожидаемые первая и последняя даты
+CASES = [
+    ("9999-12-01", None, "9999-12-01", "9999-12-31"),
+    ("9999-12-31", None, "9999-12-31", "9999-12-31"),
+    ("9999-01-02", None, "9999-01-02", "9999-12-31"),
+    ("9998-12-31", None, "9998-12-31", str(dt.date(9998, 12, 31) + dt.timedelta(days=calculators.DEFAULT_RANGE_DAYS - 1))),
+    ("9999-12-30", "9999-12-31", "9999-12-30", "9999-12-31"),
+    ("2024-03-01", "2024-03-10", "2024-03-01", "2024-03-10"),
+]
+
+
+def main():
+    app = FastAPI()
+    app.include_router(calculators.router)
+    client = TestClient(app)
+
+    failed = 0
+    for date_from, date_to, first, last in CASES:
+        params = {"birth_date": BIRTH_DATE, "from": date_from}
+        if date_to:
+            params["to"] = date_to
+        r = client.get("/calculators/prognosis/range", params=params)
+        dates = [json.loads(line)["date"] for line in r.text.splitlines()] if r.status_code == 200 else []
+        ok = r.status_code == 200 and dates[:1] == [first] and dates[-1:] == [last]
+        failed += not ok
+        print(f"{'ok ' if ok else 'ОШИБКА'} from={date_from} to={date_to}: {r.status_code}, "
+              f"{dates[0] if dates else '-'} … {dates[-1] if dates else '-'}")
+
+    # ICS у конца календаря тоже отдаётся целиком
+    r = client.get("/calculators/prognosis/range", params={"birth_date": BIRTH_DATE, "from": "9999-12-20", "format": "ics"})
+    ok = r.status_code == 200 and r.text.rstrip().endswith("END:VCALENDAR")
+    failed += not ok
+    print(f"{'ok ' if ok else 'ОШИБКА'} ics from=9999-12-20: {r.status_code}")
+
+    # строки ICS не длиннее 75 октетов (RFC 5545, 3.1); после склейки переносов текст цел
+    lines = r.text.split("\r\n")
+    longest = max(len(line.encode("utf-8")) for line in lines)
+    unfolded = r.text.replace("\r\n ", "").split("\r\n")
+    ok = longest <= 75 and f"X-WR-CALNAME:Прогностика {BIRTH_DATE}" in unfolded and any(
+        line.startswith("DESCRIPTION:Ритм года: ") and line.count("\\,") == 2 for line in unfolded
+    )
+    failed += not ok
+    print(f"{'ok ' if ok else 'ОШИБКА'} ics: самая длинная строка {longest} октетов, "
+          f"перенесённых строк {sum(line.startswith(' ') for line in lines)}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
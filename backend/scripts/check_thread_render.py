@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Проверка потокобезопасной отрисовки drawing.py: 100 дат рисуются одновременно
+в пуле потоков и сравниваются побайтно с последовательной отрисовкой.
+Параллельный прогон начинается с пустого кэша слоёв фона, чтобы проверить
+и одновременное построение слоя.
+
+Запуск (из папки backend):
+   python -m scripts.check_thread_render
+   python -m scripts.check_thread_render --threads 32 --dpi 60
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import drawing
+from calculations import compute_matrix
+from scripts.common import sample_dates
+
+N_DATES = 100
+
+
+def render(birth_date: str, dpi: float) -> np.ndarray:
+    return drawing.render_matrix(compute_matrix(birth_date), dpi=dpi, background_path=drawing.DEFAULT_BACKGROUND_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Одновременная отрисовка в потоках против последовательной")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--dpi", type=float, default=drawing.SIZE_TIERS["screen"])
+    args = parser.parse_args()
+
+    dates = sample_dates(N_DATES)
+
+    t0 = time.perf_counter()
+    serial = [render(d, args.dpi) for d in dates]
+    t_serial = time.perf_counter() - t0
+
+    drawing._LAYERS.clear()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        threaded = list(pool.map(lambda d: render(d, args.dpi), dates))
+    t_threaded = time.perf_counter() - t0
+
+    mismatched = [d for d, a, b in zip(dates, serial, threaded) if not np.array_equal(a, b)]
+    print(
+        f"дат: {N_DATES}, потоков: {args.threads}, dpi: {args.dpi:g}; "
+        f"последовательно {t_serial:.2f} с, в потоках {t_threaded:.2f} с"
+    )
+    print(f"совпало: {N_DATES - len(mismatched)}, различий: {len(mismatched)}")
+    if mismatched:
+        print("различаются:", ", ".join(mismatched[:10]))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
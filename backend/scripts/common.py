@@ -0,0 +1,25 @@
+"""
+Общие помощники скриптов из scripts/ (не запускается сам).
+"""
+from datetime import date, timedelta
+from typing import Iterable, List
+
+
+def sample_dates(n: int) -> List[str]:
+    """
+    n дат 'дд.мм.гггг' с шагом 97 дней от 1950 года — разные числа во всех узлах матрицы.
+    """
+    start = date(1950, 1, 1)
+    return [(start + timedelta(days=97 * i)).strftime("%d.%m.%Y") for i in range(n)]
+
+
+def parse_list(value: str, allowed: Iterable[str], option: str) -> List[str]:
+    """
+    Значения опции через запятую; выход с подсказкой, если есть недопустимые.
+    """
+    allowed = list(allowed)
+    items = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = [v for v in items if v not in allowed]
+    if unknown or not items:
+        raise SystemExit(f"{option}: допустимые значения — {', '.join(allowed)}")
+    return items
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Удаление картинок матрицы прежних версий отрисовки из хранилища (IMAGE_STORE).
+
+Имя картинки содержит ключ входных данных отрисовки (drawing.variant_key):
+после увеличения drawing.RENDERER_VERSION, замены подложки или параметров
+кодирования у всех вариантов новые имена, а старые файлы больше не запрашиваются.
+Заодно удаляются картинки прежней схемы static/matrix_<дата>.png.
+Сервер удаляет их сам при старте; скрипт нужен, чтобы посмотреть объём
+(--dry-run) или почистить хранилище без перезапуска.
+
+Запуск (из папки backend):
+   python -m scripts.gc_images --dry-run
+   python -m scripts.gc_images
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.matrix_api import collect_stale_images, image_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Удаление картинок прежних версий отрисовки")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, ничего не удалять")
+    args = parser.parse_args()
+
+    image_store.rebuild()
+    t0 = time.monotonic()
+    count, size = collect_stale_images(dry_run=args.dry_run)
+    action = "найдено" if args.dry_run else "удалено"
+    print(f"Старых версий {action}: {count} файлов, {size / 2**20:.1f} МБ за {time.monotonic() - t0:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
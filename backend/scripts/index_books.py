@@ -25,6 +25,11 @@
    - Для каждого PDF извлечёт текст и разобьёт на чанки
    - Для каждого чанка получит embedding через OpenAI
    - Сохранит результат в backend/app/data/ai_knowledge/chunks.json
+   - Построит индекс приближённого поиска IVF (app/vector_index.py)
+     в backend/app/data/ai_knowledge/ivf_index.npz
+
+   Пересобрать только индекс по готовому chunks.json (без запросов к OpenAI):
+   python -m scripts.index_books --index-only [--lists N]
 
 6. После успешной индексации можно использовать AI интерпретацию в приложении.
 
@@ -33,6 +38,7 @@
 - Используется API OpenAI, убедитесь, что у вас есть доступ и достаточный баланс
 - При повторном запуске chunks.json будет перезаписан
 """
+import argparse
 import sys
 import os
 from pathlib import Path
@@ -49,6 +55,8 @@ except ImportError:
     print("ОШИБКА: pdfplumber не установлен. Установите: pip install pdfplumber")
     sys.exit(1)
 
+from app.vector_index import IVFIndex, normalize_embeddings
+
 try:
     from app.openai_client import get_embedding
 except ImportError as e:
@@ -184,16 +192,46 @@ def process_pdf(pdf_path: Path, chunk_id_start: int) -> tuple[List[Dict], int]:
     return chunks_with_embeddings, chunk_id_start + len(all_chunks)
 
 
+def build_ann_index(chunks: List[Dict], index_file: Path, n_lists: int = 0) -> None:
+    """
+    Построить индекс IVF по embedding чанков (в порядке chunks.json) и сохранить его.
+    """
+    embeddings = [c["embedding"] for c in chunks if "embedding" in c]
+    if not embeddings:
+        print("⚠️  Нет embedding — индекс не построен")
+        return
+    start_time = time.time()
+    index = IVFIndex.build(normalize_embeddings(embeddings), n_lists or None)
+    index.save(index_file)
+    sizes = index.offsets[1:] - index.offsets[:-1]
+    print(
+        f"🧭 Индекс IVF: {index.n_lists} списков (от {sizes.min()} до {sizes.max()} векторов), "
+        f"{time.time() - start_time:.1f} секунд → {index_file}"
+    )
+
+
 def main():
     """Основная функция скрипта."""
+    parser = argparse.ArgumentParser(description="Индексация PDF-книг для AI интерпретации")
+    parser.add_argument("--index-only", action="store_true", help="только пересобрать индекс IVF по готовому chunks.json")
+    parser.add_argument("--lists", type=int, default=0, help="число списков IVF (по умолчанию ~sqrt(числа чанков))")
+    args = parser.parse_args()
+
+    backend_dir = Path(__file__).parent.parent
+    output_file = backend_dir / "app" / "data" / "ai_knowledge" / "chunks.json"
+    index_file = output_file.parent / "ivf_index.npz"
+
+    if args.index_only:
+        with open(output_file, "r", encoding="utf-8") as f:
+            build_ann_index(json.load(f), index_file, args.lists)
+        return
+
     print("=" * 60)
     print("📚 ИНДЕКСАЦИЯ КНИГ ДЛЯ AI ИНТЕРПРЕТАЦИИ")
     print("=" * 60)
     
     # Определяем пути
-    backend_dir = Path(__file__).parent.parent
     books_dir = backend_dir / "app" / "data" / "books"
-    output_file = backend_dir / "app" / "data" / "ai_knowledge" / "chunks.json"
     
     # Проверяем папку с книгами
     if not books_dir.exists():
@@ -231,6 +269,8 @@ def main():
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(all_chunks, f, ensure_ascii=False, indent=2)
     
+    build_ann_index(all_chunks, index_file, args.lists)
+    
     print(f"\n✅ ИНДЕКСАЦИЯ ЗАВЕРШЕНА!")
     print(f"   📊 Всего чанков: {len(all_chunks)}")
     print(f"   ⏱️  Время: {elapsed_time:.1f} секунд")
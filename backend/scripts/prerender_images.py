@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Прогрев кэша картинок матрицы: для каждой различной даты рождения из таблицы
+users рисуются недостающие варианты /matrix/image (формат + размер).
+
+- рисование идёт в нескольких процессах (как пул render у сервера);
+- уже нарисованные файлы пропускаются, поэтому прерванный запуск
+  (Ctrl+C, падение) можно просто повторить — продолжится с того же места;
+- --rate ограничивает число отрисовок в секунду, чтобы прогрев рядом
+  с работающим сервером не отнимал у него весь CPU.
+
+Запуск (из папки backend):
+   python -m scripts.prerender_images
+   python -m scripts.prerender_images --formats webp,png --sizes screen,print --workers 4 --rate 20
+
+Картинки сохраняются в то же хранилище, что и у сервера (IMAGE_STORE и остальные
+переменные окружения — те же, см. app/image_store.py). Работающий сервер
+подхватывает новые файлы при первом запросе.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import List, Tuple
+
+# Добавляем путь к backend для импорта
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import SessionLocal
+from app.matrix_api import image_store, variant_filename
+from app.models import User
+from calc.birth_date import BirthDate
+from drawing import DEFAULT_BACKGROUND_PATH, IMAGE_FORMATS, SIZE_TIERS, init_render_worker, render_variant
+from scripts.common import parse_list
+
+# Вариант, который запрашивает фронтенд (MatrixPage)
+DEFAULT_FORMATS = "webp"
+DEFAULT_SIZES = "screen"
+
+# Как часто печатать прогресс, секунд
+PROGRESS_INTERVAL = 2.0
+
+
+def load_birth_dates() -> Tuple[List[BirthDate], int]:
+    """
+    Различные даты рождения пользователей (после разбора) и число нераспознанных строк.
+    """
+    db = SessionLocal()
+    try:
+        rows = db.query(User.birth_date).distinct().all()
+    finally:
+        db.close()
+
+    dates = set()
+    invalid = 0
+    for (value,) in rows:
+        try:
+            dates.add(BirthDate.parse(value))
+        except ValueError:
+            invalid += 1
+    return sorted(dates, key=lambda d: d.ordinal), invalid
+
+
+def _print_progress(done: int, total: int, rendered: int, failed: int, started: float) -> None:
+    elapsed = time.monotonic() - started
+    rate = rendered / elapsed if elapsed > 0 else 0.0
+    eta = (total - done) / rate if rate > 0 else 0.0
+    print(
+        f"[{done}/{total}] нарисовано {rendered}, ошибок {failed}, "
+        f"{rate:.1f} шт/с, осталось ~{eta:.0f} с",
+        flush=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Прогрев кэша картинок матрицы для всех пользователей")
+    parser.add_argument("--formats", default=DEFAULT_FORMATS, help=f"через запятую: {', '.join(IMAGE_FORMATS)}")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"через запятую: {', '.join(SIZE_TIERS)}")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="число процессов отрисовки")
+    parser.add_argument("--rate", type=float, default=0.0, help="не больше N отрисовок в секунду (0 — без ограничения)")
+    parser.add_argument("--limit", type=int, default=0, help="нарисовать не больше N картинок за запуск")
+    args = parser.parse_args()
+
+    formats = parse_list(args.formats, IMAGE_FORMATS, "--formats")
+    sizes = parse_list(args.sizes, SIZE_TIERS, "--sizes")
+
+    dates, invalid = load_birth_dates()
+    print(f"Дат рождения: {len(dates)} (нераспознанных строк: {invalid})")
+    image_store.rebuild()
+
+    # недостающие варианты; объекты сохраняются целиком, поэтому наличие = готово
+    jobs = []
+    for d in dates:
+        for size in sizes:
+            for fmt in formats:
+                name = variant_filename(d, size, fmt)
+                if not image_store.exists(name):
+                    jobs.append((d.text, name, SIZE_TIERS[size], fmt))
+    variants = len(dates) * len(sizes) * len(formats)
+    print(f"Вариантов: {variants}, уже есть: {variants - len(jobs)}, нарисовать: {len(jobs)}")
+    if args.limit:
+        jobs = jobs[:args.limit]
+    if not jobs:
+        return
+
+    total = len(jobs)
+    done = rendered = failed = written = 0
+    started = last_report = time.monotonic()
+    interval = 1.0 / args.rate if args.rate > 0 else 0.0
+    next_submit = started
+
+    # spawn и initializer — как у пула render сервера
+    executor = ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_render_worker,
+        initargs=(DEFAULT_BACKGROUND_PATH,),
+    )
+    pending = {}
+    queue = iter(jobs)
+    try:
+        while True:
+            # держим в работе не больше 2 задач на процесс, остальное — в очереди
+            while len(pending) < args.workers * 2:
+                job = next(queue, None)
+                if job is None:
+                    break
+                if interval:
+                    delay = next_submit - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_submit = max(next_submit, time.monotonic()) + interval
+                birth_date, _, dpi, fmt = job
+                pending[executor.submit(render_variant, birth_date, dpi, fmt, DEFAULT_BACKGROUND_PATH)] = job
+            if not pending:
+                break
+
+            finished, _ = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in finished:
+                birth_date, name, _, fmt = pending.pop(future)
+                done += 1
+                try:
+                    written += image_store.put(name, future.result(), IMAGE_FORMATS[fmt][3])
+                    rendered += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"Ошибка при отрисовке {birth_date} → {name}: {e}")
+
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL:
+                _print_progress(done, total, rendered, failed, started)
+                last_report = now
+    except KeyboardInterrupt:
+        print("\nПрервано: нарисованные файлы сохранены, повторный запуск продолжит с этого места.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        sys.exit(130)
+
+    executor.shutdown()
+    _print_progress(done, total, rendered, failed, started)
+    print(f"Готово: {rendered} файлов, {written / 2**20:.1f} МБ за {time.monotonic() - started:.1f} с")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
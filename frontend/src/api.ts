@@ -33,6 +33,14 @@ export function normalizeImageUrl(raw: string): string {
   return `${API_URL}${url}`;
 }
 
+// FastAPI отдаёт ошибки валидации (422) списком: [{ msg, loc, ... }]
+function formatDetail(detail: any): string | undefined {
+  if (Array.isArray(detail)) {
+    return detail.map((e) => e?.msg ?? String(e)).join("; ");
+  }
+  return detail ?? undefined;
+}
+
 export async function postJSON(path: string, body: any, method: string = "POST") {
   const res = await fetch(`${API_URL}${path}`, {
     method,
@@ -44,7 +52,7 @@ export async function postJSON(path: string, body: any, method: string = "POST")
     let detail = "Ошибка запроса";
     try {
       const data = await res.json();
-      detail = data.detail ?? detail;
+      detail = formatDetail(data.detail) ?? detail;
     } catch {}
     throw new Error(detail);
   }
@@ -59,7 +67,7 @@ export async function getJSON(path: string) {
     let detail = "Ошибка запроса";
     try {
       const data = await res.json();
-      detail = data.detail ?? detail;
+      detail = formatDetail(data.detail) ?? detail;
     } catch {}
     throw new Error(detail);
   }
@@ -34,7 +34,12 @@ export default function MatrixPage({ state, setState }: Props) {
     }));
 
     try {
-      const resp = await postJSON("/matrix/image", { birth_date });
+      // webp экранного размера (~60 КБ) вместо PNG для печати (~2 МБ)
+      const resp = await postJSON("/matrix/image", {
+        birth_date,
+        format: "webp",
+        size: "screen",
+      });
       const rawImageUrl = resp.image_url || resp.imagePath || resp.image_path;
       const imageUrl = rawImageUrl ? normalizeImageUrl(rawImageUrl) : null;
       const digitInterpretations = resp.digit_interpretations || null;